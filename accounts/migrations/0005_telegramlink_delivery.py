@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_telegramlink'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramlink',
+            name='delivery',
+            field=models.CharField(choices=[('IMMEDIATE', 'فوري'), ('DIGEST', 'ملخص دوري')], default='DIGEST', max_length=10, verbose_name='طريقة استلام الإشعارات'),
+        ),
+    ]
@@ -81,5 +81,14 @@ class TelegramLink(models.Model):
     is_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Delivery(models.TextChoices):
+        IMMEDIATE = 'IMMEDIATE', 'فوري'
+        DIGEST = 'DIGEST', 'ملخص دوري'
+
+    # الملخص يجمع الإشعارات في رسالة واحدة كل TELEGRAM_DIGEST_MINUTES دقيقة.
+    delivery = models.CharField(
+        "طريقة استلام الإشعارات", max_length=10, choices=Delivery.choices, default=Delivery.DIGEST,
+    )
+
     def __str__(self):
         return f"{self.user.username} - {'Active' if self.is_active else 'Pending'}"
\ No newline at end of file
@@ -2,11 +2,11 @@
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.db.models import F, Window
-from django.db.models.functions import Rank
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, TemplateView, UpdateView
 
+from gamification.leaderboard import ScoreBoard
+from gamification.services import ActivityService
 from .forms import CustomUserCreationForm, ProfileUpdateForm
 from .models import CustomUser
 
@@ -19,34 +19,57 @@ class SignUpView(CreateView):
 
 
 class LeaderboardView(TemplateView):
-    """Displays the leaderboard with top students and the current user's rank."""
+    """
+    Displays the leaderboard with top students and the current user's rank.
+    Supports weekly/monthly windows and academic year/path segments via GET
+    (?window=week&year=2&path=...).
+    """
     template_name = 'accounts/leaderboard.html'
 
+    leaderboard_size = 20
+
+    def get_board(self):
+        params = self.request.GET
+        year = params.get('year', '')
+        academic_year = int(year) if year.isdigit() and 1 <= int(year) <= 6 else None
+        path = params.get('path', '').strip()
+        if path not in ScoreBoard.path_choices():
+            path = ''
+        return ScoreBoard(params.get('window', 'all'), academic_year, path)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        students_with_rank = CustomUser.objects.annotate(
-            rank=Window(expression=Rank(), order_by=F('score').desc())
-        ).order_by('rank')
+        board = self.get_board()
+        # الترتيب من فهرس النقاط أو اللوحة المخزنة، ثم استعلام واحد لجلب بيانات العرض.
+        entries = board.top(self.leaderboard_size)
+        students = CustomUser.objects.only('username', 'score').in_bulk([user_id for user_id, _, _ in entries])
 
-        ranked_list = list(students_with_rank[:20])
+        ranked_list = []
+        for user_id, points, rank in entries:
+            student = students.get(user_id)
+            if student is not None:
+                student.rank, student.points = rank, points
+                ranked_list.append(student)
         context['top_three'] = ranked_list[:3]
         context['rest_of_students'] = ranked_list[3:]
 
         current_user_rank = None
-        if self.request.user.is_authenticated:
-            # Find the user in the already-fetched list first
-            for student in ranked_list:
-                if student.id == self.request.user.id:
-                    current_user_rank = student
-                    break
-            
-            # If not in the top 20, fetch their specific rank
-            if not current_user_rank:
-                user_rank_obj = students_with_rank.filter(id=self.request.user.id).first()
-                if user_rank_obj:
-                    current_user_rank = user_rank_obj
-
-        context['current_user_rank'] = current_user_rank
+        user = self.request.user
+        if user.is_authenticated:
+            current_user_rank = next((student for student in ranked_list if student.pk == user.pk), None)
+            if current_user_rank is None:
+                position = board.rank(user)
+                if position is not None:
+                    user.rank, user.points = position
+                    current_user_rank = user
+
+        context.update({
+            'current_user_rank': current_user_rank,
+            'board': board,
+            'window_choices': ScoreBoard.WINDOW_LABELS.items(),
+            'year_choices': range(1, 7),
+            'path_choices': ScoreBoard.path_choices(),
+        })
         return context
 
 
@@ -62,4 +85,9 @@ class ProfileUpdateView(LoginRequiredMixin, SuccessMessageMixin, UpdateView):
 
     def get_object(self, queryset=None):
         """Ensures the user can only edit their own profile."""
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['activity'] = ActivityService.summary(self.request.user)
+        return context
\ No newline at end of file
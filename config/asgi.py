@@ -10,12 +10,17 @@ django_asgi_app = get_asgi_application()
 # Now that Django is set up, we can safely import our routing.
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from django.urls import re_path
 import chat.routing
 import ai_tutor.routing
+import telegram_bot.routing
 
 application = ProtocolTypeRouter({
-    # Django's ASGI application to handle standard HTTP requests.
-    "http": django_asgi_app,
+    # Telegram webhook (consumer غير متزامن)، وكل ما عداه لتطبيق Django العادي.
+    "http": URLRouter(
+        telegram_bot.routing.http_urlpatterns +
+        [re_path(r'', django_asgi_app)]
+    ),
 
     # WebSocket handler
     "websocket": AuthMiddlewareStack(
@@ -41,6 +41,8 @@ LOCAL_APPS = [
     'ai_tutor.apps.AiTutorConfig',
     'gamification.apps.GamificationConfig', 
     'telegram_bot.apps.TelegramBotConfig',
+    'search.apps.SearchConfig',
+    'outbox.apps.OutboxConfig',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -84,8 +86,47 @@ CHANNEL_LAYERS = {
     },
 }
 
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+# الكاش المحلي يكفي للتطوير؛ في الإنتاج (عدة عمليات) عيّن CACHE_BACKEND=redis
+# حتى يصل إبطال الكاش من لوحة الإدارة إلى جميع العمليات.
+if os.getenv('CACHE_BACKEND') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'platformcode',
+        }
+    }
+
+# None = يبقى المخطط في الكاش حتى تبطله إشارات تعديل المحتوى.
+COURSE_OUTLINE_CACHE_TIMEOUT = None
+QUIZ_ANSWER_KEY_CACHE_TIMEOUT = None
+# نموذج الأسئلة المُجهَّز مسبقًا (يُبطل تلقائيًا مع نسخة مفتاح الإجابات)
+QUIZ_FORM_CACHE_TIMEOUT = None
+# وضع الامتحان: أقصى عدد إجابات في دفعة التصحيح، والمهلة قبل تصحيح الدفعة (بالثواني)
+EXAM_BUFFER_MAX_SIZE = int(os.getenv('EXAM_BUFFER_MAX_SIZE', 200))
+EXAM_BUFFER_FLUSH_SECONDS = float(os.getenv('EXAM_BUFFER_FLUSH_SECONDS', 2))
+# نبضات مشاهدة الفيديو: تُدمج في الذاكرة وتُكتب كل بضع ثوانٍ، ويكتمل الدرس عند هذه النسبة
+WATCH_BUFFER_MAX_SIZE = int(os.getenv('WATCH_BUFFER_MAX_SIZE', 500))
+WATCH_BUFFER_FLUSH_SECONDS = float(os.getenv('WATCH_BUFFER_FLUSH_SECONDS', 5))
+VIDEO_COMPLETION_THRESHOLD = 0.9
+
+# عدد نتائج Markdown المحفوظة في كاش LRU داخل كل عملية (للعرض المؤقت فقط).
+MARKDOWN_RENDER_CACHE_SIZE = 512
+
 SITE_URL = "http://127.0.0.1:8000" # للتطوير المحلي
 
+# فهرس اقتراحات العناوين داخل كل عملية يُعاد بناؤه من القاعدة بعد هذه المدة (ثوانٍ)،
+# فتظهر تعديلات العمليات الأخرى خلالها حتى مع الكاش المحلي.
+TITLE_INDEX_TTL = int(os.getenv('TITLE_INDEX_TTL', '300'))
+
 # =================================================================
 # Database & Auth
 # =================================================================
@@ -126,4 +167,81 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom Project Settings
 # =================================================================
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
\ No newline at end of file
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+
+# =================================================================
+# Telegram Broadcasts
+# =================================================================
+# يمكن توجيهه إلى خادم Bot API محلي (أو وهمي للاختبار)، مثل http://127.0.0.1:8081/bot
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+# Telegram يسمح بحوالي 30 رسالة/ثانية للبوت ورسالة/ثانية لكل محادثة.
+TELEGRAM_BROADCAST_CONCURRENCY = 20
+TELEGRAM_BROADCAST_RATE = int(os.getenv('TELEGRAM_BROADCAST_RATE', '25'))
+TELEGRAM_CHAT_INTERVAL = 1.0
+TELEGRAM_SEND_ATTEMPTS = 5
+# عدد المحادثات في كل رسالة telegram.broadcast في صندوق الأحداث (~20 ثانية بالمعدل أعلاه).
+TELEGRAM_BROADCAST_CHUNK = 500
+# أقصى مدة لإرسال دفعة واحدة؛ ما لم يُرسل بعدها يُعاد نشره كدفعة جديدة. يجب أن تبقى
+# المهلة + مهلة طلب HTTP واحد أقل من OUTBOX_LEASE_SECONDS حتى لا يحجز عامل آخر نفس الدفعة.
+TELEGRAM_BROADCAST_DEADLINE = 30
+# 'path' يرسل إعلان الكورس لطلاب مساره فقط، و 'all' لكل المستخدمين المرتبطين.
+TELEGRAM_ANNOUNCE_AUDIENCE = os.getenv('TELEGRAM_ANNOUNCE_AUDIENCE', 'path')
+# المستخدمون بتفضيل "ملخص دوري" تصلهم رسالة واحدة كل هذه المدة تجمع إشعاراتها.
+TELEGRAM_DIGEST_MINUTES = int(os.getenv('TELEGRAM_DIGEST_MINUTES', '60'))
+TELEGRAM_DIGEST_MAX_ITEMS = 15
+
+# =================================================================
+# Telegram Webhook
+# =================================================================
+# Telegram يرسله في الترويسة X-Telegram-Bot-Api-Secret-Token (أحرف وأرقام و _ - فقط).
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+# عدد التحديثات التي تُعالج بالتوازي داخل كل عملية.
+TELEGRAM_CONCURRENT_UPDATES = int(os.getenv('TELEGRAM_CONCURRENT_UPDATES', '16'))
+# مدة تخزين رد /stats لكل محادثة (ثوانٍ).
+TELEGRAM_STATS_TTL = 60
+
+# =================================================================
+# Judge Workers
+# =================================================================
+# 'database' يحجز المهام مباشرة من جدول التقديمات، و 'redis' يستخدم طابور Redis.
+JUDGE_QUEUE_BACKEND = os.getenv('JUDGE_QUEUE_BACKEND', 'database')
+JUDGE_LEASE_SECONDS = int(os.getenv('JUDGE_LEASE_SECONDS', '30'))
+JUDGE_MAX_ATTEMPTS = 3
+
+# =================================================================
+# Points Ledger
+# =================================================================
+# كل كم ثانية تُجمع حركات النقاط الجديدة في CustomUser.score داخل كل عملية.
+POINTS_FOLD_SECONDS = float(os.getenv('POINTS_FOLD_SECONDS', '2'))
+
+# 'memory' فهرس صدارة داخل كل عملية (للتطوير)، و 'redis' مجموعة مرتبة مشتركة.
+LEADERBOARD_BACKEND = os.getenv(
+    'LEADERBOARD_BACKEND', 'redis' if os.getenv('CACHE_BACKEND') == 'redis' else 'memory'
+)
+# فهرس 'memory' يُعاد بناؤه من القاعدة بعد هذه المدة (ثوانٍ) لتظهر نقاط العمليات الأخرى.
+LEADERBOARD_MEMORY_TTL = int(os.getenv('LEADERBOARD_MEMORY_TTL', '30'))
+# مدة تخزين لوحات الأسبوع/الشهر والشرائح في الكاش (ثوانٍ).
+LEADERBOARD_BOARD_TIMEOUT = int(os.getenv('LEADERBOARD_BOARD_TIMEOUT', '60'))
+
+# =================================================================
+# Badges
+# =================================================================
+# أقل درجة (من 100) يُعتبر بها الاختبار مجتازًا لشارات "اجتياز الاختبارات".
+BADGE_QUIZ_PASS_SCORE = 50
+
+# =================================================================
+# Activity Feed
+# =================================================================
+# أقصى عدد أسطر في كل خط زمني، وأقصى عدد زملاء يصلهم الحدث الواحد.
+FEED_MAX_ENTRIES = 200
+FEED_MAX_FANOUT = 500
+
+# =================================================================
+# Outbox
+# =================================================================
+# الآثار الجانبية تُكتب كرسائل في نفس المعاملة ويسلمها run_outbox_worker.
+# في التطوير (DEBUG) تُسلَّم أيضًا من خيط خلفي داخل العملية؛ في الإنتاج يسلمها العامل وحده.
+OUTBOX_DRAIN_IN_PROCESS = os.getenv('OUTBOX_DRAIN_IN_PROCESS', '1' if DEBUG else '0') == '1'
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETENTION_DAYS = 7
@@ -16,6 +16,7 @@ urlpatterns = [
     path('chat/', include('chat.urls')),
     path('ai-tutor/', include('ai_tutor.urls')),
     path('gamification/', include('gamification.urls')),
+    path('search/', include('search.urls')),
     
     # Django's built-in auth URLs (login, logout, password_reset, etc.)
     # It's better to place this under the 'accounts/' path for consistency
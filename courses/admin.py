@@ -5,7 +5,8 @@ from django.contrib import admin
 from django.db.models import Count 
 from .models import (
     LearningPath, Course, Module, Lesson,
-    Quiz, Question, Choice, StudentProgress, QuizSubmission
+    Quiz, Question, Choice, StudentProgress, QuizSubmission,
+    LessonPrerequisite, CoursePrerequisite, LessonWatchProgress,
 )
 
 # =================================================================
@@ -71,21 +72,10 @@ class CourseAdmin(admin.ModelAdmin):
     list_editable = ('order',)
     inlines = [ModuleInline]
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.select_related('learning_path', 'instructor').annotate(
-            modules_count=Count('modules', distinct=True),
-            lessons_count=Count('modules__lessons', distinct=True)
-        )
-        return queryset
-
-    @admin.display(description="عدد الوحدات", ordering='modules_count')
-    def modules_count(self, obj):
-        return obj.modules_count
-
-    @admin.display(description="إجمالي الدروس", ordering='lessons_count')
-    def lessons_count(self, obj):
-        return obj.lessons_count
+    # modules_count و lessons_count أعمدة مخزَّنة تحافظ عليها الإشارات،
+    # لذلك لا حاجة لـ annotate ينضم عبر علاقتين ويضخم عدد الصفوف.
+    list_select_related = ('learning_path', 'instructor')
+    readonly_fields = ('modules_count', 'lessons_count')
 
 
 @admin.register(Module)
@@ -107,20 +97,28 @@ class LessonAdmin(admin.ModelAdmin):
     list_select_related = ('module', 'course')
 
 
+@admin.register(LessonPrerequisite)
+class LessonPrerequisiteAdmin(admin.ModelAdmin):
+    list_display = ('lesson', 'required_lesson')
+    list_filter = ('lesson__course',)
+    autocomplete_fields = ('lesson', 'required_lesson')
+    list_select_related = ('lesson', 'required_lesson')
+
+
+@admin.register(CoursePrerequisite)
+class CoursePrerequisiteAdmin(admin.ModelAdmin):
+    list_display = ('course', 'required_course')
+    autocomplete_fields = ('course', 'required_course')
+    list_select_related = ('course', 'required_course')
+
+
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
-    list_display = ('title', 'module', 'question_count')
+    list_display = ('title', 'module', 'question_count', 'exam_mode')
+    list_editable = ('exam_mode',)
     inlines = [QuestionInline]
     list_select_related = ('module',)
-
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(question_count=Count('questions'))
-        return queryset
-    
-    @admin.display(description="عدد الأسئلة", ordering='question_count')
-    def question_count(self, obj):
-        return obj.question_count
+    readonly_fields = ('question_count',)
 
 
 @admin.register(Question)
@@ -150,6 +148,15 @@ class StudentProgressAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None): return False
 
 
+@admin.register(LessonWatchProgress)
+class LessonWatchProgressAdmin(admin.ModelAdmin):
+    list_display = ('student', 'lesson', 'watched_seconds', 'duration', 'updated_at')
+    list_select_related = ('student', 'lesson')
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+
+
 @admin.register(QuizSubmission)
 class QuizSubmissionAdmin(admin.ModelAdmin):
     list_display = ('student', 'quiz', 'score', 'submitted_at')
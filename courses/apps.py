@@ -9,4 +9,5 @@ class CoursesConfig(AppConfig):
     def ready(self):
         # هذا السطر هو الذي يقوم بتسجيل جميع الإشارات الموجودة في ملف signals.py
         # إذا كان هذا السطر مفقودًا، فلن تعمل الإشارات أبدًا.
-        import courses.signals
\ No newline at end of file
+        import courses.signals
+        import courses.subscribers
@@ -0,0 +1,102 @@
+# courses/buffers.py
+
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    مخزن مؤقت للكتابة المؤجلة (write-behind) داخل العملية.
+    - append() يضيف عنصرًا ويعود فورًا؛ الكتابة الفعلية تتم دفعة واحدة عبر
+      flush_func(items) عند امتلاء المخزن أو كل flush_interval ثانية من خيط خلفي.
+    - merge_key (اختياري): العناصر التي لها نفس المفتاح تُدمج عبر merge_func
+      بدل تكرارها، مفيد للأحداث المتكررة مثل نبضات المشاهدة.
+    - إذا فشل flush_func تعود الدفعة إلى المخزن وتُحاول مع التفريغ التالي.
+    - يُفرَّغ المخزن تلقائيًا عند إغلاق العملية (atexit). ما لم يُكتب بعد يضيع
+      إذا توقفت العملية فجأة، لذلك لا يُستخدم إلا لبيانات يمكن إعادة إرسالها.
+    """
+
+    def __init__(self, name, flush_func, max_size=200, flush_interval=2.0, merge_func=None):
+        self.name = name
+        self.flush_func = flush_func
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.merge_func = merge_func
+        self._items = {} if merge_func else []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._items)
+
+    def append(self, item, key=None):
+        with self._lock:
+            if self.merge_func is None:
+                self._items.append(item)
+            elif key in self._items:
+                self._items[key] = self.merge_func(self._items[key], item)
+            else:
+                self._items[key] = item
+            full = len(self._items) >= self.max_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def peek(self, key):
+        """يرجع العنصر المدمج المنتظر لمفتاح معين (إن وجد) دون إزالته."""
+        with self._lock:
+            return self._items.get(key) if self.merge_func else None
+
+    def drain(self):
+        with self._lock:
+            items = self._items
+            self._items = {} if self.merge_func else []
+        return list(items.items()) if self.merge_func else items
+
+    def flush(self):
+        """يكتب كل ما في المخزن الآن. يرجع عدد العناصر المكتوبة."""
+        with self._flush_lock:
+            items = self.drain()
+            if not items:
+                return 0
+            try:
+                self.flush_func(items)
+            except Exception:
+                logger.exception("Write-behind buffer %r failed to flush %d item(s); keeping them.", self.name, len(items))
+                self._restore(items)
+                return 0
+            return len(items)
+
+    def _restore(self, items):
+        """يعيد دفعة فشلت كتابتها إلى المخزن لتُحاول مع التفريغ التالي."""
+        with self._lock:
+            if self.merge_func is None:
+                self._items[:0] = items
+                return
+            for key, item in items:
+                # العنصر الأقدم أولًا ثم ما وصل بعد الفشل.
+                self._items[key] = self.merge_func(item, self._items[key]) if key in self._items else item
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        from django.db import close_old_connections
+
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
@@ -0,0 +1,167 @@
+# courses/curriculum.py
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+
+from dashboard.rendering import RENDERER_VERSION, render_markdown
+from .models import Choice, Course, LearningPath, Lesson, Module, Question, Quiz
+
+# ترتيب المستويات في الملف: كل أب يظهر قبل أبنائه، لذلك يمكن للاستيراد
+# إنشاء كل مستوى بالجملة بعد معرفة المعرفات الجديدة لآبائه.
+LEVELS = [
+    # (النوع، النموذج، حقل الأب، الحقول المصدَّرة)
+    ('learning_path', LearningPath, None, ['title', 'description']),
+    ('course', Course, 'learning_path', ['title', 'description', 'order']),
+    ('module', Module, 'course', ['title', 'description', 'order']),
+    ('lesson', Lesson, 'module', ['title', 'content_type', 'content', 'video_url', 'order']),
+    ('quiz', Quiz, 'module', ['title']),
+    ('question', Question, 'quiz', ['text']),
+    ('choice', Choice, 'question', ['text', 'is_correct']),
+]
+PARENT_TYPE = {
+    'course': 'learning_path',
+    'module': 'course',
+    'lesson': 'module',
+    'quiz': 'module',
+    'question': 'quiz',
+    'choice': 'question',
+}
+
+
+def export_curriculum(stream, path_ids=None):
+    """
+    يكتب شجرة المنهج كاملة بصيغة JSON Lines، سطرًا لكل كائن.
+    يستخدم values() مع iterator() حتى لا يُحمَّل الكتالوج كاملًا في الذاكرة.
+    """
+    path_filter = {
+        'learning_path': 'pk__in',
+        'course': 'learning_path_id__in',
+        'module': 'course__learning_path_id__in',
+        'lesson': 'module__course__learning_path_id__in',
+        'quiz': 'module__course__learning_path_id__in',
+        'question': 'quiz__module__course__learning_path_id__in',
+        'choice': 'question__quiz__module__course__learning_path_id__in',
+    }
+    written = 0
+    for record_type, model, parent_field, fields in LEVELS:
+        queryset = model.objects.all()
+        if path_ids:
+            queryset = queryset.filter(**{path_filter[record_type]: path_ids})
+        columns = ['pk'] + ([f'{parent_field}_id'] if parent_field else []) + fields
+        if record_type == 'course':
+            columns.append('instructor__username')
+        for row in queryset.order_by('pk').values(*columns).iterator(chunk_size=1000):
+            record = {'type': record_type, 'id': row.pop('pk')}
+            if parent_field:
+                record[parent_field] = row.pop(f'{parent_field}_id')
+            if record_type == 'course':
+                record['instructor'] = row.pop('instructor__username')
+            record.update(row)
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            written += 1
+    return written
+
+
+class CurriculumImporter:
+    """
+    يستورد ملف JSON Lines سطرًا بسطر:
+    - يجمع كائنات النوع الحالي في دفعة ثم ينشئها بـ bulk_create مرتب، ويربط
+      المعرف القديم بالمعرف الجديد (ID remapping) لاستخدامه في الأبناء.
+    - لا يُحتفظ في الذاكرة إلا بالدفعة الحالية وخرائط المعرفات.
+    - bulk_create لا يستدعي save() ولا الإشارات، لذلك نملأ هنا ما يملؤه save()
+      (الكورس للدرس، موضع بت التقدم، HTML المولَّد) ويصلح المستدعي العدادات بعدها.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.id_maps = {record_type: {} for record_type, *_ in LEVELS}
+        self.module_course = {}
+        self.next_progress_bit = {}
+        self.course_ids = set()
+        self.counts = {record_type: 0 for record_type, *_ in LEVELS}
+        self._models = {record_type: (model, parent_field) for record_type, model, parent_field, _ in LEVELS}
+        self._batch_type = None
+        self._batch = []
+        self._instructors = {}
+
+    def load(self, lines):
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"Line {line_number}: invalid JSON ({exc}).")
+            record_type = record.pop('type', None)
+            if record_type not in self._models:
+                raise ValueError(f"Line {line_number}: unknown record type {record_type!r}.")
+            if record_type != self._batch_type or len(self._batch) >= self.batch_size:
+                self.flush()
+                self._batch_type = record_type
+            self._batch.append((record.pop('id'), self._build(record_type, record, line_number)))
+        self.flush()
+        return self.counts
+
+    def _build(self, record_type, record, line_number):
+        model, parent_field = self._models[record_type]
+        if parent_field:
+            old_parent_id = record.pop(parent_field)
+            try:
+                record[f'{parent_field}_id'] = self.id_maps[PARENT_TYPE[record_type]][old_parent_id]
+            except KeyError:
+                raise ValueError(
+                    f"Line {line_number}: {record_type} refers to unknown {parent_field} {old_parent_id}."
+                )
+
+        if record_type == 'learning_path':
+            # المسارات الموجودة بنفس العنوان يُعاد استخدامها بدل تكرارها.
+            existing = LearningPath.objects.filter(title=record['title']).first()
+            if existing:
+                return existing
+        elif record_type == 'course':
+            record['instructor_id'] = self._instructor_id(record.pop('instructor', None))
+        elif record_type == 'lesson':
+            course_id = self.module_course[record['module_id']]
+            record['course_id'] = course_id
+            record['progress_bit'] = self._allocate_bit(course_id)
+            record['content_html'] = render_markdown(record.get('content', ''))
+            record['content_html_version'] = RENDERER_VERSION
+        return model(**record)
+
+    def flush(self):
+        if not self._batch:
+            return
+        record_type = self._batch_type
+        model, _ = self._models[record_type]
+        new_objects = [obj for _, obj in self._batch if obj.pk is None]
+        model.objects.bulk_create(new_objects, batch_size=self.batch_size)
+
+        id_map = self.id_maps[record_type]
+        for old_id, obj in self._batch:
+            id_map[old_id] = obj.pk
+            if record_type == 'course':
+                self.course_ids.add(obj.pk)
+            elif record_type == 'module':
+                self.module_course[obj.pk] = obj.course_id
+        self.counts[record_type] += len(new_objects)
+        self._batch = []
+
+    def _allocate_bit(self, course_id):
+        if course_id not in self.next_progress_bit:
+            last_bit = Lesson.objects.filter(course_id=course_id).aggregate(last=Max('progress_bit'))['last']
+            self.next_progress_bit[course_id] = 0 if last_bit is None else last_bit + 1
+        bit = self.next_progress_bit[course_id]
+        self.next_progress_bit[course_id] = bit + 1
+        return bit
+
+    def _instructor_id(self, username):
+        if not username:
+            return None
+        if username not in self._instructors:
+            self._instructors[username] = (
+                get_user_model().objects.filter(username=username).values_list('pk', flat=True).first()
+            )
+        return self._instructors[username]
@@ -0,0 +1,55 @@
+# courses/management/commands/backfill_course_progress.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from courses.models import Course, CourseProgress, Lesson, StudentProgress, bits_to_bytes
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized CourseProgress rows from StudentProgress records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk statement.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        lessons = dict(Lesson.objects.values_list('pk', 'course_id'))
+        lesson_bits = dict(Lesson.objects.values_list('pk', 'progress_bit'))
+        totals = dict(Course.objects.annotate(total=Count('lessons')).values_list('pk', 'total'))
+
+        # (student_id, course_id) -> [bits, last_lesson_id]
+        rows = {}
+        records = StudentProgress.objects.order_by('completed_at', 'pk').values_list('student_id', 'lesson_id')
+        for student_id, lesson_id in records.iterator(chunk_size=2000):
+            bit = lesson_bits.get(lesson_id)
+            if bit is None:
+                continue
+            row = rows.setdefault((student_id, lessons[lesson_id]), [0, None])
+            row[0] |= 1 << bit
+            row[1] = lesson_id  # السجلات مرتبة زمنيًا، فآخر درس يبقى في النهاية
+
+        progress_rows = [
+            CourseProgress(
+                student_id=student_id,
+                course_id=course_id,
+                completed_bits=bits_to_bytes(bits),
+                completed_count=bits.bit_count(),
+                total_count=totals.get(course_id, 0),
+                last_lesson_id=last_lesson_id,
+            )
+            for (student_id, course_id), (bits, last_lesson_id) in rows.items()
+        ]
+
+        with transaction.atomic():
+            CourseProgress.objects.bulk_create(
+                progress_rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                update_fields=['completed_bits', 'completed_count', 'total_count', 'last_lesson'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {len(progress_rows)} course progress row(s)."))
@@ -0,0 +1,24 @@
+# courses/management/commands/export_curriculum.py
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from courses.curriculum import export_curriculum
+
+
+class Command(BaseCommand):
+    help = 'Streams learning paths, courses, modules, lessons and quizzes as JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="Output file path ('-' for stdout).")
+        parser.add_argument('--path', type=int, action='append', dest='path_ids',
+                            help='Export only this learning path id (repeatable).')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            written = export_curriculum(sys.stdout, options['path_ids'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                written = export_curriculum(stream, options['path_ids'])
+        self.stderr.write(self.style.SUCCESS(f"Exported {written} record(s)."))
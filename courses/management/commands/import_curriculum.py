@@ -0,0 +1,42 @@
+# courses/management/commands/import_curriculum.py
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from courses.curriculum import CurriculumImporter
+from courses.management.commands.repair_counters import repair_counters
+from courses.models import Lesson
+from search.index import SearchIndex
+from search.suggest import title_index
+
+
+class Command(BaseCommand):
+    help = 'Imports a JSON Lines curriculum export in a single transaction using ordered bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="JSON Lines file produced by export_curriculum ('-' for stdin).")
+        parser.add_argument('--batch-size', type=int, default=500, help='Objects per bulk insert.')
+
+    def handle(self, *args, **options):
+        importer = CurriculumImporter(batch_size=options['batch_size'])
+        try:
+            with transaction.atomic():
+                if options['input'] == '-':
+                    counts = importer.load(sys.stdin)
+                else:
+                    with open(options['input'], encoding='utf-8') as stream:
+                        counts = importer.load(stream)
+                # الإدراج بالجملة لا يطلق الإشارات، فنصلح العدادات ونفهرس الدروس المستوردة.
+                repair_counters(course_ids=importer.course_ids)
+                SearchIndex.upsert(SearchIndex.lesson_documents(
+                    Lesson.objects.filter(course_id__in=importer.course_ids)
+                ))
+        except (ValueError, IntegrityError) as exc:
+            raise CommandError(f"Import aborted, nothing was saved: {exc}")
+        title_index.invalidate()
+
+        for record_type, count in counts.items():
+            self.stdout.write(f"  -> {record_type}: {count}")
+        self.stdout.write(self.style.SUCCESS("Curriculum imported."))
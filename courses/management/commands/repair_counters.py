@@ -0,0 +1,57 @@
+# courses/management/commands/repair_counters.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from courses.models import Course, Lesson, Module, Question, Quiz
+from problems.models import Problem, TestCase
+
+# (النموذج، عمود العداد، النموذج الابن، حقل الربط بالأب)
+COUNTERS = [
+    (Course, 'modules_count', Module, 'course'),
+    (Course, 'lessons_count', Lesson, 'course'),
+    (Quiz, 'question_count', Question, 'quiz'),
+    (Problem, 'test_case_count', TestCase, 'problem'),
+]
+
+
+def count_subquery(child_model, parent_field):
+    """استعلام فرعي يعدّ الأبناء لكل صف أب، لاستخدامه داخل UPDATE واحد."""
+    counts = (
+        child_model.objects.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def repair_counters(course_ids=None):
+    """
+    يعيد حساب جميع العدادات المخزنة بجملة UPDATE واحدة لكل عداد.
+    يمكن تقييده بمجموعة كورسات (مثلًا بعد الاستيراد بالجملة الذي لا يطلق الإشارات).
+    """
+    with transaction.atomic():
+        for model, field, child_model, parent_field in COUNTERS:
+            queryset = model.objects.all()
+            if course_ids is not None:
+                if model is Course:
+                    queryset = queryset.filter(pk__in=course_ids)
+                elif model is Quiz:
+                    queryset = queryset.filter(module__course_id__in=course_ids)
+                else:
+                    continue
+            queryset.update(**{field: count_subquery(child_model, parent_field)})
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized counter columns (modules, lessons, questions, test cases).'
+
+    def handle(self, *args, **options):
+        repair_counters()
+        for model, field, _, _ in COUNTERS:
+            self.stdout.write(f"  -> {model._meta.label}.{field} repaired.")
+        self.stdout.write(self.style.SUCCESS("All counters are consistent."))
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_progress_bits(apps, schema_editor):
+    """
+    يعطي كل درس موجود موضع بت ثابتًا داخل كورسه، ثم يبني خرائط التقدم
+    من سجلات StudentProgress الحالية.
+    """
+    Lesson = apps.get_model('courses', 'Lesson')
+    StudentProgress = apps.get_model('courses', 'StudentProgress')
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+
+    next_bit = {}
+    lessons = list(Lesson.objects.order_by('course_id', 'module__order', 'order', 'pk'))
+    for lesson in lessons:
+        lesson.progress_bit = next_bit.get(lesson.course_id, 0)
+        next_bit[lesson.course_id] = lesson.progress_bit + 1
+    Lesson.objects.bulk_update(lessons, ['progress_bit'], batch_size=500)
+
+    lesson_bits = {lesson.pk: (lesson.course_id, lesson.progress_bit) for lesson in lessons}
+    bits_by_student_course = {}
+    for student_id, lesson_id in StudentProgress.objects.values_list('student_id', 'lesson_id').iterator():
+        course_id, bit = lesson_bits[lesson_id]
+        key = (student_id, course_id)
+        bits_by_student_course[key] = bits_by_student_course.get(key, 0) | (1 << bit)
+
+    CourseProgress.objects.bulk_create(
+        [
+            CourseProgress(
+                student_id=student_id,
+                course_id=course_id,
+                completed_bits=bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+            )
+            for (student_id, course_id), bits in bits_by_student_course.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_lesson_content_type_alter_lesson_content_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_bits', models.BinaryField(default=b'', verbose_name='الدروس المكتملة (بتات)')),
+            ],
+            options={
+                'verbose_name': 'تقدم الطالب في الكورس',
+                'verbose_name_plural': 'تقدم الطلاب في الكورسات',
+            },
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='progress_bit',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='موضع الدرس في خريطة التقدم'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'progress_bit'), name='unique_lesson_progress_bit'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress', to='courses.course'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='courseprogress',
+            unique_together={('student', 'course')},
+        ),
+        migrations.RunPython(backfill_progress_bits, migrations.RunPython.noop),
+    ]
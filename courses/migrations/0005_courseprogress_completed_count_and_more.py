@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_progress_counters(apps, schema_editor):
+    """يملأ العدادات للصفوف الموجودة؛ last_lesson يملؤه الأمر backfill_course_progress."""
+    CourseProgress = apps.get_model('courses', 'CourseProgress')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    totals = {}
+    for course_id in Lesson.objects.values_list('course_id', flat=True):
+        totals[course_id] = totals.get(course_id, 0) + 1
+
+    rows = list(CourseProgress.objects.all())
+    for progress in rows:
+        progress.completed_count = int.from_bytes(bytes(progress.completed_bits), 'little').bit_count()
+        progress.total_count = totals.get(progress.course_id, 0)
+    CourseProgress.objects.bulk_update(rows, ['completed_count', 'total_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_courseprogress_lesson_progress_bit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseprogress',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد الدروس المكتملة'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='last_lesson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lesson', verbose_name='آخر درس مكتمل'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='إجمالي دروس الكورس'),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='آخر نشاط'),
+        ),
+        migrations.AddIndex(
+            model_name='courseprogress',
+            index=models.Index(fields=['student', '-updated_at'], name='courses_cou_student_d8f8f2_idx'),
+        ),
+        migrations.RunPython(fill_progress_counters, migrations.RunPython.noop),
+    ]
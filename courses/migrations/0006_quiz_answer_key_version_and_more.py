@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+def backfill_submission_counts(apps, schema_editor):
+    """يحسب عدد الأسئلة والإجابات الصحيحة للنتائج القديمة من الدرجة المحفوظة."""
+    QuizSubmission = apps.get_model('courses', 'QuizSubmission')
+    Question = apps.get_model('courses', 'Question')
+
+    totals = {}
+    for quiz_id in Question.objects.values_list('quiz_id', flat=True):
+        totals[quiz_id] = totals.get(quiz_id, 0) + 1
+
+    submissions = list(QuizSubmission.objects.all())
+    for submission in submissions:
+        total = totals.get(submission.quiz_id, 0)
+        submission.total_questions = total
+        submission.correct_answers = round((submission.score / 100) * total) if total > 0 else 0
+    QuizSubmission.objects.bulk_update(submissions, ['total_questions', 'correct_answers'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_courseprogress_completed_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='answer_key_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='نسخة مفتاح الإجابات'),
+        ),
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='correct_answers',
+            field=models.PositiveIntegerField(default=0, verbose_name='الإجابات الصحيحة'),
+        ),
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='total_questions',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد الأسئلة'),
+        ),
+        migrations.RunPython(backfill_submission_counts, migrations.RunPython.noop),
+    ]
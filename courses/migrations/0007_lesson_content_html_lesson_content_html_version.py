@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:19
+
+import markdown
+from django.db import migrations, models
+
+
+def render_existing_content(apps, schema_editor):
+    """
+    HTML أولي للدروس الموجودة. المحوِّل مجمد هنا (امتدادات Markdown وقت كتابة الترحيل)
+    بدل استيراد dashboard.rendering الحالي، والنسخة 0 تجعل rerender_markdown يعيد
+    توليد هذه الصفوف بالمحوِّل الحالي.
+    """
+    Lesson = apps.get_model('courses', 'Lesson')
+    renderer = markdown.Markdown(extensions=['fenced_code', 'codehilite'])
+    lessons = list(Lesson.objects.only('pk', 'content'))
+    for obj in lessons:
+        obj.content_html = renderer.reset().convert(obj.content or '')
+        obj.content_html_version = 0
+    Lesson.objects.bulk_update(lessons, ['content_html', 'content_html_version'], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_quiz_answer_key_version_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='المحتوى (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing_content, migrations.RunPython.noop),
+    ]
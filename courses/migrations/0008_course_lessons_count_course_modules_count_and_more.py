@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, parent_field):
+    counts = (
+        model.objects.filter(**{parent_field: OuterRef('pk')})
+        .order_by().values(parent_field).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Quiz = apps.get_model('courses', 'Quiz')
+    Course.objects.update(
+        modules_count=_count(apps.get_model('courses', 'Module'), 'course'),
+        lessons_count=_count(apps.get_model('courses', 'Lesson'), 'course'),
+    )
+    Quiz.objects.update(question_count=_count(apps.get_model('courses', 'Question'), 'quiz'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_lesson_content_html_lesson_content_html_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الدروس'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='modules_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الوحدات'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الأسئلة'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
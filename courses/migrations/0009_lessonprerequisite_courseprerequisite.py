@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_lessons_count_course_modules_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoursePrerequisite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_links', to='courses.course', verbose_name='الكورس')),
+                ('required_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unlocks_links', to='courses.course', verbose_name='الكورس المطلوب')),
+            ],
+            options={
+                'verbose_name': 'متطلب كورس',
+                'verbose_name_plural': 'متطلبات الكورسات',
+                'unique_together': {('course', 'required_course')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LessonPrerequisite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_links', to='courses.lesson', verbose_name='الدرس')),
+                ('required_lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unlocks_links', to='courses.lesson', verbose_name='الدرس المطلوب')),
+            ],
+            options={
+                'verbose_name': 'متطلب درس',
+                'verbose_name_plural': 'متطلبات الدروس',
+                'unique_together': {('lesson', 'required_lesson')},
+            },
+        ),
+    ]
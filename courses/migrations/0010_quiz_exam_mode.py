@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_lessonprerequisite_courseprerequisite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='exam_mode',
+            field=models.BooleanField(default=False, help_text='فعّله عندما يدخل عدد كبير من الطلاب الاختبار في نفس الوقت؛ تظهر النتيجة بعد ثوانٍ.', verbose_name='وضع الامتحان'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_quiz_exam_mode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonWatchProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watched_intervals', models.BinaryField(default=b'', verbose_name='الفترات المشاهدة')),
+                ('watched_seconds', models.PositiveIntegerField(default=0, verbose_name='الثواني المشاهدة')),
+                ('duration', models.PositiveIntegerField(default=0, verbose_name='مدة الفيديو (ثوانٍ)')),
+                ('last_position', models.PositiveIntegerField(default=0, verbose_name='آخر موضع')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to='courses.lesson')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'مشاهدة درس فيديو',
+                'verbose_name_plural': 'مشاهدات دروس الفيديو',
+                'unique_together': {('student', 'lesson')},
+            },
+        ),
+    ]
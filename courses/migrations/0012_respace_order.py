@@ -0,0 +1,37 @@
+# courses/migrations/0012_respace_order.py
+
+from itertools import groupby
+
+from django.db import migrations
+
+# نسخة مجمّدة من courses.ordering وقت كتابة الترحيل، حتى لا يتغير أثره بتغير الكود.
+ORDER_GAP = 1024
+
+
+def respace_order(apps, schema_editor):
+    """يوزع قيم order الحالية بفجوات ORDER_GAP داخل كل نطاق مع الحفاظ على الترتيب."""
+    scopes = [
+        ('Course', 'learning_path'),
+        ('Module', 'course'),
+        ('Lesson', 'module'),
+    ]
+    for model_name, scope_field in scopes:
+        model = apps.get_model('courses', model_name)
+        rows = model.objects.order_by(f'{scope_field}_id', 'order', 'pk').values_list(f'{scope_field}_id', 'pk')
+        updates = [
+            model(pk=pk, order=(position + 1) * ORDER_GAP)
+            for _, scope_rows in groupby(rows, key=lambda row: row[0])
+            for position, (_, pk) in enumerate(scope_rows)
+        ]
+        model.objects.bulk_update(updates, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_lessonwatchprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(respace_order, migrations.RunPython.noop),
+    ]
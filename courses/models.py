@@ -1,9 +1,15 @@
 # courses/models.py
 
+import sys
+from array import array
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 
+from dashboard.rendering import RenderedMarkdownMixin
+from .ordering import GapOrderedMixin
+
 
 class LearningPath(models.Model):
     title = models.CharField("عنوان المسار", max_length=200, unique=True)
@@ -18,12 +24,15 @@ class LearningPath(models.Model):
         return self.title
 
 
-class Course(models.Model):
+class Course(GapOrderedMixin, models.Model):
     learning_path = models.ForeignKey(LearningPath, related_name='courses', on_delete=models.CASCADE, verbose_name="المسار التعليمي")
     title = models.CharField("عنوان الكورس", max_length=200)
     description = models.TextField("وصف الكورس")
     instructor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="المعلم")
     order = models.PositiveIntegerField(default=0, db_index=True)
+    # عدادات مُخزَّنة تحافظ عليها الإشارات (signals.py)، ويصلحها الأمر repair_counters.
+    modules_count = models.PositiveIntegerField("عدد الوحدات", default=0, editable=False)
+    lessons_count = models.PositiveIntegerField("عدد الدروس", default=0, editable=False)
 
     class Meta:
         verbose_name = "كورس"
@@ -31,15 +40,17 @@ class Course(models.Model):
         ordering = ['order']
         unique_together = ('learning_path', 'title')
 
+    order_scope = 'learning_path'
+
     def __str__(self):
         return self.title
 
     def get_lessons_count(self):
-        """يستخدم العلاقة المباشرة من الدرس للكفاءة."""
-        return self.lessons.count()
+        """يستخدم العداد المخزن بدل عدّ الدروس في كل مرة."""
+        return self.lessons_count
 
 
-class Module(models.Model):
+class Module(GapOrderedMixin, models.Model):
     course = models.ForeignKey(Course, related_name='modules', on_delete=models.CASCADE, verbose_name="الكورس")
     title = models.CharField("عنوان الوحدة", max_length=200)
     description = models.TextField("وصف الوحدة", blank=True)
@@ -51,11 +62,13 @@ class Module(models.Model):
         ordering = ['order']
         unique_together = ('course', 'title')
 
+    order_scope = 'course'
+
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
 
-class Lesson(models.Model):
+class Lesson(GapOrderedMixin, RenderedMarkdownMixin, models.Model):
     # --- NEW: Added to distinguish between lesson types ---
     class ContentType(models.TextChoices):
         TEXT = 'TEXT', 'محتوى نصي'
@@ -72,20 +85,59 @@ class Lesson(models.Model):
         default=ContentType.TEXT
     )
     content = models.TextField("المحتوى النصي", blank=True, help_text="يستخدم إذا كان نوع المحتوى نصيًا.")
+    # HTML المولَّد من content وقت الحفظ (انظر RenderedMarkdownMixin).
+    content_html = models.TextField("المحتوى (HTML)", blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
     video_url = models.URLField("رابط الفيديو", blank=True, help_text="يستخدم إذا كان نوع المحتوى رابط فيديو.")
     order = models.PositiveIntegerField(default=0, db_index=True)
+    # موضع ثابت للدرس داخل خريطة بتات التقدم (CourseProgress). لا يتغير عند
+    # إعادة الترتيب ولا يعاد استخدامه بعد الحذف حتى تبقى البتات المخزنة صحيحة.
+    progress_bit = models.PositiveIntegerField("موضع الدرس في خريطة التقدم", null=True, editable=False)
 
     class Meta:
         verbose_name = "درس"
         verbose_name_plural = "الدروس"
         ordering = ['order']
         unique_together = ('module', 'title')
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'progress_bit'], name='unique_lesson_progress_bit'),
+        ]
+
+    markdown_fields = (('content', 'content_html', 'content_html_version'),)
+    order_scope = 'module'
 
     def save(self, *args, **kwargs):
-        """يضمن تعيين الكورس تلقائيًا عند الحفظ."""
+        """
+        يضمن تعيين الكورس وموضع بت التقدم تلقائيًا عند الحفظ.
+        - البت يُحجز تحت قفل صف الكورس (select_for_update)، فلا يأخذ درسان جديدان
+          في الكورس نفسه البت نفسه (والقيد unique_lesson_progress_bit يمنع ما يفلت).
+        - نقل الدرس إلى كورس آخر يمسح بته القديم من تقدم طلاب الكورس السابق ويحجز له بتًا جديدًا.
+        """
         if not self.course_id:
             self.course = self.module.course
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Lesson.objects.filter(pk=self.pk).values_list('course_id', 'progress_bit').first()
+            moved = previous is not None and previous[0] != self.course_id
+            if moved:
+                self.progress_bit = None
+            if self.progress_bit is None:
+                Course.objects.select_for_update().only('pk').get(pk=self.course_id)
+                last_bit = Lesson.objects.filter(course_id=self.course_id).aggregate(
+                    last=models.Max('progress_bit')
+                )['last']
+                self.progress_bit = 0 if last_bit is None else last_bit + 1
+            super().save(*args, **kwargs)
+            if moved:
+                self._move_progress(*previous)
+
+    def _move_progress(self, previous_course_id, previous_bit):
+        """ينقل أثر الدرس في CourseProgress من الكورس السابق إلى كورسه الجديد."""
+        CourseProgress.forget_lesson(Lesson(pk=self.pk, course_id=previous_course_id, progress_bit=previous_bit))
+        CourseProgress.objects.filter(course_id=self.course_id).update(total_count=models.F('total_count') + 1)
+        for student_id in self.studentprogress_set.values_list('student_id', flat=True):
+            CourseProgress.set_lesson_bit(student_id, self)
 
     def __str__(self):
         return self.title
@@ -98,6 +150,15 @@ class Lesson(models.Model):
 class Quiz(models.Model):
     module = models.OneToOneField(Module, related_name='quiz', on_delete=models.CASCADE, verbose_name="الوحدة التابع لها")
     title = models.CharField("عنوان الاختبار", max_length=255)
+    # يزداد مع كل تعديل على الأسئلة أو الخيارات، فيصبح مفتاح الإجابات المخزن في الكاش قديمًا تلقائيًا.
+    answer_key_version = models.PositiveIntegerField("نسخة مفتاح الإجابات", default=1, editable=False)
+    question_count = models.PositiveIntegerField("عدد الأسئلة", default=0, editable=False)
+    # وضع الامتحان: الإجابات تُحفظ كـ PendingQuizSubmission وتُصحَّح على دفعات (انظر ExamSubmissionService).
+    exam_mode = models.BooleanField(
+        "وضع الامتحان",
+        default=False,
+        help_text="فعّله عندما يدخل عدد كبير من الطلاب الاختبار في نفس الوقت؛ تظهر النتيجة بعد ثوانٍ."
+    )
 
     class Meta:
         verbose_name = "اختبار"
@@ -143,6 +204,78 @@ class Choice(models.Model):
                 raise ValidationError("لا يمكن وجود أكثر من إجابة صحيحة واحدة لهذا السؤال.")
 
 
+def _requirement_reaches(edges, start, target):
+    """يتحقق (BFS) مما إذا كان start يتطلب target مباشرة أو عبر سلسلة متطلبات."""
+    seen, frontier = {start}, [start]
+    while frontier:
+        node = frontier.pop()
+        if node == target:
+            return True
+        for required in edges.get(node, ()):
+            if required not in seen:
+                seen.add(required)
+                frontier.append(required)
+    return False
+
+
+class LessonPrerequisite(models.Model):
+    """
+    حافة في رسم المتطلبات: لا يُفتح lesson حتى يكمل الطالب required_lesson.
+    الدرسان من نفس الكورس، لأن فتح الدروس يُحسب ببتات CourseProgress للكورس.
+    (للاعتماد بين الكورسات استخدم CoursePrerequisite.)
+    """
+    lesson = models.ForeignKey(Lesson, related_name='prerequisite_links', on_delete=models.CASCADE, verbose_name="الدرس")
+    required_lesson = models.ForeignKey(Lesson, related_name='unlocks_links', on_delete=models.CASCADE, verbose_name="الدرس المطلوب")
+
+    class Meta:
+        verbose_name = "متطلب درس"
+        verbose_name_plural = "متطلبات الدروس"
+        unique_together = ('lesson', 'required_lesson')
+
+    def __str__(self):
+        return f"{self.lesson} ← {self.required_lesson}"
+
+    def clean(self):
+        """يمنع الربط بين كورسين مختلفين ويمنع الحلقات في الرسم."""
+        if not (self.lesson_id and self.required_lesson_id):
+            return
+        if self.lesson_id == self.required_lesson_id:
+            raise ValidationError("لا يمكن أن يكون الدرس متطلبًا لنفسه.")
+        if self.lesson.course_id != self.required_lesson.course_id:
+            raise ValidationError("يجب أن يكون الدرس المطلوب من نفس الكورس.")
+        edges = {}
+        links = LessonPrerequisite.objects.filter(lesson__course_id=self.lesson.course_id).exclude(pk=self.pk)
+        for lesson_id, required_id in links.values_list('lesson_id', 'required_lesson_id'):
+            edges.setdefault(lesson_id, set()).add(required_id)
+        if _requirement_reaches(edges, self.required_lesson_id, self.lesson_id):
+            raise ValidationError("هذا المتطلب يُنشئ حلقة: الدرس المطلوب يعتمد بالفعل على هذا الدرس.")
+
+
+class CoursePrerequisite(models.Model):
+    """حافة في رسم متطلبات الكورسات: لا يُفتح course حتى يُكمل الطالب required_course."""
+    course = models.ForeignKey(Course, related_name='prerequisite_links', on_delete=models.CASCADE, verbose_name="الكورس")
+    required_course = models.ForeignKey(Course, related_name='unlocks_links', on_delete=models.CASCADE, verbose_name="الكورس المطلوب")
+
+    class Meta:
+        verbose_name = "متطلب كورس"
+        verbose_name_plural = "متطلبات الكورسات"
+        unique_together = ('course', 'required_course')
+
+    def __str__(self):
+        return f"{self.course} ← {self.required_course}"
+
+    def clean(self):
+        if not (self.course_id and self.required_course_id):
+            return
+        if self.course_id == self.required_course_id:
+            raise ValidationError("لا يمكن أن يكون الكورس متطلبًا لنفسه.")
+        edges = {}
+        for course_id, required_id in CoursePrerequisite.objects.exclude(pk=self.pk).values_list('course_id', 'required_course_id'):
+            edges.setdefault(course_id, set()).add(required_id)
+        if _requirement_reaches(edges, self.required_course_id, self.course_id):
+            raise ValidationError("هذا المتطلب يُنشئ حلقة: الكورس المطلوب يعتمد بالفعل على هذا الكورس.")
+
+
 class StudentProgress(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='progress_records', on_delete=models.CASCADE)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
@@ -154,13 +287,195 @@ class StudentProgress(models.Model):
         verbose_name_plural = "تقدم الطلاب"
 
 
+class CourseProgress(models.Model):
+    """
+    ملخص مُجسَّد (materialized) لتقدم طالب واحد في كورس واحد.
+    - completed_bits: البت رقم n يمثل الدرس الذي قيمة progress_bit له تساوي n.
+    - completed_count و total_count و last_lesson تُحدَّث مع كل سجل StudentProgress
+      جديد (انظر signals.py)، لذلك تقرأ لوحة التحكم وصفحة المسار صفًا واحدًا مفهرسًا.
+    - الأمر backfill_course_progress يعيد بناء هذه الصفوف من سجلات StudentProgress.
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='course_progress', on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name='student_progress', on_delete=models.CASCADE)
+    completed_bits = models.BinaryField("الدروس المكتملة (بتات)", default=b'')
+    completed_count = models.PositiveIntegerField("عدد الدروس المكتملة", default=0)
+    total_count = models.PositiveIntegerField("إجمالي دروس الكورس", default=0)
+    last_lesson = models.ForeignKey(
+        'Lesson',
+        related_name='+',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="آخر درس مكتمل"
+    )
+    updated_at = models.DateTimeField("آخر نشاط", auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'course')
+        verbose_name = "تقدم الطالب في الكورس"
+        verbose_name_plural = "تقدم الطلاب في الكورسات"
+        indexes = [
+            models.Index(fields=['student', '-updated_at']), # "تابع من حيث توقفت" في لوحة التحكم
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.course}"
+
+    @property
+    def bits(self):
+        return bits_from_bytes(self.completed_bits)
+
+    @property
+    def percentage(self):
+        if not self.total_count:
+            return 0
+        return min(100, round((self.completed_count / self.total_count) * 100))
+
+    def has_completed(self, progress_bit):
+        return progress_bit is not None and bool(self.bits >> progress_bit & 1)
+
+    @classmethod
+    def set_lesson_bit(cls, student_id, lesson, completed=True):
+        """يضبط أو يمسح بت الدرس ويحدّث العدادات ضمن معاملة ذرية مع قفل الصف."""
+        if lesson.progress_bit is None:
+            return None
+        with transaction.atomic():
+            progress, created = cls.objects.select_for_update().get_or_create(
+                student_id=student_id, course_id=lesson.course_id
+            )
+            if created:
+                progress.total_count = Course.objects.filter(pk=lesson.course_id).values_list(
+                    'lessons_count', flat=True
+                ).first() or 0
+            bits = progress.bits
+            if completed:
+                bits |= 1 << lesson.progress_bit
+                progress.last_lesson = lesson
+            else:
+                bits &= ~(1 << lesson.progress_bit)
+                if progress.last_lesson_id == lesson.pk:
+                    progress.last_lesson = None
+            progress.completed_bits = bits_to_bytes(bits)
+            progress.completed_count = bits.bit_count()
+            progress.save()
+        return progress
+
+    @classmethod
+    def forget_lesson(cls, lesson):
+        """
+        يزيل درسًا محذوفًا من جميع صفوف تقدم الكورس: يمسح بته ويحدّث العدادات.
+        يُستدعى من إشارة حذف الدرس (عملية إدارية نادرة).
+        """
+        bit = 1 << lesson.progress_bit if lesson.progress_bit is not None else 0
+        with transaction.atomic():
+            rows = list(cls.objects.select_for_update().filter(course_id=lesson.course_id))
+            for progress in rows:
+                bits = progress.bits & ~bit
+                progress.completed_bits = bits_to_bytes(bits)
+                progress.completed_count = bits.bit_count()
+                progress.total_count = max(0, progress.total_count - 1)
+            cls.objects.bulk_update(rows, ['completed_bits', 'completed_count', 'total_count'], batch_size=500)
+
+
+def bits_from_bytes(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+def bits_to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+class LessonWatchProgress(models.Model):
+    """
+    ما شاهده الطالب من درس فيديو، كقائمة فترات مدموجة [(بداية، نهاية)] بالثواني.
+    - watched_intervals: أزواج uint32 متتالية (little-endian) بعد الدمج، لذلك يبقى
+      الصف صغيرًا مهما كثرت نبضات المشاهدة.
+    - تُكتب على دفعات من مخزن النبضات (WatchHeartbeatService) وليس مع كل نبضة.
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='watch_progress', on_delete=models.CASCADE)
+    lesson = models.ForeignKey(Lesson, related_name='watch_progress', on_delete=models.CASCADE)
+    watched_intervals = models.BinaryField("الفترات المشاهدة", default=b'')
+    watched_seconds = models.PositiveIntegerField("الثواني المشاهدة", default=0)
+    duration = models.PositiveIntegerField("مدة الفيديو (ثوانٍ)", default=0)
+    last_position = models.PositiveIntegerField("آخر موضع", default=0)
+    updated_at = models.DateTimeField("آخر تحديث", auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'lesson')
+        verbose_name = "مشاهدة درس فيديو"
+        verbose_name_plural = "مشاهدات دروس الفيديو"
+
+    def __str__(self):
+        return f"{self.student} - {self.lesson}"
+
+    @property
+    def intervals(self):
+        return intervals_from_bytes(self.watched_intervals)
+
+    @property
+    def watched_ratio(self):
+        return self.watched_seconds / self.duration if self.duration else 0
+
+
+def merge_intervals(intervals):
+    """يدمج الفترات المتداخلة أو المتلاصقة ويرجعها مرتبة."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def intervals_from_bytes(data):
+    values = array('I')
+    values.frombytes(bytes(data or b''))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return list(zip(values[::2], values[1::2]))
+
+
+def intervals_to_bytes(intervals):
+    values = array('I', [point for interval in intervals for point in interval])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
 class QuizSubmission(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
     score = models.FloatField("الدرجة")
+    total_questions = models.PositiveIntegerField("عدد الأسئلة", default=0)
+    correct_answers = models.PositiveIntegerField("الإجابات الصحيحة", default=0)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('student', 'quiz')
         verbose_name = "نتيجة اختبار"
-        verbose_name_plural = "نتائج الاختبارات"
\ No newline at end of file
+        verbose_name_plural = "نتائج الاختبارات"
+
+    @property
+    def wrong_answers(self):
+        return self.total_questions - self.correct_answers
+
+class PendingQuizSubmission(models.Model):
+    """
+    إجابات اختبار في وضع الامتحان تنتظر التصحيح.
+    - تُحفظ قبل الرد على الطالب، فلا تضيع إذا توقفت العملية، وأي عملية تعرف أنها قيد التصحيح.
+    - يصححها مشترك صندوق الأحداث على دفعات ثم يحذفها (انظر ExamSubmissionService).
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    answers = models.JSONField("الإجابات", default=dict)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student', 'quiz')
+        verbose_name = "اختبار قيد التصحيح"
+        verbose_name_plural = "اختبارات قيد التصحيح"
+
+    def __str__(self):
+        return f"{self.student} - {self.quiz}"
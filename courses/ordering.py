@@ -0,0 +1,59 @@
+# courses/ordering.py
+
+from django.db import models
+from django.db.models import Case, Max, Value, When
+
+# المسافة بين قيم order المتتالية. الإدراج بين عنصرين يأخذ منتصف الفجوة،
+# فلا يحتاج إلى إعادة ترقيم إلا عندما تنفد الفجوة (نادرًا).
+ORDER_GAP = 1024
+
+
+def apply_order(queryset, ordered_ids):
+    """
+    يطبق ترتيبًا كاملًا جديدًا في استعلام UPDATE واحد (CASE ... WHEN).
+    العنصر رقم i يأخذ القيمة (i + 1) * ORDER_GAP. يرجع عدد الصفوف المحدثة.
+    """
+    if not ordered_ids:
+        return 0
+    return queryset.filter(pk__in=ordered_ids).update(order=Case(
+        *[When(pk=pk, then=Value((position + 1) * ORDER_GAP)) for position, pk in enumerate(ordered_ids)],
+        output_field=models.PositiveIntegerField(),
+    ))
+
+
+def respace(queryset):
+    """يعيد توزيع قيم order بفجوات متساوية مع الحفاظ على الترتيب الحالي."""
+    return apply_order(queryset, list(queryset.order_by('order', 'pk').values_list('pk', flat=True)))
+
+
+def order_between(queryset, before=None, after=None):
+    """
+    يرجع قيمة order لعنصر يوضع بين before و after (أي منهما قد يكون None).
+    إذا لم تبقَ فجوة بينهما يعيد توزيع النطاق مرة واحدة ثم يحسب من جديد.
+    """
+    for _ in range(2):
+        low = queryset.filter(pk=before.pk).values_list('order', flat=True).first() if before else 0
+        if after is None:
+            return (queryset.aggregate(last=Max('order'))['last'] or 0) + ORDER_GAP
+        high = queryset.filter(pk=after.pk).values_list('order', flat=True).first()
+        if high - low > 1:
+            return (low + high) // 2
+        respace(queryset)
+    raise ValueError("Could not find a free order slot after respacing.")
+
+
+class GapOrderedMixin:
+    """
+    يضع العناصر الجديدة في نهاية نطاقها (order = أكبر قيمة + ORDER_GAP)
+    إذا لم يُحدد لها ترتيب، بدل أن تأخذ جميعها القيمة 0.
+    - order_scope: اسم حقل الأب الذي يُرتَّب داخله (مثل 'course' للوحدات).
+    """
+    order_scope = None
+
+    def order_siblings(self):
+        return type(self)._default_manager.filter(**{f'{self.order_scope}_id': getattr(self, f'{self.order_scope}_id')})
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.order:
+            self.order = order_between(self.order_siblings())
+        super().save(*args, **kwargs)
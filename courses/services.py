@@ -0,0 +1,539 @@
+# courses/services.py
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .buffers import WriteBehindBuffer
+from .models import (
+    Choice, CoursePrerequisite, CourseProgress, Lesson, LessonPrerequisite, LessonWatchProgress, Module,
+    PendingQuizSubmission, Question, Quiz, QuizSubmission, StudentProgress, intervals_to_bytes, merge_intervals,
+)
+from outbox.services import publish_many, schedule
+
+logger = logging.getLogger(__name__)
+
+# روابط الفيديو المباشرة التي يمكن تشغيلها بمشغّل HTML5 وتتبّع مشاهدتها.
+EMBEDDABLE_VIDEO_EXTENSIONS = ('.mp4', '.webm', '.ogg')
+
+
+class CourseOutlineService:
+    """
+    يبني مخطط الكورس (الوحدات والدروس والاختبارات) مرة واحدة ويخزنه في الكاش.
+    - المخطط لا يتغير إلا عندما يعدّل المشرف المحتوى، لذلك يتم إبطاله فقط عبر
+      إشارات post_save/post_delete على Module و Lesson و Quiz (انظر signals.py).
+    - يُخزَّن بشكل مضغوط (tuples) ثم يُوسَّع إلى قواميس جاهزة للقالب عند القراءة.
+    """
+    # غيّر هذا الرقم عند تغيير شكل البيانات المخزنة لتجاهل النسخ القديمة تلقائيًا.
+    VERSION = 2
+
+    @classmethod
+    def cache_key(cls, course_id):
+        return f"course_outline:v{cls.VERSION}:{course_id}"
+
+    @staticmethod
+    def _build(course_id):
+        """يجلب المخطط من قاعدة البيانات في استعلامين فقط."""
+        modules = list(
+            Module.objects.filter(course_id=course_id)
+            .order_by('order', 'pk')
+            .values_list('pk', 'title', 'quiz__pk')
+        )
+        lessons_by_module = {module_id: [] for module_id, _, _ in modules}
+        lessons = (
+            Lesson.objects.filter(module__course_id=course_id)
+            .order_by('order', 'pk')
+            .values_list('pk', 'module_id', 'title', 'content_type', 'video_url', 'progress_bit')
+        )
+        for lesson_id, module_id, title, content_type, video_url, progress_bit in lessons:
+            lessons_by_module[module_id].append((lesson_id, title, content_type, video_url, progress_bit))
+
+        return tuple(
+            (module_id, title, quiz_id, tuple(lessons_by_module[module_id]))
+            for module_id, title, quiz_id in modules
+        )
+
+    @classmethod
+    def get_compact(cls, course_id):
+        key = cls.cache_key(course_id)
+        outline = cache.get(key)
+        if outline is None:
+            outline = cls._build(course_id)
+            cache.set(key, outline, getattr(settings, 'COURSE_OUTLINE_CACHE_TIMEOUT', None))
+        return outline
+
+    @classmethod
+    def get_outline(cls, course_id):
+        """
+        يرجع قائمة الوحدات بالشكل الذي يتوقعه القالب:
+        [{'pk', 'title', 'quiz_id', 'lessons': [{'pk', 'title', 'is_video', 'is_embeddable', 'video_url', 'bit'}]}]
+        is_embeddable: ملف فيديو مباشر يمكن تشغيله داخل الصفحة وتتبّع مشاهدته.
+        """
+        return [
+            {
+                'pk': module_id,
+                'title': title,
+                'quiz_id': quiz_id,
+                'lessons': [
+                    {
+                        'pk': lesson_id,
+                        'title': lesson_title,
+                        'is_video': content_type == Lesson.ContentType.VIDEO and bool(video_url),
+                        'is_embeddable': content_type == Lesson.ContentType.VIDEO
+                        and video_url.lower().split('?')[0].endswith(EMBEDDABLE_VIDEO_EXTENSIONS),
+                        'video_url': video_url,
+                        'bit': progress_bit,
+                    }
+                    for lesson_id, lesson_title, content_type, video_url, progress_bit in lessons
+                ],
+            }
+            for module_id, title, quiz_id, lessons in cls.get_compact(course_id)
+        ]
+
+    @staticmethod
+    def count_lessons(outline):
+        return sum(len(module['lessons']) for module in outline)
+
+    @staticmethod
+    def lesson_mask(outline):
+        """قناع بتات يضم جميع دروس الكورس الحالية (يستبعد الدروس المحذوفة)."""
+        mask = 0
+        for module in outline:
+            for lesson in module['lessons']:
+                if lesson['bit'] is not None:
+                    mask |= 1 << lesson['bit']
+        return mask
+
+    @staticmethod
+    def completed_lesson_ids(outline, bits):
+        """يحوّل خريطة بتات الطالب إلى مجموعة معرّفات الدروس المكتملة."""
+        return {
+            lesson['pk']
+            for module in outline
+            for lesson in module['lessons']
+            if lesson['bit'] is not None and bits >> lesson['bit'] & 1
+        }
+
+    @classmethod
+    def invalidate(cls, course_id):
+        if course_id:
+            cache.delete(cls.cache_key(course_id))
+
+
+class QuizAnswerKeyService:
+    """
+    مفتاح إجابات مُجهَّز مسبقًا لكل اختبار: {question_id: correct_choice_id}.
+    - يُخزَّن في الكاش تحت مفتاح يتضمن Quiz.answer_key_version، وتزيد إشارات
+      Question/Choice هذه النسخة عند أي تعديل، فلا حاجة لحذف صريح من الكاش.
+    - التصحيح يصبح بحثًا واحدًا في القاموس لكل إجابة بدل المرور على الخيارات.
+    """
+
+    @staticmethod
+    def cache_key(quiz):
+        return f"quiz_answer_key:{quiz.pk}:v{quiz.answer_key_version}"
+
+    @staticmethod
+    def _build(quiz_id):
+        answer_key = dict.fromkeys(Question.objects.filter(quiz_id=quiz_id).values_list('pk', flat=True))
+        correct_choices = Choice.objects.filter(
+            question__quiz_id=quiz_id, is_correct=True
+        ).values_list('question_id', 'pk')
+        for question_id, choice_id in correct_choices:
+            answer_key[question_id] = choice_id
+        return answer_key
+
+    @classmethod
+    def get_answer_key(cls, quiz):
+        key = cls.cache_key(quiz)
+        answer_key = cache.get(key)
+        if answer_key is None:
+            answer_key = cls._build(quiz.pk)
+            cache.set(key, answer_key, getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_TIMEOUT', None))
+        return answer_key
+
+    @classmethod
+    def grade(cls, quiz, post_data):
+        """يرجع (الدرجة من 100، عدد الإجابات الصحيحة، عدد الأسئلة)."""
+        answer_key = cls.get_answer_key(quiz)
+        correct_answers = 0
+        for question_id, correct_choice_id in answer_key.items():
+            selected_choice_id = post_data.get(f'question_{question_id}')
+            if correct_choice_id is not None and selected_choice_id == str(correct_choice_id):
+                correct_answers += 1
+        total_questions = len(answer_key)
+        score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+        return score, correct_answers, total_questions
+
+    @staticmethod
+    def bump_version(quiz_queryset):
+        """يبطل مفتاح الإجابات المخزن عبر زيادة نسخته في قاعدة البيانات."""
+        quiz_queryset.update(answer_key_version=F('answer_key_version') + 1)
+
+
+class QuizFormService:
+    """
+    يخزن HTML أسئلة الاختبار وخياراتها جاهزًا في الكاش، فلا يتكرر prefetch
+    والعرض مع كل طالب يفتح الاختبار.
+    - الجزء المخزن لا يحتوي على csrf_token ولا أي بيانات خاصة بالمستخدم.
+    - المفتاح يتضمن answer_key_version التي تزيدها إشارات Question/Choice،
+      فأي تعديل على الأسئلة ينتج نسخة جديدة تلقائيًا.
+    """
+
+    @staticmethod
+    def cache_key(quiz):
+        return f"quiz_form:{quiz.pk}:v{quiz.answer_key_version}"
+
+    @classmethod
+    def get_questions_html(cls, quiz):
+        key = cls.cache_key(quiz)
+        html = cache.get(key)
+        if html is None:
+            questions = Question.objects.filter(quiz_id=quiz.pk).order_by('pk').prefetch_related('choices')
+            html = str(render_to_string('courses/partials/quiz_questions.html', {'questions': questions}))
+            cache.set(key, html, getattr(settings, 'QUIZ_FORM_CACHE_TIMEOUT', None))
+        return mark_safe(html)
+
+
+class ExamSubmissionService:
+    """
+    استقبال إجابات الاختبارات في وضع الامتحان مع تصحيح مؤجل على دفعات:
+    - الطلب يحفظ الإجابات كصف PendingQuizSubmission (إدراج صغير واحد) ويجدول حدث
+      التصحيح في نفس المعاملة، فالإجابة محفوظة قبل الرد ولا تضيع بتوقف العملية.
+    - مشترك quiz.grade_exams يصحح حتى EXAM_BUFFER_MAX_SIZE إجابة بمفاتيح الإجابات المخزنة،
+      ويحفظ النتائج بـ bulk_create واحد ويحذف الصفوف المعلقة في نفس المعاملة.
+      schedule() يدمج طلبات التصحيح المتتالية في رسالة واحدة، فتبقى الدفعات كبيرة.
+    - "قيد التصحيح" = وجود الصف في القاعدة، فتعرفه كل العمليات وصفحة الانتظار
+      (QuizPendingView) تستطلع الحالة حتى تظهر النتيجة، وتعيد جدولة التصحيح
+      (ensure_grading) إن فشلت رسالته نهائيًا والصف ما زال معلقًا.
+    - كل إجابة تُصحح وحدها: إجابة يفشل تصحيحها تُسجَّل وتُحذف (فيعود الطالب إلى الاختبار)
+      ولا تُفشل الدفعة كلها.
+    """
+    GRADE_TOPIC = 'quiz.grade_exams'
+
+    @classmethod
+    def submit(cls, student, quiz, post_data):
+        answers = {key: value for key, value in post_data.items() if key.startswith('question_')}
+        with transaction.atomic():
+            # التقديم الأول لكل (طالب، اختبار) هو المعتمد، تمامًا كما في get_or_create.
+            _, created = PendingQuizSubmission.objects.get_or_create(
+                student_id=student.pk, quiz_id=quiz.pk, defaults={'answers': answers},
+            )
+            if created:
+                schedule(cls.GRADE_TOPIC, delay=getattr(settings, 'EXAM_BUFFER_FLUSH_SECONDS', 2))
+
+    @staticmethod
+    def is_pending(student_id, quiz_id):
+        return PendingQuizSubmission.objects.filter(student_id=student_id, quiz_id=quiz_id).exists()
+
+    @classmethod
+    def ensure_grading(cls):
+        """يجدول التصحيح إذا بقيت إجابات معلقة؛ schedule() لا يضيف رسالة إن كانت واحدة تنتظر."""
+        if PendingQuizSubmission.objects.exists():
+            return schedule(cls.GRADE_TOPIC)
+        return False
+
+    @classmethod
+    def grade_pending(cls):
+        """يصحح دفعة من الإجابات المعلقة (داخل معاملة المشترك). يرجع عدد النتائج المحفوظة."""
+        batch_size = getattr(settings, 'EXAM_BUFFER_MAX_SIZE', 200)
+        pending = list(
+            PendingQuizSubmission.objects.order_by('pk').values_list('pk', 'student_id', 'quiz_id', 'answers')[:batch_size + 1]
+        )
+        if len(pending) > batch_size:
+            pending = pending[:batch_size]
+            schedule(cls.GRADE_TOPIC)
+        if not pending:
+            return 0
+
+        quizzes = Quiz.objects.only('pk', 'answer_key_version').in_bulk({quiz_id for _, _, quiz_id, _ in pending})
+        existing = set(
+            QuizSubmission.objects.filter(
+                quiz_id__in=quizzes, student_id__in={student_id for _, student_id, _, _ in pending}
+            ).values_list('student_id', 'quiz_id')
+        )
+
+        submissions = []
+        for _, student_id, quiz_id, answers in pending:
+            if (student_id, quiz_id) in existing or quiz_id not in quizzes:
+                continue
+            try:
+                score, correct_answers, total_questions = QuizAnswerKeyService.grade(quizzes[quiz_id], answers)
+            except Exception:
+                logger.exception("Could not grade exam answers of student #%s for quiz #%s", student_id, quiz_id)
+                continue
+            submissions.append(QuizSubmission(
+                student_id=student_id,
+                quiz_id=quiz_id,
+                score=score,
+                correct_answers=correct_answers,
+                total_questions=total_questions,
+            ))
+
+        QuizSubmission.objects.bulk_create(submissions, ignore_conflicts=True)
+        # bulk_create لا يطلق post_save، فننشر نفس حدث on_quiz_submission هنا.
+        publish_many([('quiz.submitted', quiz_submitted_payload(submission)) for submission in submissions])
+        PendingQuizSubmission.objects.filter(pk__in=[pk for pk, _, _, _ in pending]).delete()
+        return len(submissions)
+
+
+def quiz_submitted_payload(submission):
+    return {
+        'student_id': submission.student_id,
+        'quiz_id': submission.quiz_id,
+        'score': submission.score,
+        'day': timezone.localdate().isoformat(),
+    }
+
+
+class PrerequisiteService:
+    """
+    محرك فتح الدروس والكورسات فوق رسم المتطلبات (DAG).
+    - الإغلاق المتعدي (transitive closure) يُحسب مرة واحدة ويُخزَّن في الكاش:
+      لكل درس له متطلبات قناعُ بتات (على progress_bit) لكل الدروس التي يحتاجها
+      مباشرة أو بشكل غير مباشر، ولكل كورس مجموعة الكورسات المطلوبة.
+    - الدرس مفتوح إذا كان mask & ~bits == 0 حيث bits تقدم الطالب في CourseProgress،
+      فلا حاجة لأي استعلام إضافي بعد قراءة صف التقدم.
+    - الكاش لا يُبطل إلا عند تعديل الرسم نفسه (إشارات LessonPrerequisite و CoursePrerequisite).
+    """
+    VERSION = 1
+    COURSE_GRAPH_KEY = f"course_prerequisites:v{VERSION}"
+
+    @classmethod
+    def lesson_cache_key(cls, course_id):
+        return f"lesson_prerequisites:v{cls.VERSION}:{course_id}"
+
+    @staticmethod
+    def _closure(edges):
+        """{عقدة: متطلباتها المباشرة} -> {عقدة: كل متطلباتها المتعدية}."""
+        closure = {}
+        for start in edges:
+            seen, frontier = set(), list(edges[start])
+            while frontier:
+                node = frontier.pop()
+                if node in seen:
+                    continue
+                seen.add(node)
+                if node in closure:
+                    seen.update(closure[node])
+                else:
+                    frontier.extend(edges.get(node, ()))
+            closure[start] = frozenset(seen)
+        return closure
+
+    @classmethod
+    def _build_lesson_masks(cls, course_id):
+        edges = {}
+        links = LessonPrerequisite.objects.filter(lesson__course_id=course_id)
+        for lesson_id, required_id in links.values_list('lesson_id', 'required_lesson_id'):
+            edges.setdefault(lesson_id, set()).add(required_id)
+        if not edges:
+            return {}
+        bits = dict(Lesson.objects.filter(course_id=course_id).values_list('pk', 'progress_bit'))
+        masks = {}
+        for lesson_id, required_ids in cls._closure(edges).items():
+            mask = 0
+            for required_id in required_ids:
+                if bits.get(required_id) is not None:
+                    mask |= 1 << bits[required_id]
+            masks[lesson_id] = mask
+        return masks
+
+    @classmethod
+    def get_lesson_masks(cls, course_id):
+        key = cls.lesson_cache_key(course_id)
+        masks = cache.get(key)
+        if masks is None:
+            masks = cls._build_lesson_masks(course_id)
+            cache.set(key, masks, None)
+        return masks
+
+    @classmethod
+    def get_course_requirements(cls):
+        requirements = cache.get(cls.COURSE_GRAPH_KEY)
+        if requirements is None:
+            edges = {}
+            for course_id, required_id in CoursePrerequisite.objects.values_list('course_id', 'required_course_id'):
+                edges.setdefault(course_id, set()).add(required_id)
+            requirements = cls._closure(edges)
+            cache.set(cls.COURSE_GRAPH_KEY, requirements, None)
+        return requirements
+
+    @classmethod
+    def locked_lesson_ids(cls, course_id, bits):
+        """معرّفات دروس الكورس التي لم تكتمل متطلباتها بعد."""
+        return {
+            lesson_id for lesson_id, mask in cls.get_lesson_masks(course_id).items()
+            if mask & ~bits
+        }
+
+    @classmethod
+    def is_lesson_unlocked(cls, lesson, bits):
+        return not cls.get_lesson_masks(lesson.course_id).get(lesson.pk, 0) & ~bits
+
+    @classmethod
+    def missing_course_ids(cls, student, course_id):
+        """الكورسات المطلوبة (مباشرة أو بشكل غير مباشر) التي لم يُكملها الطالب بعد."""
+        required_ids = cls.get_course_requirements().get(course_id)
+        if not required_ids:
+            return set()
+        if not student.is_authenticated:
+            return set(required_ids)
+        completed_ids = set(
+            CourseProgress.objects.filter(
+                student=student,
+                course_id__in=required_ids,
+                total_count__gt=0,
+                completed_count__gte=F('total_count'),
+            ).values_list('course_id', flat=True)
+        )
+        return set(required_ids) - completed_ids
+
+    @classmethod
+    def is_unlocked_for(cls, user, lesson):
+        """هل يستطيع الطالب إكمال هذا الدرس الآن؟ (متطلبات الكورس ثم متطلبات الدرس)"""
+        if cls.missing_course_ids(user, lesson.course_id):
+            return False
+        if not cls.get_lesson_masks(lesson.course_id).get(lesson.pk):
+            return True
+        progress = CourseProgress.objects.filter(student=user, course_id=lesson.course_id).only('completed_bits').first()
+        return cls.is_lesson_unlocked(lesson, progress.bits if progress else 0)
+
+    @classmethod
+    def invalidate_lessons(cls, course_id):
+        if course_id:
+            cache.delete(cls.lesson_cache_key(course_id))
+
+    @classmethod
+    def invalidate_courses(cls):
+        cache.delete(cls.COURSE_GRAPH_KEY)
+
+
+class WatchHeartbeatService:
+    """
+    تجميع نبضات مشاهدة دروس الفيديو في الذاكرة ثم كتابتها على دفعات.
+    - كل نبضة تحمل الموضع الحالي والفترات التي شوهدت؛ نبضات نفس (الطالب، الدرس)
+      تُدمج في عنصر واحد داخل المخزن، فلا توجد كتابة لقاعدة البيانات مع كل نبضة.
+    - عند التفريغ تُدمج الفترات مع المخزَّن في LessonWatchProgress بـ bulk upsert واحد،
+      ويُكمَل الدرس تلقائيًا عند تجاوز نسبة VIDEO_COMPLETION_THRESHOLD.
+    """
+    MAX_INTERVALS = 50
+    MAX_DURATION = 24 * 60 * 60
+
+    @classmethod
+    def parse(cls, data):
+        """
+        يتحقق من بيانات النبضة: position و duration (ثوانٍ) و segments بصيغة "10-20,35-60".
+        يرجع None إذا كانت البيانات غير صالحة.
+        """
+        try:
+            duration = int(float(data.get('duration', 0)))
+            position = int(float(data.get('position', 0)))
+            intervals = []
+            for segment in filter(None, data.get('segments', '').split(',')[:cls.MAX_INTERVALS]):
+                start, end = (int(float(value)) for value in segment.split('-', 1))
+                start, end = max(0, start), min(duration, end)
+                if end > start:
+                    intervals.append((start, end))
+        except (TypeError, ValueError):
+            return None
+        if not 0 < duration <= cls.MAX_DURATION:
+            return None
+        return {
+            'intervals': merge_intervals(intervals),
+            'position': min(max(0, position), duration),
+            'duration': duration,
+        }
+
+    @staticmethod
+    def merge(pending, heartbeat):
+        return {
+            'intervals': merge_intervals(pending['intervals'] + heartbeat['intervals']),
+            'position': heartbeat['position'],
+            'duration': max(pending['duration'], heartbeat['duration']),
+        }
+
+    @classmethod
+    def record(cls, student_id, lesson_id, heartbeat):
+        watch_heartbeat_buffer.append(heartbeat, key=(student_id, lesson_id))
+
+    @classmethod
+    def flush(cls, items):
+        pending = dict(items)
+        lessons = Lesson.objects.filter(
+            pk__in={lesson_id for _, lesson_id in pending}, content_type=Lesson.ContentType.VIDEO
+        ).only('pk', 'course_id', 'progress_bit').in_bulk()
+        existing = {
+            (row.student_id, row.lesson_id): row
+            for row in LessonWatchProgress.objects.filter(
+                student_id__in={student_id for student_id, _ in pending}, lesson_id__in=lessons
+            )
+        }
+
+        rows = []
+        for (student_id, lesson_id), heartbeat in pending.items():
+            if lesson_id not in lessons:
+                continue
+            row = existing.get((student_id, lesson_id))
+            intervals = heartbeat['intervals'] + (row.intervals if row else [])
+            intervals = merge_intervals(intervals)
+            rows.append(LessonWatchProgress(
+                student_id=student_id,
+                lesson_id=lesson_id,
+                watched_intervals=intervals_to_bytes(intervals),
+                watched_seconds=sum(end - start for start, end in intervals),
+                duration=max(heartbeat['duration'], row.duration if row else 0),
+                last_position=heartbeat['position'],
+            ))
+
+        LessonWatchProgress.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'lesson'],
+            update_fields=['watched_intervals', 'watched_seconds', 'duration', 'last_position', 'updated_at'],
+        )
+        cls.complete_watched(rows, lessons)
+        return len(rows)
+
+    @staticmethod
+    def complete_watched(rows, lessons):
+        """
+        يُكمل الدروس التي تجاوزت عتبة المشاهدة. الإكمال يحدث مرة واحدة لكل درس،
+        لذلك يتم عبر get_or_create العادي حتى تعمل إشارات النقاط وبتات التقدم.
+        """
+        from django.contrib.auth import get_user_model
+
+        threshold = getattr(settings, 'VIDEO_COMPLETION_THRESHOLD', 0.9)
+        candidates = [row for row in rows if row.watched_ratio >= threshold]
+        if not candidates:
+            return
+        already_completed = set(
+            StudentProgress.objects.filter(
+                student_id__in={row.student_id for row in candidates},
+                lesson_id__in={row.lesson_id for row in candidates},
+            ).values_list('student_id', 'lesson_id')
+        )
+        candidates = [row for row in candidates if (row.student_id, row.lesson_id) not in already_completed]
+        students = get_user_model().objects.in_bulk({row.student_id for row in candidates})
+        for row in candidates:
+            lesson = lessons[row.lesson_id]
+            student = students.get(row.student_id)
+            if student is None or not PrerequisiteService.is_unlocked_for(student, lesson):
+                continue
+            with transaction.atomic():
+                StudentProgress.objects.get_or_create(student=student, lesson=lesson)
+
+
+watch_heartbeat_buffer = WriteBehindBuffer(
+    'watch-heartbeats',
+    WatchHeartbeatService.flush,
+    max_size=getattr(settings, 'WATCH_BUFFER_MAX_SIZE', 500),
+    flush_interval=getattr(settings, 'WATCH_BUFFER_FLUSH_SECONDS', 5),
+    merge_func=WatchHeartbeatService.merge,
+)
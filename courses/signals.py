@@ -1,85 +1,194 @@
 # courses/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.urls import reverse
-from django.conf import settings
+from django.utils import timezone
 
 # استيراد النماذج
-from .models import StudentProgress, QuizSubmission, Course
+from .models import (
+    CourseProgress, StudentProgress, QuizSubmission, Course, Module, Lesson, Quiz, Question, Choice,
+    LessonPrerequisite, CoursePrerequisite,
+)
+from .services import CourseOutlineService, PrerequisiteService, QuizAnswerKeyService, quiz_submitted_payload
 from problems.models import Submission as ProblemSubmission
 
-# استيراد أداة إرسال رسائل Telegram
-# تأكد من أن هذا المسار صحيح بناءً على هيكل مشروعك
-from telegram_bot.utils import send_telegram_message
-
-# استيراد الدالة المساعدة الآمنة
-# تأكد من أن هذا الملف موجود في courses/utils.py
-from .utils import award_points_safely
+# الآثار الجانبية (النقاط، النشاط، الخط الزمني، إشعارات Telegram) لا تُنفذ هنا؛
+# تُكتب كأحداث في صندوق الأحداث ضمن نفس المعاملة وينفذها مشتركوها لاحقًا
+# (gamification/subscribers.py, dashboard/subscribers.py, telegram_bot/subscribers.py).
+from outbox.services import publish
+from .utils import adjust_counter
 
 # =================================================================
-# Signal Handlers (No changes needed here)
+# Domain Events -> Outbox
 # =================================================================
 @receiver(post_save, sender=StudentProgress)
 def on_lesson_completion(sender, instance, created, **kwargs):
     if created:
-        points_to_award = 10
-        award_points_safely(instance.student, points_to_award)
+        publish('lesson.completed', {
+            'student_id': instance.student_id,
+            'lesson_id': instance.lesson_id,
+            'day': timezone.localdate().isoformat(),
+        })
+
 
 @receiver(post_save, sender=QuizSubmission)
 def on_quiz_submission(sender, instance, created, **kwargs):
-    if created and instance.score > 0:
-        points_to_award = int(instance.score / 10)
-        if points_to_award > 0:
-            award_points_safely(instance.student, points_to_award)
+    if created:
+        publish('quiz.submitted', quiz_submitted_payload(instance))
+
 
 @receiver(post_save, sender=ProblemSubmission)
-def on_correct_submission(sender, instance, created, **kwargs):
-    if created and instance.status == 'Correct':
-        is_first_correct = not ProblemSubmission.objects.filter(student=instance.student, problem=instance.problem, status='Correct').exclude(pk=instance.pk).exists()
-        if is_first_correct:
-            points_to_award = instance.problem.points
-            award_points_safely(instance.student, points_to_award)
+def on_problem_submission(sender, instance, created, update_fields=None, **kwargs):
+    # التقديم يُنشأ معلقًا ثم يحدّث عامل التحكيم حالته، لذلك نراقب تغيّر الحالة أيضًا.
+    payload = {
+        'student_id': instance.student_id,
+        'problem_id': instance.problem_id,
+        'day': timezone.localdate().isoformat(),
+    }
+    if created:
+        publish('problem.submitted', payload)
+    status_changed = created or (update_fields is not None and 'status' in update_fields)
+    if status_changed and instance.status == ProblemSubmission.Status.CORRECT:
+        # المشتركون يمنحون النقاط مرة واحدة فقط (أول حل صحيح) عبر مفاتيح عدم التكرار.
+        publish('problem.solved', payload)
+
+
+# =================================================================
+# Course Progress (bitsets + materialized counters)
+# =================================================================
+
+@receiver(post_save, sender=StudentProgress)
+def set_course_progress_bit(sender, instance, created, **kwargs):
+    """يضبط بت الدرس في خريطة تقدم الطالب ضمن نفس المعاملة."""
+    if created:
+        CourseProgress.set_lesson_bit(instance.student_id, instance.lesson)
+
+
+@receiver(post_delete, sender=StudentProgress)
+def clear_course_progress_bit(sender, instance, **kwargs):
+    lesson = Lesson.objects.filter(pk=instance.lesson_id).first()
+    if lesson:
+        CourseProgress.set_lesson_bit(instance.student_id, lesson, completed=False)
+
+
+@receiver(post_save, sender=Lesson)
+def grow_course_progress_totals(sender, instance, created, **kwargs):
+    """درس جديد يزيد إجمالي دروس الكورس لكل من بدأه."""
+    if created:
+        CourseProgress.objects.filter(course_id=instance.course_id).update(total_count=F('total_count') + 1)
+
+
+@receiver(post_delete, sender=Lesson)
+def shrink_course_progress_totals(sender, instance, **kwargs):
+    CourseProgress.forget_lesson(instance)
+
+# =================================================================
+# Course Outline Cache Invalidation
+# =================================================================
+
+@receiver(pre_save, sender=Module)
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Quiz)
+def remember_outline_course(sender, instance, **kwargs):
+    """يحفظ الكورس السابق قبل التعديل، فنقل عنصر إلى كورس آخر يبطل مخطط الكورسين."""
+    if instance.pk:
+        course_field = 'module__course_id' if sender is Quiz else 'course_id'
+        instance._outline_previous_course_id = (
+            sender.objects.filter(pk=instance.pk).values_list(course_field, flat=True).first()
+        )
+
+
+def _invalidate_outlines(instance, course_id):
+    CourseOutlineService.invalidate(course_id)
+    previous_course_id = getattr(instance, '_outline_previous_course_id', None)
+    if previous_course_id != course_id:
+        CourseOutlineService.invalidate(previous_course_id)
+
+
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_outline_on_content_change(sender, instance, **kwargs):
+    """يبطل مخطط الكورس المخزن عند تعديل أو حذف وحدة أو درس."""
+    _invalidate_outlines(instance, instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def invalidate_outline_on_quiz_change(sender, instance, **kwargs):
+    course_id = Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    _invalidate_outlines(instance, course_id)
 
 # =================================================================
-# Notification Signal Handler (This is where we debug)
+# Counter Caches (Course.modules_count / lessons_count, Quiz.question_count)
+# =================================================================
+
+@receiver(post_save, sender=Module)
+def increment_modules_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Course, instance.course_id, 'modules_count', 1)
+
+
+@receiver(post_delete, sender=Module)
+def decrement_modules_count(sender, instance, **kwargs):
+    adjust_counter(Course, instance.course_id, 'modules_count', -1)
+
+
+@receiver(post_save, sender=Lesson)
+def increment_lessons_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Course, instance.course_id, 'lessons_count', 1)
+
+
+@receiver(post_delete, sender=Lesson)
+def decrement_lessons_count(sender, instance, **kwargs):
+    adjust_counter(Course, instance.course_id, 'lessons_count', -1)
+
+
+@receiver(post_save, sender=Question)
+def increment_question_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Quiz, instance.quiz_id, 'question_count', 1)
+
+
+@receiver(post_delete, sender=Question)
+def decrement_question_count(sender, instance, **kwargs):
+    adjust_counter(Quiz, instance.quiz_id, 'question_count', -1)
+
+# =================================================================
+# Quiz Answer Key Versioning
+# =================================================================
+
+@receiver([post_save, post_delete], sender=Question)
+def bump_answer_key_on_question_change(sender, instance, **kwargs):
+    QuizAnswerKeyService.bump_version(Quiz.objects.filter(pk=instance.quiz_id))
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def bump_answer_key_on_choice_change(sender, instance, **kwargs):
+    """أي تعديل على الخيارات يجعل مفتاح الإجابات المخزن قديمًا."""
+    QuizAnswerKeyService.bump_version(Quiz.objects.filter(questions__pk=instance.question_id))
+
+# =================================================================
+# Prerequisite Graph Cache Invalidation
+# =================================================================
+
+@receiver([post_save, post_delete], sender=LessonPrerequisite)
+def invalidate_lesson_prerequisites(sender, instance, **kwargs):
+    """الإغلاق المتعدي المخزن لا يتغير إلا مع تغيّر حواف الرسم."""
+    course_id = Lesson.objects.filter(pk=instance.lesson_id).values_list('course_id', flat=True).first()
+    PrerequisiteService.invalidate_lessons(course_id)
+
+
+@receiver([post_save, post_delete], sender=CoursePrerequisite)
+def invalidate_course_prerequisites(sender, instance, **kwargs):
+    PrerequisiteService.invalidate_courses()
+
+# =================================================================
+# Notifications
 # =================================================================
 
 @receiver(post_save, sender=Course)
 def on_new_course_created(sender, instance, created, **kwargs):
-    """
-    يرسل إشعار Telegram لجميع المستخدمين المرتبطين عند إنشاء كورس جديد.
-    """
-    # 1. Diagnostic Print: Check if the signal is firing at all.
-    print("====== on_new_course_created SIGNAL FIRED ======")
-    
+    """إشعار Telegram بالكورس الجديد يُرسل من العامل، لا من طلب الحفظ."""
     if created:
-        print(f"  -> Course '{instance.title}' was CREATED.")
-        from accounts.models import TelegramLink
-
-        active_links = TelegramLink.objects.filter(is_active=True)
-        
-        # 2. Diagnostic Print: Check if we are finding any active users.
-        print(f"  -> Found {active_links.count()} active Telegram link(s).")
-        
-        if not active_links.exists():
-            print("  -> No active users to notify. Exiting.")
-            return
-
-        course_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000') + reverse('courses:course_detail', kwargs={'pk': instance.pk})
-        
-        message = (
-            f"📢 <b>كورس جديد متاح!</b>\n\n"
-            f"تمت إضافة كورس '<b>{instance.title}</b>' إلى مسار '<b>{instance.learning_path.title}</b>'.\n\n"
-            f"<a href='{course_url}'>ابدأ التعلم الآن!</a>"
-        )
-        
-        for link in active_links:
-            # 3. Diagnostic Print: Check if we are attempting to send a message.
-            print(f"  -> Attempting to send notification to user: {link.user.username} (Chat ID: {link.telegram_chat_id})")
-            send_telegram_message(link.telegram_chat_id, message)
-        
-        print("====== SIGNAL FINISHED ======")
-    else:
-        print(f"  -> Course '{instance.title}' was UPDATED, not created. No notification sent.")
-        print("====== SIGNAL FINISHED ======")
\ No newline at end of file
+        publish('course.created', {'course_id': instance.pk})
@@ -0,0 +1,10 @@
+# courses/subscribers.py
+
+from outbox.services import subscriber
+
+from .services import ExamSubmissionService
+
+
+@subscriber(ExamSubmissionService.GRADE_TOPIC)
+def grade_exam_submissions(payload):
+    ExamSubmissionService.grade_pending()
@@ -16,4 +16,14 @@ def multiply(value, arg):
         return int(value) * int(arg)
     except (ValueError, TypeError):
         # في حالة وجود خطأ، نعيد القيمة الأصلية أو قيمة افتراضية
-        return value
\ No newline at end of file
+        return value
+
+@register.filter
+def get_item(dictionary, key):
+    """
+    يجلب قيمة من قاموس باستخدام مفتاح متغير.
+    الاستخدام: {{ course_percentages|get_item:course.pk }}
+    """
+    if not dictionary:
+        return None
+    return dictionary.get(key)
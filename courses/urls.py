@@ -7,8 +7,12 @@ from .views import (
     LearningPathDetailView,
     CourseDetailView,
     MarkLessonCompleteView,
+    LessonContentView,
+    WatchHeartbeatView,
     TakeQuizView,
+    QuizPendingView,
     QuizResultView,
+    MoveView,
 )
 
 app_name = 'courses' # BEST PRACTICE: Add an app namespace
@@ -27,7 +31,17 @@ urlpatterns = [
     # Path for the action of completing a lesson
     path('lesson/<int:pk>/complete/', MarkLessonCompleteView.as_view(), name='mark_lesson_complete'),
 
+    # Stored HTML of a text lesson (loaded on demand by HTMX)
+    path('lesson/<int:pk>/content/', LessonContentView.as_view(), name='lesson_content'),
+
+    # Watch heartbeats sent by the embedded video player
+    path('lesson/<int:pk>/heartbeat/', WatchHeartbeatView.as_view(), name='lesson_heartbeat'),
+
     # Paths for taking a quiz and seeing the result
     path('quiz/<int:pk>/', TakeQuizView.as_view(), name='take_quiz'),
+    path('quiz/<int:pk>/pending/', QuizPendingView.as_view(), name='quiz_pending'),
     path('quiz/result/<int:pk>/', QuizResultView.as_view(), name='quiz_result'),
+
+    # Staff drag-and-drop: move one item between its new neighbours (kind: courses, modules or lessons)
+    path('move/<str:kind>/<int:pk>/', MoveView.as_view(), name='move'),
 ]
\ No newline at end of file
@@ -1,28 +1,15 @@
 # courses/utils.py
 
-from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 
-def award_points_safely(student, points_to_award):
+
+def adjust_counter(model, pk, field, delta):
     """
-    دالة آمنة ومركزية لمنح النقاط لمستخدم.
-    - تمنع حالات السباق (Race Conditions) باستخدام F() expressions.
-    - تضمن اتساق البيانات باستخدام معاملة ذرية (atomic transaction).
+    يعدّل عمود عداد مخزَّن (counter cache) بتحديث ذري واحد على مستوى قاعدة البيانات.
+    - Greatest يمنع العداد من النزول تحت الصفر إذا كان غير متسق أصلًا.
     """
-    if not student or not points_to_award or points_to_award <= 0:
+    if not pk or not delta:
         return
+    model.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, Value(0))})
 
-    try:
-        with transaction.atomic():
-            # تحديث النقاط مباشرة في قاعدة البيانات لتجنب حالات السباق
-            student.score = F('score') + points_to_award
-            student.save(update_fields=['score'])
-            
-            # تحديث الكائن في ذاكرة Python ليعكس القيمة الجديدة فورًا
-            student.refresh_from_db(fields=['score'])
-            
-            print(f"Awarded {points_to_award} points to {student.username}. New score: {student.score}")
-
-    except Exception as e:
-        # من الجيد تسجيل الأخطاء في المشاريع الحقيقية
-        print(f"CRITICAL: Failed to award points to {student.username}. Error: {e}")
\ No newline at end of file
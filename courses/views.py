@@ -4,13 +4,22 @@
 # Imports (Cleaned and organized)
 # ----------------------------------------------------------------
 import math
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Prefetch
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views import View
 from django.views.generic import DetailView, ListView
 
-from .models import Choice, Course, LearningPath, Lesson, Quiz, QuizSubmission, StudentProgress
+from .models import (
+    Choice, Course, CourseProgress, LearningPath, Lesson, Module, Quiz, QuizSubmission, StudentProgress,
+)
+from .ordering import order_between
+from .services import (
+    CourseOutlineService, ExamSubmissionService, PrerequisiteService, QuizAnswerKeyService, QuizFormService,
+    WatchHeartbeatService,
+)
 
 # =================================================================
 # PUBLIC VIEWS (Accessible to all users)
@@ -42,13 +51,8 @@ class LearningPathDetailView(DetailView):
         لمنع مشاكل N+1 query في القالب.
         """
         queryset = super().get_queryset()
-        return queryset.prefetch_related(
-            Prefetch('courses', queryset=Course.objects.annotate(
-                # حساب عدد الوحدات والدروس على مستوى قاعدة البيانات
-                modules_count=Count('modules', distinct=True),
-                total_lessons_count=Count('lessons', distinct=True)
-            ))
-        )
+        # modules_count و lessons_count أعمدة مخزَّنة في Course، فلا حاجة للتجميع هنا.
+        return queryset.prefetch_related('courses')
 
     def get_context_data(self, **kwargs):
         """
@@ -56,13 +60,19 @@ class LearningPathDetailView(DetailView):
         """
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            all_courses_in_path = self.object.courses.all()
-            context['started_course_ids'] = set(
-                StudentProgress.objects.filter(
+            # صف CourseProgress واحد لكل كورس بدأه الطالب يحمل النسبة جاهزة.
+            progress_by_course = {
+                progress.course_id: progress
+                for progress in CourseProgress.objects.filter(
                     student=self.request.user,
-                    lesson__course__in=all_courses_in_path
-                ).values_list('lesson__course_id', flat=True)
-            )
+                    course__learning_path=self.object,
+                    completed_count__gt=0
+                ).only('course_id', 'completed_count', 'total_count')
+            }
+            context['started_course_ids'] = set(progress_by_course)
+            context['course_percentages'] = {
+                course_id: progress.percentage for course_id, progress in progress_by_course.items()
+            }
         return context
 
 
@@ -78,34 +88,42 @@ class CourseDetailView(DetailView):
 
     def get_queryset(self):
         """
-        تحسين الأداء: يجلب الكورس مع عدد دروسه، وجميع وحداته ودروسها
-        في استعلامات قليلة وفعالة.
+        تحسين الأداء: المخطط (الوحدات والدروس) يأتي من الكاش، لذلك
+        لا نحتاج هنا إلا إلى الكورس نفسه مع المعلم.
         """
         queryset = super().get_queryset()
-        queryset = queryset.annotate(total_lessons_count=Count('lessons', distinct=True))
-        return queryset.prefetch_related('modules__lessons')
+        return queryset.select_related('instructor')
 
     def get_context_data(self, **kwargs):
         """
-        يضيف بيانات التقدم: الدروس المكتملة والنسبة المئوية للإنجاز.
+        يضيف المخطط المخزن في الكاش، ثم يطبق عليه تقدم المستخدم:
+        الدروس المكتملة والنسبة المئوية للإنجاز.
         """
         context = super().get_context_data(**kwargs)
         course = self.object
+        outline = CourseOutlineService.get_outline(course.pk)
         completed_lessons = set()
+        bits = 0
 
         if self.request.user.is_authenticated:
-            completed_lessons = set(
-                StudentProgress.objects.filter(
-                    student=self.request.user,
-                    lesson__course=course
-                ).values_list('lesson_id', flat=True)
-            )
+            progress = CourseProgress.objects.filter(student=self.request.user, course=course).first()
+            if progress:
+                bits = progress.bits
+                completed_lessons = CourseOutlineService.completed_lesson_ids(outline, bits)
         
-        all_lessons_count = course.total_lessons_count
+        all_lessons_count = CourseOutlineService.count_lessons(outline)
         progress_percentage = 0
         if all_lessons_count > 0:
             progress_percentage = round((len(completed_lessons) / all_lessons_count) * 100)
 
+        # الفتح يُحسب من الإغلاق المتعدي المخزن وبتات التقدم (عمليات على البتات فقط).
+        missing_course_ids = PrerequisiteService.missing_course_ids(self.request.user, course.pk)
+        context['missing_courses'] = (
+            Course.objects.filter(pk__in=missing_course_ids).only('pk', 'title') if missing_course_ids else []
+        )
+        context['locked_lessons'] = PrerequisiteService.locked_lesson_ids(course.pk, bits)
+
+        context['outline'] = outline
         context['completed_lessons'] = completed_lessons
         context['progress_percentage'] = progress_percentage
         return context
@@ -121,46 +139,103 @@ class MarkLessonCompleteView(LoginRequiredMixin, View):
     """
     def post(self, request, *args, **kwargs):
         lesson = get_object_or_404(Lesson, pk=kwargs['pk'])
-        StudentProgress.objects.get_or_create(student=request.user, lesson=lesson)
+        if not PrerequisiteService.is_unlocked_for(request.user, lesson):
+            return HttpResponseForbidden("هذا الدرس مقفل: أكمل متطلباته أولًا.")
+        # سجل التقدم وبت الكورس (عبر الإشارة) يُحفظان معًا أو لا يُحفظ أي منهما.
+        with transaction.atomic():
+            StudentProgress.objects.get_or_create(student=request.user, lesson=lesson)
         return redirect('courses:course_detail', pk=lesson.course.pk)
 
 
+class LessonContentView(LoginRequiredMixin, View):
+    """محتوى الدرس النصي (HTMX): HTML المخزن وقت الحفظ، بدون تحويل Markdown في الطلب."""
+    def get(self, request, *args, **kwargs):
+        lesson = get_object_or_404(Lesson, pk=kwargs['pk'])
+        if not PrerequisiteService.is_unlocked_for(request.user, lesson):
+            return HttpResponseForbidden("هذا الدرس مقفل: أكمل متطلباته أولًا.")
+        return render(request, 'courses/partials/lesson_content.html', {'lesson': lesson})
+
+
+class WatchHeartbeatView(LoginRequiredMixin, View):
+    """
+    يستقبل نبضات مشاهدة دروس الفيديو (POST كل بضع ثوانٍ من المشغّل).
+    - لا يلمس قاعدة البيانات: النبضة تُدمج في مخزن الذاكرة وتُكتب لاحقًا على دفعات.
+    - التحقق من وجود الدرس ونوعه يتم عند التفريغ.
+    """
+    def post(self, request, *args, **kwargs):
+        heartbeat = WatchHeartbeatService.parse(request.POST)
+        if heartbeat is None:
+            return HttpResponse('بيانات المشاهدة غير صالحة.', status=400)
+        WatchHeartbeatService.record(request.user.pk, kwargs['pk'], heartbeat)
+        return HttpResponse(status=204)
+
+
 class TakeQuizView(LoginRequiredMixin, View):
     """
     يعرض نموذج الاختبار ويعالج تقديم الإجابات.
     """
     def get(self, request, *args, **kwargs):
-        quiz = get_object_or_404(Quiz.objects.prefetch_related('questions__choices'), pk=kwargs['pk'])
+        # الأسئلة والخيارات تأتي مُجهَّزة من الكاش (QuizFormService)، فلا حاجة لـ prefetch هنا.
+        quiz = get_object_or_404(
+            Quiz.objects.only('pk', 'title', 'exam_mode', 'answer_key_version', 'question_count'), pk=kwargs['pk']
+        )
         submission = QuizSubmission.objects.filter(student=request.user, quiz=quiz).first()
         if submission:
             return redirect('courses:quiz_result', pk=submission.pk)
-        return render(request, 'courses/quiz_form.html', {'quiz': quiz})
+        if quiz.exam_mode and ExamSubmissionService.is_pending(request.user.pk, quiz.pk):
+            return redirect('courses:quiz_pending', pk=quiz.pk)
+        return render(request, 'courses/quiz_form.html', {
+            'quiz': quiz,
+            'questions_html': QuizFormService.get_questions_html(quiz),
+        })
 
     def post(self, request, *args, **kwargs):
-        quiz = get_object_or_404(Quiz.objects.prefetch_related('questions__choices'), pk=kwargs['pk'])
-        
-        # Unpack the tuple returned by the helper method correctly.
-        score, _ = self.calculate_score(request.POST, quiz)
+        # لا حاجة لجلب الأسئلة والخيارات: التصحيح يتم عبر مفتاح الإجابات المخزن.
+        quiz = get_object_or_404(Quiz.objects.only('pk', 'exam_mode', 'answer_key_version'), pk=kwargs['pk'])
+
+        if quiz.exam_mode:
+            # وضع الامتحان: التصحيح والحفظ يتمان على دفعات، والنتيجة تظهر في صفحة الانتظار.
+            ExamSubmissionService.submit(request.user, quiz, request.POST)
+            return redirect('courses:quiz_pending', pk=quiz.pk)
+
+        score, correct_answers, total_questions = QuizAnswerKeyService.grade(quiz, request.POST)
         
         submission, _ = QuizSubmission.objects.get_or_create(
-            student=request.user, quiz=quiz, defaults={'score': score}
+            student=request.user, quiz=quiz, defaults={
+                'score': score,
+                'correct_answers': correct_answers,
+                'total_questions': total_questions,
+            }
         )
         return redirect('courses:quiz_result', pk=submission.pk)
-    
-    @staticmethod
-    def calculate_score(post_data, quiz):
-        """دالة مساعدة لفصل منطق حساب الدرجة."""
-        correct_answers = 0
-        questions = quiz.questions.all()
-        total_questions = questions.count()
-        for question in questions:
-            selected_choice_id = post_data.get(f'question_{question.pk}')
-            if selected_choice_id:
-                correct_choice = next((c for c in question.choices.all() if c.is_correct), None)
-                if correct_choice and int(selected_choice_id) == correct_choice.id:
-                    correct_answers += 1
-        score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
-        return score, correct_answers
+
+
+class QuizPendingView(LoginRequiredMixin, View):
+    """
+    صفحة انتظار نتيجة اختبار في وضع الامتحان.
+    - تستطلعها HTMX كل ثانيتين، وعند حفظ النتيجة تُحوِّل المتصفح إلى صفحة النتيجة.
+    """
+    def get(self, request, *args, **kwargs):
+        quiz_id = kwargs['pk']
+        submission_id = QuizSubmission.objects.filter(
+            student=request.user, quiz_id=quiz_id
+        ).values_list('pk', flat=True).first()
+
+        if submission_id:
+            result_url = reverse('courses:quiz_result', args=[submission_id])
+            if request.htmx:
+                response = HttpResponse(status=204)
+                response['HX-Redirect'] = result_url
+                return response
+            return redirect(result_url)
+
+        if not ExamSubmissionService.is_pending(request.user.pk, quiz_id):
+            # لم يصل أي تقديم (أو انتهت مهلته): نعيد الطالب إلى الاختبار.
+            return redirect('courses:take_quiz', pk=quiz_id)
+        ExamSubmissionService.ensure_grading()
+
+        template_name = 'courses/partials/quiz_pending_status.html' if request.htmx else 'courses/quiz_pending.html'
+        return render(request, template_name, {'quiz_id': quiz_id})
 
 
 class QuizResultView(LoginRequiredMixin, DetailView):
@@ -186,8 +261,6 @@ class QuizResultView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         submission = self.object
         
-        total_questions = submission.quiz.questions.count()
-        correct_answers = round((submission.score / 100) * total_questions) if total_questions > 0 else 0
         
         # Calculations for the SVG donut chart are done here, not in the template.
         radius = 80
@@ -195,10 +268,58 @@ class QuizResultView(LoginRequiredMixin, DetailView):
         stroke_dashoffset = circumference * (1 - (submission.score / 100))
 
         context.update({
-            'total_questions': total_questions,
-            'correct_answers': correct_answers,
-            'wrong_answers': total_questions - correct_answers,
+            # العدادات محفوظة مع النتيجة وقت التصحيح، فلا حاجة لإعادة العد هنا.
+            'total_questions': submission.total_questions,
+            'correct_answers': submission.correct_answers,
+            'wrong_answers': submission.wrong_answers,
             'circumference': circumference,
             'stroke_dashoffset': stroke_dashoffset,
         })
-        return context
\ No newline at end of file
+        return context
+
+
+# =================================================================
+# STAFF VIEWS
+# =================================================================
+
+class MoveView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    نقل عنصر واحد بالسحب والإفلات (للمشرفين فقط).
+    - تستقبل جاري العنصر في موضعه الجديد (before و after، وأي منهما قد يغيب عند الطرفين)
+      وتعطيه قيمة order في منتصف الفجوة بينهما (order_between)، فيتغير صف واحد فقط.
+    - إعادة توزيع النطاق كله (respace) لا تحدث إلا عندما تنفد الفجوة بين الجارين.
+    """
+    SCOPES = {
+        # النوع: (النموذج، حقل النطاق)
+        'courses': (Course, 'learning_path'),
+        'modules': (Module, 'course'),
+        'lessons': (Lesson, 'module'),
+    }
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request, *args, **kwargs):
+        if kwargs['kind'] not in self.SCOPES:
+            raise Http404
+        model, scope_field = self.SCOPES[kwargs['kind']]
+        item = get_object_or_404(model, pk=kwargs['pk'])
+        try:
+            before_id, after_id = (int(request.POST[key]) if request.POST.get(key) else None for key in ('before', 'after'))
+        except ValueError:
+            return HttpResponse('معرّفات غير صالحة.', status=400)
+
+        # الجاران يجب أن يكونا عنصرين مختلفين من نفس النطاق غير العنصر المنقول.
+        siblings = model.objects.filter(**{f'{scope_field}_id': getattr(item, f'{scope_field}_id')}).exclude(pk=item.pk)
+        neighbours = siblings.in_bulk([pk for pk in (before_id, after_id) if pk])
+        if len(neighbours) != len({pk for pk in (before_id, after_id) if pk}) or (before_id and before_id == after_id):
+            return HttpResponse('يجب أن يكون الجاران من نفس النطاق.', status=400)
+        before, after = neighbours.get(before_id), neighbours.get(after_id)
+
+        with transaction.atomic():
+            model.objects.filter(pk=item.pk).update(order=order_between(siblings, before=before, after=after))
+            # UPDATE لا يطلق الإشارات، فنبطل مخطط الكورس يدويًا.
+            if model is not Course:
+                CourseOutlineService.invalidate(item.course_id)
+        return HttpResponse(status=204)
+
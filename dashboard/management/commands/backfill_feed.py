@@ -0,0 +1,16 @@
+# dashboard/management/commands/backfill_feed.py
+
+from django.core.management.base import BaseCommand
+
+from dashboard.services import FeedService
+
+
+class Command(BaseCommand):
+    help = 'Seeds the activity feeds (own and classmates) from solved problems, completed lessons, quizzes and badges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk statement.')
+
+    def handle(self, *args, **options):
+        written = FeedService.backfill(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {written} feed entry row(s) (existing ones are kept)."))
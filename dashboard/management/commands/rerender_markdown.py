@@ -0,0 +1,50 @@
+# dashboard/management/commands/rerender_markdown.py
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from dashboard.rendering import RENDERER_VERSION, RenderedMarkdownMixin, render_markdown
+
+
+class Command(BaseCommand):
+    help = 'Re-renders stored Markdown HTML for every row rendered with an older renderer version.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows updated per bulk statement.')
+        parser.add_argument('--force', action='store_true', help='Re-render every row, even up-to-date ones.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        models = [model for model in apps.get_models() if issubclass(model, RenderedMarkdownMixin)]
+
+        for model in models:
+            for source_field, html_field, version_field in model.markdown_fields:
+                stale = model.objects.all()
+                if not options['force']:
+                    stale = stale.filter(~Q(**{version_field: RENDERER_VERSION}))
+
+                updated = 0
+                batch = []
+                for obj in stale.only('pk', source_field).iterator(chunk_size=batch_size):
+                    setattr(obj, html_field, render_markdown(getattr(obj, source_field)))
+                    setattr(obj, version_field, RENDERER_VERSION)
+                    batch.append(obj)
+                    if len(batch) >= batch_size:
+                        updated += self._flush(model, batch, html_field, version_field)
+                if batch:
+                    updated += self._flush(model, batch, html_field, version_field)
+
+                self.stdout.write(f"  -> {model._meta.label}.{source_field}: {updated} row(s) re-rendered.")
+
+        self.stdout.write(self.style.SUCCESS(f"Markdown is up to date (renderer v{RENDERER_VERSION})."))
+
+    @staticmethod
+    def _flush(model, batch, html_field, version_field):
+        # bulk_update لا يستدعي save()، فلا يتغير updated_at للمذكرات.
+        with transaction.atomic():
+            model.objects.bulk_update(batch, [html_field, version_field])
+        count = len(batch)
+        batch.clear()
+        return count
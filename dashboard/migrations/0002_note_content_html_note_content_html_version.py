@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:19
+
+import markdown
+from django.db import migrations, models
+
+
+def render_existing_content(apps, schema_editor):
+    """معاينة المذكرات في لوحة التحكم تُقرأ من content_html، فنملؤه للمذكرات الحالية."""
+    Note = apps.get_model('dashboard', 'Note')
+    # امتدادات وقت كتابة الترحيل؛ rerender_markdown يحدّث الصفوف ذات النسخة 0.
+    renderer = markdown.Markdown(extensions=['fenced_code', 'codehilite'])
+    notes = list(Note.objects.only('pk', 'content'))
+    for obj in notes:
+        obj.content_html = renderer.reset().convert(obj.content or '')
+        obj.content_html_version = 0
+    Note.objects.bulk_update(notes, ['content_html', 'content_html_version'], batch_size=200)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='المحتوى (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_note_content_html_note_content_html_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(choices=[('SELF', 'نشاطي'), ('CLASSMATES', 'زملائي')], max_length=10)),
+                ('verb', models.CharField(choices=[('SOLVED', 'حل مسألة'), ('LESSON', 'أكمل درسًا'), ('QUIZ', 'أنهى اختبارًا'), ('BADGE', 'حصل على شارة')], max_length=10)),
+                ('title', models.CharField(max_length=255, verbose_name='العنوان')),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('event_key', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'نشاط في الخط الزمني',
+                'verbose_name_plural': 'الخط الزمني',
+                'indexes': [models.Index(fields=['owner', 'feed', '-id'], name='feed_entry_page_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'feed', 'event_key'), name='feed_entry_unique_event')],
+            },
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.db import models
 from django.utils.html import strip_tags
 from django.utils.text import Truncator
 
+from .rendering import RenderedMarkdownMixin
+
 
 class TaskManager(models.Manager):
     """
@@ -59,7 +61,7 @@ class Task(models.Model):
         self.save(update_fields=['is_completed'])
 
 
-class Note(models.Model):
+class Note(RenderedMarkdownMixin, models.Model):
     """
     Represents a private note or idea for a student. Supports Markdown.
     """
@@ -71,6 +73,9 @@ class Note(models.Model):
     )
     title = models.CharField("عنوان المذكرة", max_length=255, blank=False)
     content = models.TextField("المحتوى")
+    # HTML المولَّد من المحتوى وقت الحفظ (انظر RenderedMarkdownMixin).
+    content_html = models.TextField("المحتوى (HTML)", blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField("تاريخ الإنشاء", auto_now_add=True)
     updated_at = models.DateTimeField("آخر تحديث", auto_now=True)
 
@@ -79,6 +84,8 @@ class Note(models.Model):
         verbose_name_plural = "المذكرات"
         ordering = ['-updated_at']
 
+    markdown_fields = (('content', 'content_html', 'content_html_version'),)
+
     def __str__(self):
         return self.title
 
@@ -90,4 +97,43 @@ class Note(models.Model):
         """
         # strip_tags is important for security if markdown allows raw HTML
         plain_content = strip_tags(self.content)
-        return Truncator(plain_content).words(words, truncate=' ...')
\ No newline at end of file
+        return Truncator(plain_content).words(words, truncate=' ...')
+
+class FeedEntry(models.Model):
+    """
+    سطر في خط النشاط الزمني لمستخدم واحد، يُكتب مرة واحدة عند الحدث (fan-out on write).
+    - feed: خط المستخدم نفسه أو خط زملائه (نفس السنة الدراسية والمسار).
+    - event_key فريد لكل خط، فتكرار الحدث (حل المسألة مرة ثانية) لا يضيف سطرًا جديدًا.
+    - القراءة مسح واحد للفهرس (owner, feed, -id) مع ترقيم بالمؤشر (id أقل من آخر سطر).
+    """
+    class Feed(models.TextChoices):
+        SELF = 'SELF', 'نشاطي'
+        CLASSMATES = 'CLASSMATES', 'زملائي'
+
+    class Verb(models.TextChoices):
+        SOLVED = 'SOLVED', 'حل مسألة'
+        LESSON = 'LESSON', 'أكمل درسًا'
+        QUIZ = 'QUIZ', 'أنهى اختبارًا'
+        BADGE = 'BADGE', 'حصل على شارة'
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="feed_entries")
+    feed = models.CharField(max_length=10, choices=Feed.choices)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    verb = models.CharField(max_length=10, choices=Verb.choices)
+    title = models.CharField("العنوان", max_length=255)
+    url = models.CharField(max_length=255, blank=True)
+    event_key = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "نشاط في الخط الزمني"
+        verbose_name_plural = "الخط الزمني"
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'feed', 'event_key'], name='feed_entry_unique_event'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'feed', '-id'], name='feed_entry_page_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor} {self.get_verb_display()} {self.title}"
@@ -0,0 +1,117 @@
+# dashboard/rendering.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import markdown
+from django.conf import settings
+
+# غيّر هذا الرقم عند تعديل الامتدادات أو شكل المخرجات؛ الأمر rerender_markdown
+# يعيد بعدها توليد HTML لكل الصفوف التي تحمل نسخة أقدم.
+RENDERER_VERSION = 1
+
+
+# 1. امتداد مخصص لإضافة target="_blank" للروابط الخارجية
+class LinkTargetExtension(markdown.extensions.Extension):
+    """
+    امتداد مخصص لمكتبة Markdown ليقوم تلقائيًا بإضافة
+    target="_blank" و rel="noopener noreferrer" إلى جميع الروابط.
+    """
+    def extendMarkdown(self, md):
+        # TreeProcessor هو ما يسمح لنا بالتعديل على شجرة HTML بعد إنشائها
+        md.treeprocessors.register(LinkTargetProcessor(md), 'link_target', 15)
+
+class LinkTargetProcessor(markdown.treeprocessors.Treeprocessor):
+    def run(self, root):
+        # ابحث عن جميع وسوم الروابط 'a' في المستند
+        for element in root.iter("a"):
+            # أضف السمات المطلوبة
+            element.set("target", "_blank")
+            element.set("rel", "noopener noreferrer")
+        return root
+
+
+# كائن Markdown واحد لكل خيط (thread) بدل إنشاء كائن جديد مع كل عرض؛
+# الكائن غير آمن للاستخدام المتزامن لذلك لا نشاركه بين الخيوط.
+_local = threading.local()
+
+
+def _get_renderer():
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = markdown.Markdown(extensions=[
+            'fenced_code',  # لتفعيل كتل الكود باستخدام ```
+            'codehilite',   # لتفعيل تلوين الصيغة داخل كتل الكود (Pygments)
+            LinkTargetExtension(), # تفعيل الامتداد المخصص الذي أنشأناه
+        ])
+        _local.renderer = renderer
+    return renderer
+
+
+class RenderCache:
+    """
+    كاش LRU صغير داخل العملية، مفتاحه بصمة المحتوى (blake2b) وليس النص نفسه،
+    حتى لا يحتفظ الكاش بنسخ من النصوص الطويلة.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+render_cache = RenderCache(getattr(settings, 'MARKDOWN_RENDER_CACHE_SIZE', 512))
+
+
+def render_markdown(text):
+    """يحوّل Markdown إلى HTML، مع إعادة استخدام النتيجة للمحتوى المتطابق."""
+    text = text or ''
+    key = hashlib.blake2b(f"{RENDERER_VERSION}:{text}".encode(), digest_size=16).digest()
+    html = render_cache.get(key)
+    if html is None:
+        html = _get_renderer().reset().convert(text)
+        render_cache.set(key, html)
+    return html
+
+
+class RenderedMarkdownMixin:
+    """
+    يخزن HTML المولَّد بجانب حقل Markdown وقت الحفظ، مع رقم نسخة المحوِّل.
+    - markdown_fields: مجموعة من (حقل المصدر، حقل HTML، حقل النسخة).
+    """
+    markdown_fields = ()
+
+    def render_markdown_fields(self, update_fields=None):
+        rendered = []
+        for source_field, html_field, version_field in self.markdown_fields:
+            if update_fields is not None and source_field not in update_fields:
+                continue
+            setattr(self, html_field, render_markdown(getattr(self, source_field)))
+            setattr(self, version_field, RENDERER_VERSION)
+            rendered += [html_field, version_field]
+        return rendered
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        rendered = self.render_markdown_fields(update_fields)
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields) + rendered
+        super().save(*args, **kwargs)
@@ -0,0 +1,190 @@
+# dashboard/services.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Min, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+
+from .models import FeedEntry
+
+
+class FeedService:
+    """
+    خط النشاط الزمني المحسوب مسبقًا (fan-out on write).
+    - يصل الحدث عبر صندوق الأحداث (dashboard/subscribers.py)، و fan_out() يكتب سطرًا في
+      خط صاحبه وسطرًا في خط كل زميل (حتى FEED_MAX_FANOUT) بإدراج واحد.
+    - كل خط محدود بـ FEED_MAX_ENTRIES سطرًا؛ الأقدم يُحذف عند الكتابة إذا تجاوز الخط الحد.
+    - backfill() (الأمر backfill_feed) يبني الخطوط من السجل الموجود: المسائل المحلولة
+      والدروس المكتملة والاختبارات والشارات.
+    - page() قراءة بالمؤشر: مسح واحد لفهرس (owner, feed, -id) مهما طال الخط.
+    """
+    Feed = FeedEntry.Feed
+    Verb = FeedEntry.Verb
+    PAGE_SIZE = 10
+
+    @staticmethod
+    def event(actor_id, verb, title, url, event_key):
+        return {'actor_id': actor_id, 'verb': verb, 'title': title[:255], 'url': url, 'event_key': event_key}
+
+    @staticmethod
+    def classmates(actor_ids):
+        """{actor_id: [user_ids]} لزملاء نفس السنة الدراسية والمسار (المستخدمون النشطون أولًا)."""
+        User = get_user_model()
+        limit = getattr(settings, 'FEED_MAX_FANOUT', 500)
+        segments = {
+            pk: (academic_year, path)
+            for pk, academic_year, path in User.objects.filter(pk__in=actor_ids).values_list('pk', 'academic_year', 'path')
+        }
+        members = {}
+        for segment in set(segments.values()):
+            academic_year, path = segment
+            if academic_year is None or not path:
+                continue
+            members[segment] = list(
+                User.objects.filter(academic_year=academic_year, path=path, is_active=True)
+                .order_by(F('last_login').desc(nulls_last=True))
+                .values_list('pk', flat=True)[:limit + 1]
+            )
+        return {
+            actor_id: [pk for pk in members.get(segment, ()) if pk != actor_id][:limit]
+            for actor_id, segment in segments.items()
+        }
+
+    @classmethod
+    def fan_out(cls, events):
+        if not events:
+            return 0
+        classmates = cls.classmates({event['actor_id'] for event in events})
+        entries = []
+        for event in events:
+            entries.append(FeedEntry(owner_id=event['actor_id'], feed=cls.Feed.SELF, **event))
+            entries.extend(
+                FeedEntry(owner_id=owner_id, feed=cls.Feed.CLASSMATES, **event)
+                for owner_id in classmates.get(event['actor_id'], ())
+            )
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+            cls.trim({entry.owner_id for entry in entries})
+        return len(entries)
+
+    @staticmethod
+    def trim(owner_ids):
+        """
+        يحذف ما زاد عن FEED_MAX_ENTRIES في كل خط لهؤلاء المستخدمين. العدّ على الفهرس
+        (owner, feed, -id) أولًا، ودالة النافذة لا تمر إلا على خطوط من تجاوز الحد فعلًا.
+        """
+        limit = getattr(settings, 'FEED_MAX_ENTRIES', 200)
+        full_owner_ids = set(
+            FeedEntry.objects.filter(owner_id__in=owner_ids)
+            .values('owner_id', 'feed').annotate(total=Count('pk')).filter(total__gt=limit)
+            .values_list('owner_id', flat=True)
+        )
+        if not full_owner_ids:
+            return 0
+        overflow = list(
+            FeedEntry.objects.filter(owner_id__in=full_owner_ids)
+            .annotate(position=Window(RowNumber(), partition_by=[F('owner'), F('feed')], order_by=F('id').desc()))
+            .filter(position__gt=limit)
+            .values_list('pk', flat=True)
+        )
+        if overflow:
+            FeedEntry.objects.filter(pk__in=overflow).delete()
+        return len(overflow)
+
+    @classmethod
+    def history_events(cls):
+        """[(وقت الحدث، حدث)] من السجل الموجود، بنفس عناوين وروابط ومفاتيح المشتركين."""
+        from courses.models import Lesson, Quiz, QuizSubmission, StudentProgress
+        from gamification.models import Badge, StudentBadge
+        from problems.models import Problem, Submission
+
+        events = []
+        problems = dict(Problem.objects.values_list('pk', 'title'))
+        solved = (
+            Submission.objects.filter(status=Submission.Status.CORRECT)
+            .values('student_id', 'problem_id').annotate(at=Min('submitted_at'))
+            .values_list('student_id', 'problem_id', 'at')
+        )
+        for student_id, problem_id, at in solved.iterator():
+            events.append((at, cls.event(
+                student_id, cls.Verb.SOLVED, problems[problem_id],
+                reverse('problems:problem_detail', args=[problem_id]), f"problem:{student_id}:{problem_id}",
+            )))
+
+        lessons = {pk: (title, course_id) for pk, title, course_id in Lesson.objects.values_list('pk', 'title', 'course_id')}
+        completions = StudentProgress.objects.values_list('student_id', 'lesson_id', 'completed_at')
+        for student_id, lesson_id, at in completions.iterator():
+            title, course_id = lessons[lesson_id]
+            events.append((at, cls.event(
+                student_id, cls.Verb.LESSON, title,
+                reverse('courses:course_detail', args=[course_id]) + f'#lesson-{lesson_id}',
+                f"lesson:{student_id}:{lesson_id}",
+            )))
+
+        quizzes = dict(Quiz.objects.values_list('pk', 'title'))
+        submissions = QuizSubmission.objects.values_list('student_id', 'quiz_id', 'score', 'submitted_at')
+        for student_id, quiz_id, score, at in submissions.iterator():
+            events.append((at, cls.event(
+                student_id, cls.Verb.QUIZ, f"{quizzes[quiz_id]} ({score:.0f}%)",
+                reverse('courses:take_quiz', args=[quiz_id]), f"quiz:{student_id}:{quiz_id}",
+            )))
+
+        badges = {pk: f"{icon} {title}" for pk, icon, title in Badge.objects.values_list('pk', 'icon', 'title')}
+        badge_list_url = reverse('gamification:badge_list')
+        awards = StudentBadge.objects.values_list('student_id', 'badge_id', 'awarded_at')
+        for student_id, badge_id, at in awards.iterator():
+            events.append((at, cls.event(
+                student_id, cls.Verb.BADGE, badges[badge_id], badge_list_url, f"badge:{student_id}:{badge_id}",
+            )))
+        return events
+
+    @classmethod
+    def backfill(cls, batch_size=500):
+        """
+        يملأ خطوط SELF و CLASSMATES من السجل الموجود. يحتفظ لكل خط بأحدث FEED_MAX_ENTRIES
+        حدثًا فقط قبل الكتابة، ويُدرج الأقدم أولًا حتى يبقى ترتيب id زمنيًا.
+        آمن للتكرار: القيد الفريد (owner, feed, event_key) يتجاهل الموجود. يرجع عدد الأسطر المكتوبة.
+        """
+        limit = getattr(settings, 'FEED_MAX_ENTRIES', 200)
+        events = sorted(cls.history_events(), key=lambda item: item[0])
+        classmates = cls.classmates({event['actor_id'] for _, event in events})
+
+        # (owner_id, feed) -> أحدث limit حدثًا بترتيبها الزمني
+        feeds = {}
+        for position, (at, event) in enumerate(events):
+            owners = [(event['actor_id'], cls.Feed.SELF)]
+            owners += [(owner_id, cls.Feed.CLASSMATES) for owner_id in classmates.get(event['actor_id'], ())]
+            for owner in owners:
+                feeds.setdefault(owner, deque(maxlen=limit)).append(position)
+
+        rows = sorted((position, owner_id, feed) for (owner_id, feed), positions in feeds.items() for position in positions)
+        entries = [FeedEntry(owner_id=owner_id, feed=feed, **events[position][1]) for position, owner_id, feed in rows]
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+            # created_at يأخذ وقت الإدراج (auto_now_add)، فنعيده إلى وقت الحدث الأصلي.
+            times = {event['event_key']: at for at, event in events}
+            keys = list(times)
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                FeedEntry.objects.filter(event_key__in=batch).update(created_at=Case(
+                    *[When(event_key=key, then=Value(times[key])) for key in batch],
+                    output_field=DateTimeField(),
+                ))
+            cls.trim({owner_id for owner_id, _ in feeds})
+        return len(entries)
+
+    @classmethod
+    def page(cls, user, feed=FeedEntry.Feed.SELF, before=None, limit=None):
+        """يرجع (الأسطر، مؤشر الصفحة التالية أو None)."""
+        limit = limit or cls.PAGE_SIZE
+        queryset = FeedEntry.objects.filter(owner=user, feed=feed)
+        if before:
+            queryset = queryset.filter(id__lt=before)
+        entries = list(queryset.select_related('actor').order_by('-id')[:limit + 1])
+        next_cursor = entries[limit - 1].pk if len(entries) > limit else None
+        return entries[:limit], next_cursor
+
@@ -0,0 +1,58 @@
+# dashboard/subscribers.py
+
+from django.urls import reverse
+
+from courses.models import Lesson, Quiz
+from gamification.models import Badge
+from outbox.services import subscriber
+from problems.models import Problem
+
+from .services import FeedService
+
+# مفاتيح الأحداث بنفس صيغة مفاتيح سجل النقاط، فالحدث المكرر (أو الرسالة المعادة)
+# لا يضيف سطرًا ثانيًا بفضل القيد الفريد (owner, feed, event_key).
+
+
+@subscriber('lesson.completed')
+def feed_lesson_completion(payload):
+    student_id = payload['student_id']
+    lesson = Lesson.objects.filter(pk=payload['lesson_id']).only('title', 'course_id').first()
+    if lesson:
+        FeedService.fan_out([FeedService.event(
+            student_id, FeedService.Verb.LESSON, lesson.title,
+            reverse('courses:course_detail', args=[lesson.course_id]) + f'#lesson-{lesson.pk}',
+            f"lesson:{student_id}:{lesson.pk}",
+        )])
+
+
+@subscriber('quiz.submitted')
+def feed_quiz_submission(payload):
+    student_id = payload['student_id']
+    quiz = Quiz.objects.filter(pk=payload['quiz_id']).only('title').first()
+    if quiz:
+        FeedService.fan_out([FeedService.event(
+            student_id, FeedService.Verb.QUIZ, f"{quiz.title} ({payload['score']:.0f}%)",
+            reverse('courses:take_quiz', args=[quiz.pk]), f"quiz:{student_id}:{quiz.pk}",
+        )])
+
+
+@subscriber('problem.solved')
+def feed_solved_problem(payload):
+    student_id = payload['student_id']
+    problem = Problem.objects.filter(pk=payload['problem_id']).only('title').first()
+    if problem:
+        FeedService.fan_out([FeedService.event(
+            student_id, FeedService.Verb.SOLVED, problem.title,
+            reverse('problems:problem_detail', args=[problem.pk]), f"problem:{student_id}:{problem.pk}",
+        )])
+
+
+@subscriber('badge.awarded')
+def feed_badge(payload):
+    user_id = payload['user_id']
+    badge = Badge.objects.filter(pk=payload['badge_id']).only('title', 'icon').first()
+    if badge:
+        FeedService.fan_out([FeedService.event(
+            user_id, FeedService.Verb.BADGE, f"{badge.icon} {badge.title}",
+            reverse('gamification:badge_list'), f"badge:{user_id}:{badge.pk}",
+        )])
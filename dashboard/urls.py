@@ -10,6 +10,8 @@ from .views import (
     NoteCreateView,
     NoteUpdateView,
     NoteDeleteView,
+    FeedPageView,
+    TelegramDeliveryView,
 )
 
 app_name = 'dashboard' # BEST PRACTICE: Add an app namespace
@@ -28,4 +30,10 @@ urlpatterns = [
     path('note/new/', NoteCreateView.as_view(), name='note_create'),
     path('note/edit/<int:pk>/', NoteUpdateView.as_view(), name='note_update'),
     path('note/delete/<int:pk>/', NoteDeleteView.as_view(), name='note_delete'),
+
+    # Telegram notification preference (immediate / digest)
+    path('telegram/delivery/', TelegramDeliveryView.as_view(), name='telegram_delivery'),
+
+    # Activity Feed (HTMX keyset pagination)
+    path('feed/', FeedPageView.as_view(), name='feed'),
 ]
\ No newline at end of file
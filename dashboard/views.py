@@ -1,20 +1,20 @@
 # dashboard/views.py
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, OuterRef, Subquery
 from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 from django.conf import settings
 
 # Import models from all relevant apps
-from courses.models import Course, StudentProgress
-from problems.models import Submission
+from courses.models import CourseProgress
 from accounts.models import TelegramLink  # <-- استيراد نموذج ربط Telegram
+from gamification.services import ActivityService
 from .forms import NoteForm, TaskForm
 from .models import Note, Task
+from .services import FeedService
 
 # =================================================================
 # Main Dashboard View
@@ -49,6 +49,7 @@ class DashboardView(LoginRequiredMixin, ListView):
         telegram_link, _ = TelegramLink.objects.get_or_create(user=user)
         context['telegram_link'] = telegram_link
         context['telegram_bot_name'] = getattr(settings, 'TELEGRAM_BOT_NAME', 'codeplatform_bot')
+        context['telegram_digest_minutes'] = getattr(settings, 'TELEGRAM_DIGEST_MINUTES', 60)
 
         # --- Pre-calculated Stats ---
         stats = {
@@ -57,38 +58,26 @@ class DashboardView(LoginRequiredMixin, ListView):
             'rank': None, # حساب الترتيب مكلف، من الأفضل القيام به في صفحة مخصصة
         }
         context['stats'] = stats
+
+        # --- Activity Heatmap & Streaks (صفان من ActivityYear على الأكثر) ---
+        context['activity'] = ActivityService.summary(user)
         
         # --- Efficiently Fetch in-progress courses and their progress ---
-        # هذا الاستعلام المعقد يجلب عدد الدروس المكتملة كحقل إضافي لكل كورس
-        completed_lessons_subquery = StudentProgress.objects.filter(
-            student=user,
-            lesson__course=OuterRef('pk')
-        ).values('lesson__course').annotate(c=Count('pk')).values('c')
-
-        in_progress_course_ids = StudentProgress.objects.filter(
+        # صف CourseProgress مُجسَّد واحد لكل كورس، مرتب حسب آخر نشاط (فهرس student, -updated_at).
+        in_progress_records = CourseProgress.objects.filter(
             student=user
-        ).values_list('lesson__course_id', flat=True).distinct()
-
-        in_progress_courses_qs = Course.objects.filter(
-            pk__in=list(in_progress_course_ids)
-        ).select_related('instructor').annotate(
-            total_lessons_count=Count('lessons', distinct=True),
-            completed_lessons_count=Subquery(completed_lessons_subquery)
-        )[:3]
-
-        in_progress_courses_with_progress = []
-        for course in in_progress_courses_qs:
-            completed = course.completed_lessons_count or 0
-            total = course.total_lessons_count
-            percentage = round((completed / total) * 100) if total > 0 else 0
-            in_progress_courses_with_progress.append({'course': course, 'percentage': percentage})
+        ).select_related('course__instructor', 'last_lesson').order_by('-updated_at')[:3]
+
+        in_progress_courses_with_progress = [
+            {'course': progress.course, 'percentage': progress.percentage, 'last_lesson': progress.last_lesson}
+            for progress in in_progress_records
+        ]
         
         context['in_progress_courses_with_progress'] = in_progress_courses_with_progress
         
-        # --- Other Feeds ---
-        context['last_solved_problems'] = Submission.objects.filter(
-            student=user, status='Correct'
-        ).select_related('problem').order_by('-submitted_at')[:3]
+        # --- Activity Feed (خط زمني محسوب مسبقًا، أول صفحة من خط المستخدم نفسه) ---
+        entries, next_cursor = FeedService.page(user)
+        context.update({'feed': FeedService.Feed.SELF, 'feed_entries': entries, 'next_cursor': next_cursor})
         
         return context
 
@@ -121,6 +110,26 @@ class TaskDeleteView(LoginRequiredMixin, View):
         task.delete()
         return HttpResponse('')
 
+class TelegramDeliveryView(LoginRequiredMixin, View):
+    """يحفظ طريقة استلام إشعارات Telegram: فوري أو ملخص دوري."""
+    def post(self, request, *args, **kwargs):
+        delivery = request.POST.get('delivery')
+        if delivery in TelegramLink.Delivery.values:
+            TelegramLink.objects.filter(user=request.user).update(delivery=delivery)
+        return redirect('dashboard:dashboard')
+
+class FeedPageView(LoginRequiredMixin, View):
+    """صفحة من الخط الزمني (HTMX): ?feed=SELF|CLASSMATES&before=<آخر id معروض>."""
+    def get(self, request, *args, **kwargs):
+        feed = request.GET.get('feed')
+        if feed not in FeedService.Feed.values:
+            feed = FeedService.Feed.SELF
+        before = request.GET.get('before', '')
+        entries, next_cursor = FeedService.page(request.user, feed, int(before) if before.isdigit() else None)
+        return render(request, 'dashboard/partials/feed_entries.html', {
+            'feed': feed, 'feed_entries': entries, 'next_cursor': next_cursor, 'paginating': before.isdigit(),
+        })
+
 # =================================================================
 # Standard Note Views (Full page reload)
 # =================================================================
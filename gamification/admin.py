@@ -1,3 +1,25 @@
+# gamification/admin.py
+
 from django.contrib import admin
 
-# Register your models here.
+from .models import Badge, PointsTransaction
+
+
+@admin.register(Badge)
+class BadgeAdmin(admin.ModelAdmin):
+    """الشارة الجديدة تُمنح تلقائيًا لكل من تجاوز عتبتها (انظر gamification/signals.py)."""
+    list_display = ('title', 'icon', 'achievement_type', 'threshold')
+    list_filter = ('achievement_type',)
+    ordering = ('achievement_type', 'threshold')
+
+
+@admin.register(PointsTransaction)
+class PointsTransactionAdmin(admin.ModelAdmin):
+    """السجل إلحاقي فقط: للعرض والتدقيق، والتعديلات تتم بحركة ADJUSTMENT جديدة."""
+    list_display = ('user', 'points', 'reason', 'folded', 'created_at')
+    list_filter = ('reason', 'folded')
+    search_fields = ('user__username', 'idempotency_key')
+    list_select_related = ('user',)
+
+    def has_change_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
@@ -11,6 +11,5 @@ class GamificationConfig(AppConfig):
     verbose_name = "التحفيز والإنجازات"
 
     def ready(self):
-        # إذا قررت نقل الإشارات إلى هنا في المستقبل، فهذا هو المكان المناسب.
-        # import gamification.signals
-        pass
\ No newline at end of file
+        import gamification.signals
+        import gamification.subscribers
\ No newline at end of file
@@ -0,0 +1,539 @@
+# gamification/leaderboard.py
+
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import DailyScoreBucket
+
+
+def _load_scores():
+    return get_user_model().objects.values_list('pk', 'score').iterator(chunk_size=2000)
+
+
+def _with_ranks(entries):
+    """يحوّل [(user_id, score)] المرتبة تنازليًا إلى [(user_id, score, rank)] بترتيب تنافسي (1، 1، 3...)."""
+    ranked, rank, previous = [], 0, None
+    for position, (user_id, score) in enumerate(entries, start=1):
+        if score != previous:
+            rank, previous = position, score
+        ranked.append((user_id, score, rank))
+    return ranked
+
+
+class BaseLeaderboard:
+    """
+    فهرس مرتب للنقاط بدل Window(Rank()) على جدول المستخدمين كاملًا مع كل طلب.
+    - الترتيب تنافسي: rank = 1 + عدد المستخدمين الذين نقاطهم أعلى تمامًا.
+    - يحدّثه PointsLedgerService بعد كل تجميع، وإشارات CustomUser عند الإنشاء
+      أو التعديل اليدوي أو الحذف، والأمر rebuild_leaderboard يعيد بناءه من القاعدة.
+    """
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def update_scores(self, scores):
+        """scores: {user_id: score}"""
+        raise NotImplementedError
+
+    def remove(self, user_id):
+        raise NotImplementedError
+
+    def top(self, limit):
+        """يرجع [(user_id, score, rank)] لأعلى limit مستخدمين."""
+        raise NotImplementedError
+
+    def rank(self, user_id):
+        """يرجع (rank, score) للمستخدم، أو None إذا لم يكن في الفهرس."""
+        raise NotImplementedError
+
+    # لوحات الفترات والشرائح (ScoreBoard): الفهرس الذي يدعمها يحدّثها مع التجميع،
+    # وإلا تُحسب من القاعدة وتُخزن في الكاش.
+    SUPPORTS_BOARDS = False
+
+    def update_days(self, buckets):
+        """buckets: [(user_id, day, points)] مجاميع الأيام المتأثرة بعد التجميع."""
+
+    def update_segments(self, segments):
+        """segments: {user_id: (academic_year, path)}"""
+
+    def board_top(self, board, limit):
+        raise NotImplementedError
+
+    def board_rank(self, board, user_id):
+        raise NotImplementedError
+
+
+class InMemoryLeaderboard(BaseLeaderboard):
+    """
+    فهرس داخل العملية للتطوير (بدون Redis).
+    - مصفوفة مرتبة من (-score, user_id) وقاموس user_id -> score، فالترتيب = bisect.
+    - تحديثات هذه العملية تُطبق فورًا، وتغييرات العمليات الأخرى تظهر عند إعادة البناء
+      من القاعدة كل LEADERBOARD_MEMORY_TTL ثانية (بنفس أسلوب title_index في تطبيق البحث).
+      لا نعتمد على رقم نسخة في الكاش: LocMem لا يشاركه، والكاش المشترك كان يجبر كل
+      العمليات على إعادة بناء كاملة بعد كل تجميع للنقاط. للإنتاج استخدم 'redis'.
+    """
+
+    def __init__(self):
+        self._entries = []  # [(-score, user_id)] مرتبة
+        self._scores = {}   # user_id -> score
+        self._built_at = None  # time.monotonic() لآخر بناء كامل
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def rebuild(self):
+        built_at = time.monotonic()
+        scores = dict(_load_scores())
+        entries = sorted((-score, user_id) for user_id, score in scores.items())
+        with self._lock:
+            self._entries, self._scores, self._built_at = entries, scores, built_at
+        return len(entries)
+
+    def _is_stale(self):
+        ttl = getattr(settings, 'LEADERBOARD_MEMORY_TTL', 30)
+        return self._built_at is None or time.monotonic() - self._built_at >= ttl
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        if self._built_at is None:
+            with self._build_lock:
+                if self._is_stale():
+                    self.rebuild()
+        elif self._build_lock.acquire(blocking=False):
+            # خيط واحد يعيد البناء والبقية تقرأ النسخة الحالية.
+            try:
+                self.rebuild()
+            finally:
+                self._build_lock.release()
+
+    def _discard(self, user_id):
+        score = self._scores.pop(user_id, None)
+        if score is None:
+            return
+        position = bisect_left(self._entries, (-score, user_id))
+        if position < len(self._entries) and self._entries[position] == (-score, user_id):
+            del self._entries[position]
+
+    def _apply(self, change):
+        if self._built_at is None:
+            return  # لم يُبنَ بعد؛ سيُبنى كاملًا عند أول قراءة.
+        with self._lock:
+            change()
+
+    def update_scores(self, scores):
+        def change():
+            for user_id, score in scores.items():
+                self._discard(user_id)
+                self._scores[user_id] = score
+                insort(self._entries, (-score, user_id))
+        if scores:
+            self._apply(change)
+
+    def remove(self, user_id):
+        self._apply(lambda: self._discard(user_id))
+
+    def top(self, limit):
+        self._ensure_fresh()
+        with self._lock:
+            entries = self._entries[:limit]
+        return _with_ranks((user_id, -negative_score) for negative_score, user_id in entries)
+
+    def rank(self, user_id):
+        self._ensure_fresh()
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            # كل المدخلات قبل (-score,) نقاطها أعلى تمامًا
+            return bisect_left(self._entries, (-score,)) + 1, score
+
+
+class RedisLeaderboard(BaseLeaderboard):
+    """
+    فهرس في مجموعات Redis مرتبة (sorted sets) مشتركة بين كل العمليات.
+    - ZREVRANGE لأعلى N و ZCOUNT للترتيب، وكلاهما O(log n).
+    - إعادة البناء تكتب في مفتاح مؤقت ثم RENAME، فلا يرى القارئ فهرسًا نصف مبني.
+    - لوحات الأسبوع/الشهر: مجموعة لكل يوم (نقاط DailyScoreBucket) يكتبها التجميع،
+      ومجموعة لكل نافذة تنتهي اليوم تُبنى مرة واحدة بـ ZUNIONSTORE داخل Redis
+      ثم يحدّث التجميع مجاميع المستخدمين المتأثرين فيها مباشرة.
+    - الشرائح (السنة الدراسية/المسار) مجموعات عضوية، ولوحة الشريحة ZINTERSTORE
+      قصير العمر (LEADERBOARD_BOARD_TIMEOUT) بين النافذة والشريحة.
+    """
+    KEY = 'leaderboard:scores'
+    BUILT_KEY = 'leaderboard:built'
+    SEGMENTS_KEY = 'leaderboard:segments'  # hash: user_id -> [academic_year, path]
+    BOARDS_KEY = 'leaderboard:boards'  # set: مفاتيح لوحات الشرائح المبنية (لإسقاطها دون SCAN)
+    SUPPORTS_BOARDS = True
+
+    def __init__(self, redis_url=None):
+        import redis  # اعتماد اختياري: مثبت مع channels_redis
+        self.redis = redis.Redis.from_url(redis_url or settings.REDIS_URL)
+
+    # ---------------------------------------------------------------
+    # المفاتيح
+    # ---------------------------------------------------------------
+    @staticmethod
+    def _day_key(day):
+        return f'leaderboard:day:{day.isoformat()}'
+
+    @staticmethod
+    def _window_key(window, today):
+        return f'leaderboard:window:{window}:{today.isoformat()}'
+
+    @staticmethod
+    def _segment_keys(academic_year, path):
+        keys = []
+        if academic_year is not None:
+            keys.append(f'leaderboard:segment:year:{academic_year}')
+        if path:
+            keys.append(f'leaderboard:segment:path:{hashlib.blake2b(path.encode(), digest_size=8).hexdigest()}')
+        return keys
+
+    @staticmethod
+    def _windows():
+        return {window: days for window, days in ScoreBoard.WINDOWS.items() if days}
+
+    def _window_days(self, days, today):
+        return [self._day_key(today - timedelta(days=offset)) for offset in range(days)]
+
+    # ---------------------------------------------------------------
+    # البناء والتحديث
+    # ---------------------------------------------------------------
+    def rebuild(self, batch_size=2000):
+        temporary_key = f'{self.KEY}:rebuild'
+        self.redis.delete(temporary_key)
+        count, batch = 0, {}
+        for user_id, score in _load_scores():
+            batch[user_id] = score
+            if len(batch) >= batch_size:
+                count += self.redis.zadd(temporary_key, batch)
+                batch = {}
+        if batch:
+            count += self.redis.zadd(temporary_key, batch)
+        if count:
+            self.redis.rename(temporary_key, self.KEY)
+        else:
+            self.redis.delete(self.KEY)
+        self._rebuild_days(batch_size)
+        self._rebuild_segments(batch_size)
+        self.redis.set(self.BUILT_KEY, 1)
+        return count
+
+    def _rebuild_days(self, batch_size):
+        today = timezone.localdate()
+        longest = max(self._windows().values())
+        stale = self._window_days(longest, today) + [self._window_key(window, today) for window in self._windows()]
+        self.redis.delete(*stale)
+        buckets = DailyScoreBucket.objects.filter(day__gte=today - timedelta(days=longest - 1))
+        batch = []
+        for row in buckets.values_list('user_id', 'day', 'points').iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self._write_days(batch, today)
+                batch = []
+        self._write_days(batch, today)
+
+    def _rebuild_segments(self, batch_size):
+        stale = list(self.redis.scan_iter('leaderboard:segment:*')) + [self.SEGMENTS_KEY]
+        self.redis.delete(*stale)
+        users = get_user_model().objects.values_list('pk', 'academic_year', 'path')
+        batch = {}
+        for user_id, academic_year, path in users.iterator(chunk_size=batch_size):
+            batch[user_id] = (academic_year, path)
+            if len(batch) >= batch_size:
+                self.update_segments(batch)
+                batch = {}
+        self.update_segments(batch)
+
+    def _ensure_built(self):
+        # العلامة وحدها تكفي: فهرس بلا أي مستخدم له نقاط لا يوجد مفتاحه في Redis.
+        if not self.redis.exists(self.BUILT_KEY):
+            self.rebuild()
+
+    def _write_days(self, buckets, today):
+        """يكتب مجاميع الأيام داخل أطول نافذة؛ كل مفتاح يوم ينتهي بعد خروجه منها."""
+        longest = max(self._windows().values())
+        oldest = today - timedelta(days=longest - 1)
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id, day, points in buckets:
+            if day < oldest:
+                continue
+            key = self._day_key(day)
+            pipe.zadd(key, {user_id: points})
+            pipe.expire(key, timedelta(days=longest + 1))
+        pipe.execute()
+
+    def update_scores(self, scores):
+        if scores:
+            self.redis.zadd(self.KEY, scores)
+
+    def update_days(self, buckets):
+        if not buckets:
+            return
+        today = timezone.localdate()
+        self._write_days(buckets, today)
+        user_ids = sorted({user_id for user_id, _, _ in buckets})
+        for window, days in self._windows().items():
+            key = self._window_key(window, today)
+            if not self.redis.exists(key):
+                continue  # لم تُقرأ اليوم بعد؛ ستُبنى من مجموعات الأيام عند أول قراءة.
+            day_keys = self._window_days(days, today)
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                for day_key in day_keys:
+                    pipe.zscore(day_key, user_id)
+            values = pipe.execute()
+            totals = {
+                user_id: sum(value or 0 for value in values[position * days:(position + 1) * days])
+                for position, user_id in enumerate(user_ids)
+            }
+            self.redis.zadd(key, totals)
+
+    def update_segments(self, segments):
+        if not segments:
+            return
+        user_ids = list(segments)
+        previous = self.redis.hmget(self.SEGMENTS_KEY, user_ids)
+        pipe = self.redis.pipeline()
+        for user_id, old in zip(user_ids, previous):
+            if old is not None:
+                for key in self._segment_keys(*json.loads(old)):
+                    pipe.srem(key, user_id)
+            academic_year, path = segments[user_id]
+            for key in self._segment_keys(academic_year, path):
+                pipe.sadd(key, user_id)
+            pipe.hset(self.SEGMENTS_KEY, user_id, json.dumps([academic_year, path]))
+        # تغيير الشرائح نادر (تعديل الملف الشخصي)، فنسقط لوحات الشرائح لتُبنى من جديد.
+        pipe.delete(*self.redis.smembers(self.BOARDS_KEY), self.BOARDS_KEY)
+        pipe.execute()
+
+    def remove(self, user_id):
+        today = timezone.localdate()
+        old = self.redis.hget(self.SEGMENTS_KEY, user_id)
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.KEY, user_id)
+        for key in self._window_days(max(self._windows().values()), today):
+            pipe.zrem(key, user_id)
+        for window in self._windows():
+            pipe.zrem(self._window_key(window, today), user_id)
+        if old is not None:
+            for key in self._segment_keys(*json.loads(old)):
+                pipe.srem(key, user_id)
+        pipe.hdel(self.SEGMENTS_KEY, user_id)
+        pipe.execute()
+
+    # ---------------------------------------------------------------
+    # القراءة
+    # ---------------------------------------------------------------
+    def top(self, limit):
+        self._ensure_built()
+        entries = self.redis.zrevrange(self.KEY, 0, limit - 1, withscores=True)
+        return _with_ranks((int(member), int(score)) for member, score in entries)
+
+    def rank(self, user_id):
+        self._ensure_built()
+        score = self.redis.zscore(self.KEY, user_id)
+        if score is None:
+            return None
+        return self.redis.zcount(self.KEY, f'({score}', '+inf') + 1, int(score)
+
+    def _board_key(self, board):
+        self._ensure_built()
+        today = timezone.localdate()
+        if board.window == 'all':
+            source = self.KEY
+        else:
+            source = self._window_key(board.window, today)
+            if not self.redis.exists(source):
+                pipe = self.redis.pipeline()
+                pipe.zunionstore(source, self._window_days(ScoreBoard.WINDOWS[board.window], today))
+                pipe.expire(source, timedelta(days=2))
+                pipe.execute()
+        segments = self._segment_keys(board.academic_year, board.path)
+        if not segments:
+            return source
+        key = f'leaderboard:board:{board.window}:{board.segment_hash()}:{today.isoformat()}'
+        if not self.redis.exists(key):
+            pipe = self.redis.pipeline()
+            timeout = getattr(settings, 'LEADERBOARD_BOARD_TIMEOUT', 60)
+            pipe.zinterstore(key, {source: 1, **{segment: 0 for segment in segments}})
+            pipe.expire(key, timeout)
+            # السجل يعيش بقدر أحدث لوحة فيه، فلا يتراكم بمفاتيح انتهت.
+            pipe.sadd(self.BOARDS_KEY, key)
+            pipe.expire(self.BOARDS_KEY, timeout)
+            pipe.execute()
+        return key
+
+    @staticmethod
+    def _minimum(board):
+        # لوحات الفترات تضم فقط من كسب نقاطًا داخل النافذة.
+        return '-inf' if board.window == 'all' else '(0'
+
+    def board_top(self, board, limit):
+        key = self._board_key(board)
+        entries = self.redis.zrevrangebyscore(key, '+inf', self._minimum(board), start=0, num=limit, withscores=True)
+        return _with_ranks((int(member), int(score)) for member, score in entries)
+
+    def board_rank(self, board, user_id):
+        key = self._board_key(board)
+        score = self.redis.zscore(key, user_id)
+        if score is None or (board.window != 'all' and score <= 0):
+            return None
+        return self.redis.zcount(key, f'({score}', '+inf') + 1, int(score)
+
+
+LEADERBOARD_BACKENDS = {
+    'memory': InMemoryLeaderboard,
+    'redis': RedisLeaderboard,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_leaderboard(backend=None):
+    """يرجع فهرس الصدارة المحدد في الإعدادات (LEADERBOARD_BACKEND)؛ نسخة واحدة لكل عملية."""
+    backend = backend or getattr(settings, 'LEADERBOARD_BACKEND', 'memory')
+    with _instances_lock:
+        if backend not in _instances:
+            try:
+                leaderboard_class = LEADERBOARD_BACKENDS[backend]
+            except KeyError:
+                raise ValueError(f"Unknown leaderboard backend: {backend!r}")
+            _instances[backend] = leaderboard_class()
+        return _instances[backend]
+
+
+class ScoreBoard:
+    """
+    لوحات الصدارة حسب الفترة (أسبوع/شهر) والشريحة (السنة الدراسية/المسار).
+    - لوحة "كل الأوقات" بدون شريحة تُقرأ مباشرة من فهرس الصدارة أعلاه.
+    - مع فهرس Redis تُقرأ البقية من مجموعاته المرتبة التي يحدّثها التجميع.
+    - مع الفهرس المحلي تُبنى من القاعدة (جمع DailyScoreBucket داخل النافذة، أو score
+      للشرائح) وتُخزن في الكاش: أعلى BOARD_SIZE مستخدمين ومدرج تكراري للمجاميع
+      (عدد المستخدمين لكل مجموع) بدل مجموع كل مستخدم، فترتيب المستخدم الحالي bisect.
+    - المفتاح يتضمن تاريخ اليوم فتنزلق النافذة تلقائيًا مع بداية كل يوم.
+    """
+    WINDOWS = {'all': None, 'week': 7, 'month': 30}
+    WINDOW_LABELS = {'all': 'كل الأوقات', 'week': 'هذا الأسبوع', 'month': 'هذا الشهر'}
+    BOARD_SIZE = 100
+    PATHS_KEY = 'leaderboard:paths'
+    # غيّر هذا الرقم عند تغيير شكل اللوحة المخزنة لتجاهل النسخ القديمة تلقائيًا.
+    VERSION = 2
+
+    def __init__(self, window='all', academic_year=None, path=''):
+        self.window = window if window in self.WINDOWS else 'all'
+        self.academic_year = academic_year
+        self.path = path or ''
+
+    @property
+    def is_global(self):
+        return self.window == 'all' and self.academic_year is None and not self.path
+
+    def window_start(self):
+        days = self.WINDOWS[self.window]
+        if days is None:
+            return None
+        return timezone.localdate() - timedelta(days=days - 1)
+
+    def in_segment(self, user):
+        if self.academic_year is not None and user.academic_year != self.academic_year:
+            return False
+        return not self.path or user.path == self.path
+
+    def _segment_filter(self, prefix=''):
+        lookups = {}
+        if self.academic_year is not None:
+            lookups[f'{prefix}academic_year'] = self.academic_year
+        if self.path:
+            lookups[f'{prefix}path'] = self.path
+        return lookups
+
+    def segment_hash(self):
+        return hashlib.blake2b(f"{self.academic_year}:{self.path}".encode(), digest_size=8).hexdigest()
+
+    def _cache_key(self):
+        return f"leaderboard:board:v{self.VERSION}:{self.window}:{self.segment_hash()}:{timezone.localdate().isoformat()}"
+
+    def _compute(self):
+        start = self.window_start()
+        User = get_user_model()
+        if start is None:
+            users = User.objects.filter(**self._segment_filter())
+            entries = list(users.order_by('-score', 'pk').values_list('pk', 'score')[:self.BOARD_SIZE])
+            # التجميع داخل القاعدة: صف لكل مجموع مختلف وليس لكل مستخدم.
+            histogram = dict(users.values_list('score').annotate(users=Count('pk')).order_by())
+        else:
+            rows = (
+                DailyScoreBucket.objects.filter(day__gte=start, **self._segment_filter('user__'))
+                .values('user_id')
+                .annotate(total=Sum('points'))
+                .filter(total__gt=0)
+                .order_by('-total', 'user_id')
+                .values_list('user_id', 'total')
+            )
+            entries, histogram = [], {}
+            for user_id, total in rows.iterator(chunk_size=2000):
+                if len(entries) < self.BOARD_SIZE:
+                    entries.append((user_id, total))
+                histogram[total] = histogram.get(total, 0) + 1
+        # points تصاعديًا، و at_or_above[i] = عدد المستخدمين بمجموع >= points[i].
+        points = sorted(histogram)
+        at_or_above = [0] * (len(points) + 1)
+        for position in range(len(points) - 1, -1, -1):
+            at_or_above[position] = at_or_above[position + 1] + histogram[points[position]]
+        return {'entries': entries, 'points': points, 'at_or_above': at_or_above}
+
+    def _load(self):
+        timeout = getattr(settings, 'LEADERBOARD_BOARD_TIMEOUT', 60)
+        return cache.get_or_set(self._cache_key(), self._compute, timeout)
+
+    def top(self, limit):
+        """يرجع [(user_id, points, rank)] لأعلى limit مستخدمين في هذه اللوحة."""
+        leaderboard = get_leaderboard()
+        if self.is_global:
+            return leaderboard.top(limit)
+        if leaderboard.SUPPORTS_BOARDS:
+            return leaderboard.board_top(self, limit)
+        return _with_ranks(self._load()['entries'][:limit])
+
+    def user_points(self, user):
+        start = self.window_start()
+        if start is None:
+            return user.score
+        return DailyScoreBucket.objects.filter(user=user, day__gte=start).aggregate(total=Sum('points'))['total'] or 0
+
+    def rank(self, user):
+        """يرجع (rank, points) للمستخدم في هذه اللوحة، أو None إذا لم يكن ضمنها."""
+        leaderboard = get_leaderboard()
+        if self.is_global:
+            return leaderboard.rank(user.pk)
+        if not self.in_segment(user):
+            return None
+        if leaderboard.SUPPORTS_BOARDS:
+            return leaderboard.board_rank(self, user.pk)
+        points = self.user_points(user)
+        if self.window != 'all' and points <= 0:
+            return None
+        board = self._load()
+        return board['at_or_above'][bisect_right(board['points'], points)] + 1, points
+
+    @classmethod
+    def path_choices(cls):
+        """المسارات التي اختارها الطلاب فعلًا (CustomUser.path نص حر)."""
+        def load():
+            return list(
+                get_user_model().objects.exclude(path='')
+                .order_by('path').values_list('path', flat=True).distinct()
+            )
+        return cache.get_or_set(cls.PATHS_KEY, load, 3600)
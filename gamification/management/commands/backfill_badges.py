@@ -0,0 +1,18 @@
+# gamification/management/commands/backfill_badges.py
+
+from django.core.management.base import BaseCommand
+
+from gamification.services import BadgeService
+
+
+class Command(BaseCommand):
+    help = 'Recomputes achievement counters from lessons, problems and quizzes, then awards every earned badge in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per bulk statement.')
+
+    def handle(self, *args, **options):
+        counters, awards = BadgeService.backfill(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {counters} achievement counter(s); checked {awards} badge award(s) (existing ones are kept)."
+        ))
@@ -0,0 +1,25 @@
+# gamification/management/commands/fold_points_ledger.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from gamification.services import PointsLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Folds pending PointsTransaction rows into CustomUser.score (once, or periodically with --loop).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Transactions folded per database transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep folding every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between folds with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            folded = PointsLedgerService.fold_all(options['batch_size'])
+            if folded or not options['loop']:
+                self.stdout.write(f"Folded {folded} points transaction(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
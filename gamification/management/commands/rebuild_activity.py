@@ -0,0 +1,23 @@
+# gamification/management/commands/rebuild_activity.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import QuizSubmission, StudentProgress
+from gamification.models import ActivityYear
+from gamification.services import activity_day_counts, build_activity_years
+from problems.models import Submission
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-day ActivityYear rows from lesson, submission and quiz timestamps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk statement.')
+
+    def handle(self, *args, **options):
+        rows = build_activity_years(ActivityYear, activity_day_counts(StudentProgress, Submission, QuizSubmission))
+        with transaction.atomic():
+            ActivityYear.objects.all().delete()
+            ActivityYear.objects.bulk_create(rows, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} activity year row(s)."))
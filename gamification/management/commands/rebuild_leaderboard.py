@@ -0,0 +1,16 @@
+# gamification/management/commands/rebuild_leaderboard.py
+
+from django.core.management.base import BaseCommand
+
+from gamification.leaderboard import get_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Reseeds the leaderboard index (scores, daily window sets and segments) from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=['memory', 'redis'], help='Defaults to LEADERBOARD_BACKEND.')
+
+    def handle(self, *args, **options):
+        count = get_leaderboard(options['backend']).rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed the score of {count} user(s)."))
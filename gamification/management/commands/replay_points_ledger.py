@@ -0,0 +1,13 @@
+# gamification/management/commands/replay_points_ledger.py
+
+from django.core.management.base import BaseCommand
+
+from gamification.services import PointsLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds every CustomUser.score and the daily score buckets from scratch by summing the PointsTransaction ledger.'
+
+    def handle(self, *args, **options):
+        updated = PointsLedgerService.replay()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed the score of {updated} user(s) from the ledger."))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(verbose_name='النقاط')),
+                ('reason', models.CharField(choices=[('LESSON', 'إكمال درس'), ('QUIZ', 'اختبار'), ('PROBLEM', 'حل مسألة'), ('OPENING', 'الرصيد الافتتاحي'), ('ADJUSTMENT', 'تعديل يدوي')], max_length=20, verbose_name='السبب')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True, verbose_name='مفتاح عدم التكرار')),
+                ('folded', models.BooleanField(default=False, verbose_name='أُضيفت إلى الرصيد')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='التاريخ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'حركة نقاط',
+                'verbose_name_plural': 'سجل النقاط',
+                'indexes': [models.Index(condition=models.Q(('folded', False)), fields=['id'], name='points_unfolded_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# gamification/migrations/0003_opening_balances.py
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_opening_balances(apps, schema_editor):
+    """
+    ينقل النقاط الحالية إلى السجل كرصيد افتتاحي لكل مستخدم، حتى يعيد
+    replay_points_ledger بناء نفس النقاط. الحركات مجموعة مسبقًا (folded)
+    لأنها موجودة أصلًا في score.
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    PointsTransaction = apps.get_model('gamification', 'PointsTransaction')
+    balances = User.objects.filter(score__gt=0).values_list('pk', 'score')
+    PointsTransaction.objects.bulk_create(
+        [
+            PointsTransaction(
+                user_id=user_id,
+                points=score,
+                reason='OPENING',
+                idempotency_key=f"opening:{user_id}",
+                folded=True,
+            )
+            for user_id, score in balances.iterator()
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def remove_opening_balances(apps, schema_editor):
+    PointsTransaction = apps.get_model('gamification', 'PointsTransaction')
+    PointsTransaction.objects.filter(reason='OPENING').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0002_pointstransaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_balances, remove_opening_balances),
+    ]
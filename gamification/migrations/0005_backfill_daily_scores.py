@@ -0,0 +1,37 @@
+# gamification/migrations/0005_backfill_daily_scores.py
+
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_scores(apps, schema_editor):
+    """يبني صفوف النقاط اليومية من السجل الموجود (بدون الرصيد الافتتاحي)."""
+    PointsTransaction = apps.get_model('gamification', 'PointsTransaction')
+    DailyScoreBucket = apps.get_model('gamification', 'DailyScoreBucket')
+    totals = (
+        PointsTransaction.objects.exclude(reason='OPENING')
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(total=Sum('points'))
+        .values_list('user_id', 'day', 'total')
+    )
+    DailyScoreBucket.objects.bulk_create(
+        [DailyScoreBucket(user_id=user_id, day=day, points=total) for user_id, day, total in totals.iterator()],
+        batch_size=500,
+    )
+
+
+def remove_daily_scores(apps, schema_editor):
+    apps.get_model('gamification', 'DailyScoreBucket').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0004_dailyscorebucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_scores, remove_daily_scores),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0005_backfill_daily_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('achievement_type', models.CharField(choices=[('LESSONS', 'إكمال الدروس'), ('PROBLEMS', 'حل المسائل'), ('TESTS', 'اجتياز الاختبارات')], max_length=20, verbose_name='نوع الإنجاز')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='العدد')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievement_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'عداد إنجاز',
+                'verbose_name_plural': 'عدادات الإنجازات',
+                'unique_together': {('user', 'achievement_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# gamification/migrations/0007_seed_achievement_counters.py
+
+from django.conf import settings
+from django.db import migrations
+
+
+def seed_counters(apps, schema_editor):
+    """يبني عدادات الإنجازات من الدروس والمسائل والاختبارات الموجودة؛ منح الشارات يتم بالأمر backfill_badges."""
+    from gamification.services import achievement_counts
+
+    AchievementCounter = apps.get_model('gamification', 'AchievementCounter')
+    counts = achievement_counts(
+        apps.get_model('courses', 'StudentProgress'),
+        apps.get_model('problems', 'Submission'),
+        apps.get_model('courses', 'QuizSubmission'),
+        getattr(settings, 'BADGE_QUIZ_PASS_SCORE', 50),
+    )
+    AchievementCounter.objects.bulk_create(
+        [AchievementCounter(user_id=user_id, achievement_type=kind, count=count) for user_id, kind, count in counts],
+        batch_size=500,
+    )
+
+
+def remove_counters(apps, schema_editor):
+    apps.get_model('gamification', 'AchievementCounter').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0006_achievementcounter'),
+        ('courses', '0012_respace_order'),
+        ('problems', '0003_problem_test_case_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_counters, remove_counters),
+    ]
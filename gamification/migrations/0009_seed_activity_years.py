@@ -0,0 +1,31 @@
+# gamification/migrations/0009_seed_activity_years.py
+
+from django.db import migrations
+
+
+def seed_activity(apps, schema_editor):
+    """يبني صفوف النشاط السنوي من تواريخ الدروس والتقديمات والاختبارات الموجودة."""
+    from gamification.services import activity_day_counts, build_activity_years
+
+    ActivityYear = apps.get_model('gamification', 'ActivityYear')
+    counts = activity_day_counts(
+        apps.get_model('courses', 'StudentProgress'),
+        apps.get_model('problems', 'Submission'),
+        apps.get_model('courses', 'QuizSubmission'),
+    )
+    ActivityYear.objects.bulk_create(build_activity_years(ActivityYear, counts), batch_size=500)
+
+
+def remove_activity(apps, schema_editor):
+    apps.get_model('gamification', 'ActivityYear').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0008_activityyear'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_activity, remove_activity),
+    ]
@@ -25,4 +25,102 @@ class StudentBadge(models.Model):
     awarded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('student', 'badge') # الطالب لا يمكن أن يحصل على نفس الشارة مرتين
\ No newline at end of file
+        unique_together = ('student', 'badge') # الطالب لا يمكن أن يحصل على نفس الشارة مرتين
+
+
+class AchievementCounter(models.Model):
+    """
+    عداد إنجازات لكل (مستخدم، نوع إنجاز): دروس مكتملة، مسائل محلولة، اختبارات مجتازة.
+    يحدّثه BadgeService.refresh مع أحداث النطاق، فيُقارن بعتبات الشارات دون إعادة العدّ لكل شارة.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="achievement_counters")
+    achievement_type = models.CharField("نوع الإنجاز", max_length=20, choices=Badge.AchievementType.choices)
+    count = models.PositiveIntegerField("العدد", default=0)
+
+    class Meta:
+        verbose_name = "عداد إنجاز"
+        verbose_name_plural = "عدادات الإنجازات"
+        unique_together = ('user', 'achievement_type')
+
+    def __str__(self):
+        return f"{self.user} {self.get_achievement_type_display()}: {self.count}"
+
+
+class PointsTransaction(models.Model):
+    """
+    سجل نقاط إلحاقي فقط (append-only): كل منح للنقاط صف جديد بدل تحديث صف المستخدم.
+    - idempotency_key فريد، فتكرار نفس الحدث (إعادة إرسال، سباق بين طلبين) لا يمنح النقاط مرتين.
+    - folded: هل أُضيفت النقاط إلى CustomUser.score بعد؟ يجمعها PointsLedgerService.fold
+      على دفعات، ويعيد الأمر replay_points_ledger بناء النقاط من السجل بالكامل.
+    """
+    class Reason(models.TextChoices):
+        LESSON = 'LESSON', 'إكمال درس'
+        QUIZ = 'QUIZ', 'اختبار'
+        PROBLEM = 'PROBLEM', 'حل مسألة'
+        OPENING_BALANCE = 'OPENING', 'الرصيد الافتتاحي'
+        ADJUSTMENT = 'ADJUSTMENT', 'تعديل يدوي'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="points_transactions")
+    points = models.IntegerField("النقاط")
+    reason = models.CharField("السبب", max_length=20, choices=Reason.choices)
+    idempotency_key = models.CharField("مفتاح عدم التكرار", max_length=100, unique=True)
+    folded = models.BooleanField("أُضيفت إلى الرصيد", default=False)
+    created_at = models.DateTimeField("التاريخ", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "حركة نقاط"
+        verbose_name_plural = "سجل النقاط"
+        indexes = [
+            # المجمّع يقرأ الحركات غير المجموعة فقط، فالفهرس الجزئي يبقى صغيرًا.
+            models.Index(fields=['id'], condition=models.Q(folded=False), name='points_unfolded_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.points:+d} ({self.get_reason_display()})"
+
+
+
+class DailyScoreBucket(models.Model):
+    """
+    مجموع النقاط المكتسبة لكل (مستخدم، يوم)، تُحدَّث مع كل تجميع للسجل.
+    لوحات الأسبوع والشهر تُبنى بجمع صفوف الأيام داخل النافذة بدل المرور على السجل كاملًا.
+    الرصيد الافتتاحي لا يدخل هنا لأنه ليس نقاطًا مكتسبة في يوم بعينه.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_scores")
+    day = models.DateField("اليوم")
+    points = models.IntegerField("النقاط", default=0)
+
+    class Meta:
+        verbose_name = "نقاط يومية"
+        verbose_name_plural = "النقاط اليومية"
+        unique_together = ('user', 'day')
+        indexes = [
+            models.Index(fields=['day', 'user'], name='daily_score_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.day}: {self.points}"
+
+
+class ActivityYear(models.Model):
+    """
+    نشاط الطالب في سنة واحدة كبايت لكل يوم (عدد الأنشطة، يتشبع عند 255).
+    - day_counts: 366 بايت، البايت رقم i هو اليوم i+1 من السنة.
+    - خريطة النشاط والسلاسل (streaks) تُحسب من صفين على الأكثر (هذه السنة والسابقة)
+      بدل المرور على التقديمات والدروس والاختبارات. يحدّثها ActivityService.
+    """
+    DAYS = 366
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="activity_years")
+    year = models.PositiveSmallIntegerField("السنة")
+    day_counts = models.BinaryField("عدد الأنشطة لكل يوم", default=bytes(DAYS))
+    active_days = models.PositiveSmallIntegerField("أيام النشاط", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "نشاط سنوي"
+        verbose_name_plural = "النشاط السنوي"
+        unique_together = ('user', 'year')
+
+    def __str__(self):
+        return f"{self.user} {self.year}: {self.active_days}"
@@ -0,0 +1,443 @@
+# gamification/services.py
+
+import logging
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from courses.buffers import WriteBehindBuffer
+from outbox.services import publish_many
+from .leaderboard import get_leaderboard
+from .models import AchievementCounter, ActivityYear, Badge, DailyScoreBucket, PointsTransaction, StudentBadge
+
+logger = logging.getLogger(__name__)
+
+
+class PointsLedgerService:
+    """
+    منح النقاط عبر سجل PointsTransaction بدل تحديث صف CustomUser مع كل حدث.
+    - record() مجرد INSERT ... ON CONFLICT DO NOTHING على مفتاح عدم التكرار، فلا
+      يوجد قفل على صف المستخدم داخل معاملة الحدث.
+    - fold() يجمع الحركات غير المجموعة ويحدّث score لكل مستخدم بتحديث واحد.
+      يُستدعى تلقائيًا بعد ثوانٍ من آخر حركة (points_fold_buffer) ودوريًا عبر
+      الأمر fold_points_ledger. بعده تُنقل النقاط الجديدة إلى فهرس الصدارة.
+    """
+    Reason = PointsTransaction.Reason
+
+    @staticmethod
+    def lesson_key(student_id, lesson_id):
+        return f"lesson:{student_id}:{lesson_id}"
+
+    @staticmethod
+    def quiz_key(student_id, quiz_id):
+        return f"quiz:{student_id}:{quiz_id}"
+
+    @staticmethod
+    def problem_key(student_id, problem_id):
+        return f"problem:{student_id}:{problem_id}"
+
+    @classmethod
+    def record(cls, user_id, points, reason, idempotency_key):
+        return cls.record_many([(user_id, points, reason, idempotency_key)])
+
+    @classmethod
+    def record_many(cls, entries):
+        """entries: [(user_id, points, reason, idempotency_key)] ؛ الحركات المكررة تُتجاهل."""
+        transactions = [
+            PointsTransaction(user_id=user_id, points=points, reason=reason, idempotency_key=key)
+            for user_id, points, reason, key in entries
+            if user_id and points
+        ]
+        if not transactions:
+            return
+        PointsTransaction.objects.bulk_create(transactions, ignore_conflicts=True)
+        transaction.on_commit(lambda: points_fold_buffer.append(True, key='fold'))
+
+    @staticmethod
+    def _daily_buckets(transactions):
+        """يجمع حركات السجل إلى صفوف DailyScoreBucket لكل (مستخدم، يوم)."""
+        totals = (
+            transactions.exclude(reason=PointsTransaction.Reason.OPENING_BALANCE)
+            .annotate(day=TruncDate('created_at'))
+            .values('user_id', 'day')
+            .annotate(total=Sum('points'))
+            .values_list('user_id', 'day', 'total')
+        )
+        return [DailyScoreBucket(user_id=user_id, day=day, points=total) for user_id, day, total in totals]
+
+    @classmethod
+    def refresh_daily_buckets(cls, user_ids, days):
+        """
+        يعيد حساب أيام المستخدمين المتأثرة من السجل نفسه بدل الإضافة إليها،
+        فتكرار التجميع أو إعادة التشغيل لا يضاعف النقاط اليومية.
+        """
+        if not user_ids:
+            return []
+        buckets = cls._daily_buckets(PointsTransaction.objects.filter(user_id__in=user_ids, created_at__date__in=days))
+        DailyScoreBucket.objects.bulk_create(
+            buckets,
+            update_conflicts=True,
+            unique_fields=['user', 'day'],
+            update_fields=['points'],
+        )
+        return [(bucket.user_id, bucket.day, bucket.points) for bucket in buckets]
+
+    @classmethod
+    def fold(cls, batch_size=1000):
+        """
+        يضيف دفعة من الحركات غير المجموعة إلى CustomUser.score. يرجع عدد الحركات المجموعة.
+        الحركات تُعلَّم folded أولًا بشرط folded=False، فإذا سبقتنا عملية أخرى إلى بعضها
+        نتراجع عن الدفعة كاملة بدل جمعها مرتين.
+        """
+        User = get_user_model()
+        with transaction.atomic():
+            rows = list(
+                PointsTransaction.objects.filter(folded=False)
+                .order_by('pk')
+                .annotate(day=TruncDate('created_at'))
+                .values_list('pk', 'user_id', 'points', 'day')[:batch_size]
+            )
+            if not rows:
+                return 0
+            claimed = PointsTransaction.objects.filter(
+                pk__in=[row[0] for row in rows], folded=False
+            ).update(folded=True)
+            if claimed != len(rows):
+                transaction.set_rollback(True)
+                return 0
+
+            totals, days = {}, set()
+            for _, user_id, points, day in rows:
+                totals[user_id] = totals.get(user_id, 0) + points
+                days.add(day)
+            for user_id, points in totals.items():
+                User.objects.filter(pk=user_id).update(score=Greatest(F('score') + points, Value(0)))
+            buckets = cls.refresh_daily_buckets(list(totals), days)
+            scores = dict(User.objects.filter(pk__in=totals).values_list('pk', 'score'))
+
+            def update_leaderboard():
+                leaderboard = get_leaderboard()
+                leaderboard.update_scores(scores)
+                leaderboard.update_days(buckets)
+            transaction.on_commit(update_leaderboard)
+        return len(rows)
+
+    @classmethod
+    def fold_all(cls, batch_size=1000):
+        folded = 0
+        while True:
+            count = cls.fold(batch_size)
+            if not count:
+                return folded
+            folded += count
+
+    @classmethod
+    def replay(cls):
+        """يعيد حساب score والنقاط اليومية لكل المستخدمين من السجل بالكامل."""
+        User = get_user_model()
+        ledger_total = (
+            PointsTransaction.objects.filter(user=OuterRef('pk'))
+            .values('user')
+            .annotate(total=Sum('points'))
+            .values('total')
+        )
+        with transaction.atomic():
+            PointsTransaction.objects.filter(folded=False).update(folded=True)
+            updated = User.objects.update(score=Greatest(
+                Coalesce(Subquery(ledger_total, output_field=IntegerField()), Value(0)), Value(0)
+            ))
+            DailyScoreBucket.objects.all().delete()
+            DailyScoreBucket.objects.bulk_create(cls._daily_buckets(PointsTransaction.objects.all()), batch_size=500)
+            transaction.on_commit(lambda: get_leaderboard().rebuild())
+        return updated
+
+
+def achievement_counts(progress_model, submission_model, quiz_submission_model, pass_score, student_id=None, types=None):
+    """
+    يحسب العدادات من جداول المصدر بتجميع واحد لكل نوع: [(user_id, achievement_type, count)].
+    يقبل النماذج كمعاملات حتى يعمل مع النماذج التاريخية داخل الترحيلات.
+    student_id و types يقصران العدّ على مستخدم واحد و/أو أنواع محددة.
+    """
+    Type = Badge.AchievementType
+    querysets = (
+        (Type.LESSONS, progress_model.objects.all(), 'lesson_id'),
+        (Type.PROBLEMS, submission_model.objects.filter(status='Correct'), 'problem_id'),
+        (Type.TESTS, quiz_submission_model.objects.filter(score__gte=pass_score), 'quiz_id'),
+    )
+    for achievement_type, queryset, field in querysets:
+        if types is not None and achievement_type not in types:
+            continue
+        if student_id is not None:
+            queryset = queryset.filter(student_id=student_id)
+        totals = queryset.values('student_id').annotate(total=Count(field, distinct=True))
+        for user_id, total in totals.values_list('student_id', 'total').iterator():
+            yield user_id, achievement_type, total
+
+
+class BadgeService:
+    """
+    منح الشارات تزايديًا بدل فحص كل شارة مع كل حدث.
+    - AchievementCounter يحفظ عداد كل نوع لكل مستخدم، ويعيد refresh() عدّه من جداول
+      المصدر مع أحداث النطاق (lesson.completed، quiz.submitted، problem.solved)،
+      وليس من حركات النقاط: المسألة بصفر نقاط تُحسب، واجتياز الاختبار يُقرأ من درجته.
+    - فهرس مرتب من (العتبة، الشارة) لكل نوع في الكاش: الشارات التي تجاوزها العداد
+      للتو هي ما بين bisect(القيمة القديمة) و bisect(القيمة الجديدة).
+    - الشارات الجديدة تُدرج دفعة واحدة مع ignore_conflicts (الطالب لا يأخذ الشارة مرتين).
+    """
+    Type = Badge.AchievementType
+    INDEX_KEY = 'badges:threshold_index'
+
+    @staticmethod
+    def pass_score():
+        return getattr(settings, 'BADGE_QUIZ_PASS_SCORE', 50)
+
+    # ---------------------------------------------------------------
+    # فهرس العتبات
+    # ---------------------------------------------------------------
+    @classmethod
+    def threshold_index(cls):
+        """{achievement_type: ([thresholds مرتبة], [badge_ids بنفس الترتيب])}"""
+        def build():
+            index = {}
+            for badge_id, achievement_type, threshold in (
+                Badge.objects.order_by('threshold', 'pk').values_list('pk', 'achievement_type', 'threshold')
+            ):
+                thresholds, badge_ids = index.setdefault(achievement_type, ([], []))
+                thresholds.append(threshold)
+                badge_ids.append(badge_id)
+            return index
+        return cache.get_or_set(cls.INDEX_KEY, build, None)
+
+    @classmethod
+    def invalidate(cls):
+        cache.delete(cls.INDEX_KEY)
+
+    @classmethod
+    def crossed(cls, achievement_type, old_count, new_count):
+        """الشارات التي عتبتها في المدى (old_count, new_count]."""
+        thresholds, badge_ids = cls.threshold_index().get(achievement_type, ((), ()))
+        return badge_ids[bisect_right(thresholds, old_count):bisect_right(thresholds, new_count)]
+
+    # ---------------------------------------------------------------
+    # التحديث التزايدي
+    # ---------------------------------------------------------------
+    @classmethod
+    def refresh(cls, user_id, achievement_type):
+        """
+        يعيد عدّ نوع إنجاز واحد للمستخدم من جداول المصدر ويمنح الشارات التي تجاوزها للتو.
+        يُستدعى داخل معاملة المشترك؛ قفل صف العداد يجعل تكرار الحدث أو تزامنه آمنًا.
+        """
+        from courses.models import QuizSubmission, StudentProgress
+        from problems.models import Submission
+
+        count = next((
+            total for _, _, total in achievement_counts(
+                StudentProgress, Submission, QuizSubmission, cls.pass_score(),
+                student_id=user_id, types={achievement_type},
+            )
+        ), 0)
+        AchievementCounter.objects.get_or_create(user_id=user_id, achievement_type=achievement_type)
+        counter = AchievementCounter.objects.select_for_update().get(user_id=user_id, achievement_type=achievement_type)
+        if counter.count == count:
+            return 0
+        previous, counter.count = counter.count, count
+        counter.save(update_fields=['count'])
+
+        awards = [(user_id, badge_id) for badge_id in cls.crossed(achievement_type, previous, count)]
+        publish_many([('badge.awarded', {'user_id': user_id, 'badge_id': badge_id}) for user_id, badge_id in awards])
+        return cls.award(awards)
+
+    @staticmethod
+    def award(pairs, batch_size=1000):
+        """pairs: [(user_id, badge_id)] ؛ الشارات الممنوحة سابقًا تُتجاهل."""
+        StudentBadge.objects.bulk_create(
+            [StudentBadge(student_id=user_id, badge_id=badge_id) for user_id, badge_id in pairs],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        return len(pairs)
+
+    # ---------------------------------------------------------------
+    # المنح التاريخي
+    # ---------------------------------------------------------------
+    @classmethod
+    def award_badge(cls, badge, batch_size=1000):
+        """يمنح شارة لكل من تجاوز عتبتها مسبقًا، على دفعات من العدادات."""
+        user_ids = (
+            AchievementCounter.objects.filter(achievement_type=badge.achievement_type, count__gte=badge.threshold)
+            .order_by('user_id').values_list('user_id', flat=True)
+        )
+        awarded, batch = 0, []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append((user_id, badge.pk))
+            if len(batch) >= batch_size:
+                awarded += cls.award(batch, batch_size)
+                batch = []
+        return awarded + cls.award(batch, batch_size)
+
+    @classmethod
+    def backfill(cls, batch_size=1000):
+        """يعيد حساب كل العدادات من جداول المصدر ثم يمنح كل الشارات المستحقة. يرجع (عدادات، منح)."""
+        from courses.models import QuizSubmission, StudentProgress
+        from problems.models import Submission
+
+        counters = [
+            AchievementCounter(user_id=user_id, achievement_type=kind, count=count)
+            for user_id, kind, count in achievement_counts(StudentProgress, Submission, QuizSubmission, cls.pass_score())
+        ]
+        with transaction.atomic():
+            AchievementCounter.objects.bulk_create(
+                counters,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['user', 'achievement_type'],
+                update_fields=['count'],
+            )
+        cls.invalidate()
+        awarded = sum(cls.award_badge(badge, batch_size) for badge in Badge.objects.all())
+        return len(counters), awarded
+
+
+def activity_day_counts(progress_model, submission_model, quiz_submission_model):
+    """
+    يجمع أنشطة كل (مستخدم، يوم) من جداول المصدر بتجميع واحد لكل جدول: {(user_id, date): count}.
+    يقبل النماذج كمعاملات حتى يعمل مع النماذج التاريخية داخل الترحيلات.
+    """
+    counts = {}
+    for model, timestamp_field in (
+        (progress_model, 'completed_at'),
+        (submission_model, 'submitted_at'),
+        (quiz_submission_model, 'submitted_at'),
+    ):
+        rows = (
+            model.objects.annotate(day=TruncDate(timestamp_field))
+            .values('student_id', 'day')
+            .annotate(total=Count('pk'))
+            .values_list('student_id', 'day', 'total')
+        )
+        for user_id, day, total in rows.iterator():
+            counts[(user_id, day)] = counts.get((user_id, day), 0) + total
+    return counts
+
+
+def build_activity_years(activity_model, day_counts):
+    """يحوّل {(user_id, date): count} إلى صفوف ActivityYear (بايت لكل يوم)."""
+    years = {}
+    for (user_id, day), total in day_counts.items():
+        days = years.setdefault((user_id, day.year), bytearray(ActivityYear.DAYS))
+        days[day.timetuple().tm_yday - 1] = min(total, 255)
+    return [
+        activity_model(user_id=user_id, year=year, day_counts=bytes(days), active_days=sum(1 for c in days if c))
+        for (user_id, year), days in years.items()
+    ]
+
+
+class ActivityService:
+    """
+    خريطة النشاط (heatmap) وسلاسل الأيام المتتالية من ActivityYear.
+    - record() يزيد عداد اليوم تحت قفل الصف، بنفس أسلوب CourseProgress.set_lesson_bit.
+    - القراءة: صفا هذه السنة والسابقة يُدمجان في عدد صحيح كقناع بتات، البت k
+      هو اليوم قبل k يومًا؛ السلسلة الحالية = عدد الآحاد المتتالية في أوله،
+      وأطول سلسلة = عدد مرات (m &= m >> 1) حتى يصبح صفرًا.
+    """
+    HEATMAP_WEEKS = 53
+    WEEK_START = 5  # السبت
+    # أقل عدد أنشطة لكل مستوى لون (1..4)
+    LEVELS = (1, 2, 4, 7)
+
+    @staticmethod
+    def record(user_id, day=None, count=1):
+        day = day or timezone.localdate()
+        with transaction.atomic():
+            activity, _ = ActivityYear.objects.select_for_update().get_or_create(user_id=user_id, year=day.year)
+            days = bytearray(activity.day_counts)
+            position = day.timetuple().tm_yday - 1
+            if not days[position]:
+                activity.active_days += 1
+            days[position] = min(days[position] + count, 255)
+            activity.day_counts = bytes(days)
+            activity.save()
+        return activity
+
+    @staticmethod
+    def _day_counts(user_id, today):
+        """عدد الأنشطة لكل يوم من 1 يناير للسنة السابقة حتى اليوم (bytearray)."""
+        start = date(today.year - 1, 1, 1)
+        counts = bytearray((today - start).days + 1)
+        rows = ActivityYear.objects.filter(user_id=user_id, year__in=[today.year - 1, today.year])
+        for year, data in rows.values_list('year', 'day_counts'):
+            offset = (date(year, 1, 1) - start).days
+            length = min((date(year + 1, 1, 1) - date(year, 1, 1)).days, len(counts) - offset)
+            counts[offset:offset + length] = bytes(data)[:length]
+        return counts
+
+    @staticmethod
+    def streaks(mask):
+        """(السلسلة الحالية، أطول سلسلة) من قناع البتات؛ اليوم بدون نشاط بعد لا يقطع السلسلة."""
+        alive = mask if mask & 1 else mask >> 1
+        current = (alive ^ (alive + 1)).bit_length() - 1
+        longest = 0
+        while mask:
+            mask &= mask >> 1
+            longest += 1
+        return current, longest
+
+    @classmethod
+    def level(cls, count):
+        return bisect_right(cls.LEVELS, count)
+
+    @classmethod
+    def summary(cls, user, today=None):
+        """
+        يرجع {'weeks': [[{'date', 'count', 'level'} | None] * 7], 'current_streak',
+        'longest_streak', 'active_days'} لآخر HEATMAP_WEEKS أسبوعًا.
+        """
+        today = today or timezone.localdate()
+        counts = cls._day_counts(user.pk, today)
+        mask = int(''.join('1' if count else '0' for count in counts), 2)
+        current_streak, longest_streak = cls.streaks(mask)
+
+        last = len(counts) - 1  # موضع اليوم
+        first = today - timedelta(weeks=cls.HEATMAP_WEEKS - 1)
+        first -= timedelta(days=(first.weekday() - cls.WEEK_START) % 7)
+        weeks, active_days = [], 0
+        for week in range(cls.HEATMAP_WEEKS):
+            cells = []
+            for weekday in range(7):
+                day = first + timedelta(days=week * 7 + weekday)
+                position = last - (today - day).days
+                if day > today:
+                    cells.append(None)
+                    continue
+                count = counts[position] if position >= 0 else 0
+                active_days += bool(count)
+                cells.append({'date': day, 'count': count, 'level': cls.level(count)})
+            weeks.append(cells)
+        return {
+            'weeks': weeks,
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'active_days': active_days,
+        }
+
+
+def _fold_pending(_items):
+    PointsLedgerService.fold_all()
+
+
+# يجمع كل الحركات الجديدة بعد ثوانٍ من تسجيلها: كل الطلبات تُدمج في عنصر واحد،
+# فيحدث تجميع واحد لكل فترة مهما كثرت الحركات.
+points_fold_buffer = WriteBehindBuffer(
+    'points-fold',
+    _fold_pending,
+    max_size=2,
+    flush_interval=getattr(settings, 'POINTS_FOLD_SECONDS', 2),
+    merge_func=lambda pending, item: pending,
+)
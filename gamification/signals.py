@@ -0,0 +1,44 @@
+# gamification/signals.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboard import get_leaderboard
+from .models import Badge
+from .services import BadgeService
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_leaderboard_entry(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    المستخدمون الجدد والتعديل اليدوي للنقاط (لوحة الإدارة) يصلون إلى فهرس الصدارة،
+    وتغيير السنة الدراسية أو المسار ينقل المستخدم بين شرائح اللوحات.
+    """
+    fields = None if created or update_fields is None else set(update_fields)
+    if fields is None or 'score' in fields:
+        scores = {instance.pk: instance.score}
+        transaction.on_commit(lambda: get_leaderboard().update_scores(scores))
+    if fields is None or fields & {'academic_year', 'path'}:
+        segments = {instance.pk: (instance.academic_year, instance.path)}
+        transaction.on_commit(lambda: get_leaderboard().update_segments(segments))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_leaderboard_entry(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: get_leaderboard().remove(user_id))
+
+
+@receiver(post_save, sender=Badge)
+def award_new_badge(sender, instance, **kwargs):
+    """شارة جديدة أو عتبة معدلة: يُعاد بناء فهرس العتبات وتُمنح لمن تجاوزها مسبقًا."""
+    BadgeService.invalidate()
+    transaction.on_commit(lambda: BadgeService.award_badge(instance))
+
+
+@receiver(post_delete, sender=Badge)
+def drop_badge_from_index(sender, instance, **kwargs):
+    BadgeService.invalidate()
+
@@ -0,0 +1,66 @@
+# gamification/subscribers.py
+
+from datetime import date
+
+from outbox.services import subscriber
+from problems.models import Problem
+
+from .services import ActivityService, BadgeService, PointsLedgerService
+
+# كل المشتركين هنا آمنون للتكرار: النقاط عبر مفاتيح عدم التكرار، وعدادات الشارات لأنها
+# تُعاد عدًّا من جداول المصدر، والنشاط لأن العامل ينفذ المشترك في نفس المعاملة التي تعلّم
+# الرسالة كمنفذة.
+
+LESSON_POINTS = 10
+
+
+@subscriber('lesson.completed')
+def award_lesson_points(payload):
+    student_id = payload['student_id']
+    PointsLedgerService.record(
+        student_id, LESSON_POINTS, PointsLedgerService.Reason.LESSON,
+        PointsLedgerService.lesson_key(student_id, payload['lesson_id']),
+    )
+
+
+@subscriber('quiz.submitted')
+def award_quiz_points(payload):
+    student_id = payload['student_id']
+    PointsLedgerService.record(
+        student_id, int(payload['score'] / 10), PointsLedgerService.Reason.QUIZ,
+        PointsLedgerService.quiz_key(student_id, payload['quiz_id']),
+    )
+
+
+@subscriber('problem.solved')
+def award_problem_points(payload):
+    student_id, problem_id = payload['student_id'], payload['problem_id']
+    points = Problem.objects.filter(pk=problem_id).values_list('points', flat=True).first()
+    if points:
+        PointsLedgerService.record(
+            student_id, points, PointsLedgerService.Reason.PROBLEM,
+            PointsLedgerService.problem_key(student_id, problem_id),
+        )
+
+
+@subscriber('lesson.completed')
+@subscriber('quiz.submitted')
+@subscriber('problem.submitted')
+def record_activity(payload):
+    ActivityService.record(payload['student_id'], date.fromisoformat(payload['day']))
+
+
+@subscriber('lesson.completed')
+def count_completed_lessons(payload):
+    BadgeService.refresh(payload['student_id'], BadgeService.Type.LESSONS)
+
+
+@subscriber('quiz.submitted')
+def count_passed_quizzes(payload):
+    if payload['score'] >= BadgeService.pass_score():
+        BadgeService.refresh(payload['student_id'], BadgeService.Type.TESTS)
+
+
+@subscriber('problem.solved')
+def count_solved_problems(payload):
+    BadgeService.refresh(payload['student_id'], BadgeService.Type.PROBLEMS)
@@ -0,0 +1,24 @@
+# outbox/admin.py
+
+from django.contrib import admin, messages
+
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """للمراقبة: الرسائل الفاشلة نهائيًا يمكن إعادتها إلى الانتظار بعد إصلاح السبب."""
+    list_display = ('topic', 'handler', 'status', 'attempts', 'available_at', 'processed_at')
+    list_filter = ('status', 'topic')
+    search_fields = ('handler', 'last_error')
+    readonly_fields = [field.name for field in OutboxMessage._meta.fields]
+    actions = ['retry']
+
+    def has_add_permission(self, request): return False
+
+    @admin.action(description="إعادة المحاولة")
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=OutboxMessage.Status.DONE).update(
+            status=OutboxMessage.Status.PENDING, attempts=0, lease_token='', lease_owner='', lease_expires_at=None,
+        )
+        self.message_user(request, f"أعيدت {count} رسالة إلى الانتظار.", messages.SUCCESS)
@@ -0,0 +1,51 @@
+# outbox/management/commands/run_outbox_worker.py
+
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.services import OutboxProcessor
+
+
+class Command(BaseCommand):
+    help = 'Runs an outbox worker that delivers pending side-effect messages with leases and retries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}",
+                            help='Unique name for this worker (defaults to host:pid).')
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages to claim per round.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--lease-seconds', type=int, default=None, help='Lease duration for claimed messages.')
+        parser.add_argument('--purge-every', type=int, default=3600,
+                            help='Seconds between deletions of old delivered messages.')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit.')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id']
+        processor = OutboxProcessor(worker_id, lease_seconds=options['lease_seconds'])
+        self.stdout.write(self.style.SUCCESS(f"Outbox worker '{worker_id}' started."))
+
+        last_purge = 0
+        try:
+            while True:
+                if time.monotonic() - last_purge >= options['purge_every']:
+                    purged = processor.purge()
+                    if purged:
+                        self.stdout.write(f"Purged {purged} delivered message(s).")
+                    last_purge = time.monotonic()
+
+                results = processor.run_batch(options['batch_size'])
+                if results:
+                    summary = ', '.join(f"{status or 'lost lease'}: {count}" for status, count in results.items())
+                    self.stdout.write(f"  -> {summary}")
+
+                if options['once'] and not results:
+                    break
+                if not results:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.WARNING(f"Outbox worker '{worker_id}' stopped."))
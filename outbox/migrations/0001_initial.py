@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100, verbose_name='الحدث')),
+                ('handler', models.CharField(max_length=200, verbose_name='المشترك')),
+                ('payload', models.JSONField(default=dict, verbose_name='البيانات')),
+                ('status', models.CharField(choices=[('PENDING', 'في الانتظار'), ('DONE', 'تم'), ('FAILED', 'فشل نهائي')], default='PENDING', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='المحاولات')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='متاح للتنفيذ من')),
+                ('lease_token', models.CharField(blank=True, max_length=32)),
+                ('lease_owner', models.CharField(blank=True, max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'رسالة صادرة',
+                'verbose_name_plural': 'صندوق الأحداث',
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['available_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
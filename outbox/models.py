@@ -0,0 +1,46 @@
+# outbox/models.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    أثر جانبي مؤجل (منح نقاط، نشاط، خط زمني، رسالة Telegram) يُكتب في نفس معاملة
+    الحدث الأساسي، فلا يضيع إذا فشل الطلب بعدها ولا يُنفذ إذا تراجعت المعاملة.
+    - صف واحد لكل (حدث، مشترك)، فكل مشترك يُعاد تشغيله مستقلًا عند الفشل.
+    - العمال (run_outbox_worker) يحجزون الصفوف بحجوزات محدودة المدة مثل طابور التحكيم؛
+      التسليم "مرة واحدة على الأقل"، لذلك يجب أن يكون كل مشترك آمنًا للتكرار.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'في الانتظار'
+        DONE = 'DONE', 'تم'
+        FAILED = 'FAILED', 'فشل نهائي'
+
+    topic = models.CharField("الحدث", max_length=100)
+    handler = models.CharField("المشترك", max_length=200)
+    payload = models.JSONField("البيانات", default=dict)
+    status = models.CharField("الحالة", max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField("المحاولات", default=0)
+    available_at = models.DateTimeField("متاح للتنفيذ من", default=timezone.now)
+    lease_token = models.CharField(max_length=32, blank=True)
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField("آخر خطأ", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "رسالة صادرة"
+        verbose_name_plural = "صندوق الأحداث"
+        indexes = [
+            # العمال يقرأون الرسائل المعلقة فقط، فالفهرس الجزئي يبقى صغيرًا.
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=models.Q(status='PENDING'),
+                name='outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} -> {self.handler} ({self.get_status_display()})"
@@ -0,0 +1,191 @@
+# outbox/services.py
+
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from courses.buffers import WriteBehindBuffer
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# topic -> {handler_name: (function, atomic)}
+_subscribers = {}
+
+
+def subscriber(topic, atomic=True):
+    """
+    يسجل دالة كمشترك في حدث. تُستدعى بـ (payload) داخل معاملة، ويجب أن تكون
+    آمنة للتكرار (idempotent) لأن التسليم مرة واحدة على الأقل.
+    atomic=False للمشتركين الذين ينتظرون الشبكة (Telegram): يُستدعون خارج أي معاملة
+    ويفتحون معاملاتهم القصيرة بأنفسهم، فلا تبقى قاعدة SQLite مقفلة أثناء الإرسال.
+    """
+    def register(func):
+        _subscribers.setdefault(topic, {})[f"{func.__module__}.{func.__qualname__}"] = (func, atomic)
+        return func
+    return register
+
+
+def publish(topic, payload, delay=None):
+    """يكتب الحدث في صندوق الأحداث ضمن المعاملة الحالية: صف لكل مشترك."""
+    return publish_many([(topic, payload)], delay=delay)
+
+
+def publish_many(events, delay=None):
+    """
+    events: [(topic, payload)] ؛ إدراج واحد لكل الأحداث ومشتركيها.
+    delay (ثوانٍ) يؤجل تسليم الرسائل، مثل ملخصات الإشعارات الدورية.
+    """
+    available_at = timezone.now() + timedelta(seconds=delay or 0)
+    messages = [
+        OutboxMessage(topic=topic, handler=handler, payload=payload, available_at=available_at)
+        for topic, payload in events
+        for handler in _subscribers.get(topic, ())
+    ]
+    if not messages:
+        return 0
+    OutboxMessage.objects.bulk_create(messages)
+    if getattr(settings, 'OUTBOX_DRAIN_IN_PROCESS', settings.DEBUG):
+        transaction.on_commit(lambda: outbox_drain_buffer.append(True, key='drain'))
+    return len(messages)
+
+
+def schedule(topic, payload=None, delay=None):
+    """
+    ينشر الحدث إلا إذا كان له رسالة معلقة لم يحجزها عامل بعد، فتكرار الجدولة
+    (مثل تفريغ الملخصات بعد كل حدث) لا يضيف رسائل. يرجع True إذا نُشر.
+    """
+    now = timezone.now()
+    waiting = OutboxMessage.objects.filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+        topic=topic, status=OutboxMessage.Status.PENDING,
+    )
+    if waiting.exists():
+        return False
+    publish(topic, payload or {}, delay=delay)
+    return True
+
+
+class OutboxProcessor:
+    """
+    يحجز الرسائل المعلقة وينفذها، بنفس أسلوب DatabaseJudgeQueue.
+    - الحجز UPDATE مشروط واحد بدفعة، فلا يأخذ عاملان نفس الرسالة.
+    - المشترك يعمل داخل معاملة مع تعليم الرسالة DONE بشرط أن الحجز ما زال لنا،
+      فآثار قاعدة البيانات تُطبق مرة واحدة، والآثار الخارجية (Telegram) مرة على الأقل.
+      مشتركو atomic=False يعملون خارج المعاملة ثم تُعلَّم الرسالة DONE بعدهم.
+    - الفشل يؤجل الرسالة بتراجع أُسّي، وبعد OUTBOX_MAX_ATTEMPTS تصبح FAILED.
+    """
+
+    def __init__(self, worker_id, lease_seconds=None, max_attempts=None):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds or getattr(settings, 'OUTBOX_LEASE_SECONDS', 60)
+        self.max_attempts = max_attempts or getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+
+    def _claimable(self, now):
+        return OutboxMessage.objects.filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+            status=OutboxMessage.Status.PENDING,
+            available_at__lte=now,
+        )
+
+    def claim(self, batch_size=100):
+        now = timezone.now()
+        candidate_ids = list(
+            self._claimable(now).order_by('available_at', 'pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+        token = uuid.uuid4().hex
+        self._claimable(now).filter(pk__in=candidate_ids).update(
+            lease_token=token,
+            lease_owner=self.worker_id,
+            lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+            attempts=F('attempts') + 1,
+        )
+        return list(OutboxMessage.objects.filter(lease_token=token).order_by('pk'))
+
+    def _finish(self, message, **fields):
+        return OutboxMessage.objects.filter(
+            pk=message.pk, lease_token=message.lease_token, status=OutboxMessage.Status.PENDING,
+        ).update(lease_token='', lease_owner='', lease_expires_at=None, **fields)
+
+    def renew(self, message):
+        """يمد حجز رسالة قبل تنفيذها؛ False إذا فقدناه (انتهى وحجزها عامل آخر)."""
+        return bool(OutboxMessage.objects.filter(
+            pk=message.pk, lease_token=message.lease_token, status=OutboxMessage.Status.PENDING,
+        ).update(lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)))
+
+    def process(self, message):
+        """ينفذ رسالة محجوزة. يرجع الحالة الجديدة أو None إذا فقدنا الحجز."""
+        handler, atomic = _subscribers.get(message.topic, {}).get(message.handler, (None, True))
+        if handler is None:
+            self._finish(message, status=OutboxMessage.Status.FAILED, last_error="No subscriber registered.")
+            return OutboxMessage.Status.FAILED
+        try:
+            if not atomic:
+                handler(message.payload)
+                if not self._finish(message, status=OutboxMessage.Status.DONE, processed_at=timezone.now()):
+                    return None
+                return OutboxMessage.Status.DONE
+            with transaction.atomic():
+                handler(message.payload)
+                if not self._finish(message, status=OutboxMessage.Status.DONE, processed_at=timezone.now()):
+                    transaction.set_rollback(True)
+                    return None
+            return OutboxMessage.Status.DONE
+        except Exception:
+            logger.exception("Outbox handler %s failed for message #%s", message.handler, message.pk)
+            failed = message.attempts >= self.max_attempts
+            # تراجع أُسّي: 2، 4، 8... ثوانٍ بحد أقصى ساعة
+            delay = min(2 ** message.attempts, 3600)
+            self._finish(
+                message,
+                status=OutboxMessage.Status.FAILED if failed else OutboxMessage.Status.PENDING,
+                available_at=timezone.now() + timedelta(seconds=delay),
+                last_error=traceback.format_exc()[-2000:],
+            )
+            return OutboxMessage.Status.FAILED if failed else OutboxMessage.Status.PENDING
+
+    def run_batch(self, batch_size=100):
+        """يحجز دفعة وينفذها. يرجع {status: count}."""
+        results = {}
+        for message in self.claim(batch_size):
+            # الدفعة تُحجز مرة واحدة، فنمد حجز كل رسالة قبل تنفيذها حتى لا تنتهي مهلة
+            # الرسائل الأخيرة أثناء تنفيذ ما قبلها (مثل دفعات Telegram الطويلة).
+            status = self.process(message) if self.renew(message) else None
+            results[status] = results.get(status, 0) + 1
+        return results
+
+    def drain(self, batch_size=100):
+        while self.run_batch(batch_size):
+            pass
+
+    @staticmethod
+    def purge(older_than_days=None):
+        """يحذف الرسائل المنفذة الأقدم من OUTBOX_RETENTION_DAYS."""
+        days = older_than_days if older_than_days is not None else getattr(settings, 'OUTBOX_RETENTION_DAYS', 7)
+        deleted, _ = OutboxMessage.objects.filter(
+            status=OutboxMessage.Status.DONE, processed_at__lt=timezone.now() - timedelta(days=days),
+        ).delete()
+        return deleted
+
+
+def _drain_in_process(_items):
+    OutboxProcessor(worker_id='web-drain').drain()
+
+
+# في التطوير (عملية واحدة بدون عامل) تُنفذ الأحداث من خيط خلفي بعد ثوانٍ من الطلب؛
+# يعمل افتراضيًا مع DEBUG فقط، وفي الإنتاج يترك العمل لـ run_outbox_worker.
+outbox_drain_buffer = WriteBehindBuffer(
+    'outbox-drain',
+    _drain_in_process,
+    max_size=2,
+    flush_interval=getattr(settings, 'OUTBOX_DRAIN_SECONDS', 1),
+    merge_func=lambda pending, item: pending,
+)
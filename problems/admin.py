@@ -1,7 +1,6 @@
 # problems/admin.py
 
 from django.contrib import admin
-from django.db.models import Count
 from .models import Problem, TestCase, Submission
 
 # =================================================================
@@ -31,17 +30,8 @@ class ProblemAdmin(admin.ModelAdmin):
     list_filter = ('difficulty',)
     search_fields = ('title', 'description')
     inlines = [TestCaseInline]
-
-    # 2. FIX (Performance): Annotate to get test case count efficiently.
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(test_case_count=Count('test_cases'))
-        return queryset
-
-    def test_case_count(self, obj):
-        return obj.test_case_count
-    test_case_count.short_description = "عدد حالات الاختبار"
-    test_case_count.admin_order_field = 'test_case_count'
+    # test_case_count عمود مخزَّن تحافظ عليه الإشارات، فلا حاجة لـ annotate هنا.
+    readonly_fields = ('test_case_count',)
 
 
 @admin.register(Submission)
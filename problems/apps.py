@@ -5,6 +5,6 @@ class ProblemsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'problems'
     
-    # تأكد من أن دالة ready فارغة أو محذوفة
     def ready(self):
-        pass
\ No newline at end of file
+        # تسجيل إشارات العدادات المخزنة (منح النقاط يتم في courses/signals.py).
+        import problems.signals
\ No newline at end of file
@@ -0,0 +1,69 @@
+# problems/management/commands/run_judge_worker.py
+
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from problems.queues import get_judge_queue
+from problems.services import JudgingService
+
+
+class Command(BaseCommand):
+    help = 'Runs a judge worker that claims pending submissions with time-limited leases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}",
+                            help='Unique name for this worker (defaults to host:pid).')
+        parser.add_argument('--backend', default=None, help="Queue backend: 'database' or 'redis'.")
+        parser.add_argument('--batch-size', type=int, default=5, help='Submissions to claim per round.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--lease-seconds', type=int, default=None, help='Lease duration for claimed submissions.')
+        parser.add_argument('--once', action='store_true', help='Process a single round and exit.')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id']
+        queue = get_judge_queue(options['backend'], lease_seconds=options['lease_seconds'])
+        # نجدد الحجز عندما يمضي ثلث مدته، حتى لا تنتهي المهلة أثناء التحكيم.
+        heartbeat_every = queue.lease_seconds / 3
+
+        self.stdout.write(self.style.SUCCESS(f"Judge worker '{worker_id}' started ({queue.__class__.__name__})."))
+
+        try:
+            while True:
+                requeued = queue.requeue_expired()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Re-queued {requeued} expired lease(s)."))
+
+                jobs = queue.claim(worker_id, batch_size=options['batch_size'])
+                if jobs:
+                    self.judge_batch(queue, worker_id, jobs, heartbeat_every)
+
+                if options['once']:
+                    break
+                if not jobs:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.WARNING(f"Judge worker '{worker_id}' stopped."))
+
+    def judge_batch(self, queue, worker_id, jobs, heartbeat_every):
+        in_flight = [job.pk for job in jobs]
+        last_beat = time.monotonic()
+
+        def heartbeat():
+            nonlocal last_beat
+            if time.monotonic() - last_beat >= heartbeat_every:
+                queue.heartbeat(worker_id, in_flight)
+                last_beat = time.monotonic()
+
+        for job in jobs:
+            status = JudgingService.evaluate(job.problem, job.submitted_code, heartbeat=heartbeat)
+            if queue.complete(worker_id, job, status):
+                self.stdout.write(f"  -> Submission #{job.pk}: {status}")
+            else:
+                self.stdout.write(self.style.WARNING(f"  -> Lost lease on submission #{job.pk}, result discarded."))
+            in_flight.remove(job.pk)
+            heartbeat()
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='عدد محاولات التحكيم'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='judged_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التحكيم'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='انتهاء الحجز'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=100, verbose_name='العامل الحاجز'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='lease_token',
+            field=models.CharField(blank=True, db_index=True, max_length=32, verbose_name='رمز الحجز'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='problems_su_status_5157f8_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_test_case_count(apps, schema_editor):
+    Problem = apps.get_model('problems', 'Problem')
+    TestCase = apps.get_model('problems', 'TestCase')
+    counts = (
+        TestCase.objects.filter(problem=OuterRef('pk'))
+        .order_by().values('problem').annotate(total=Count('pk')).values('total')
+    )
+    Problem.objects.update(test_case_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0002_submission_attempts_submission_judged_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='test_case_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد حالات الاختبار'),
+        ),
+        migrations.RunPython(fill_test_case_count, migrations.RunPython.noop),
+    ]
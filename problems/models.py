@@ -26,6 +26,8 @@ class Problem(models.Model):
         db_index=True  # فهرس لتسريع التصفية حسب الصعوبة
     )
     points = models.PositiveIntegerField("النقاط الممنوحة", default=10)
+    # عداد مُخزَّن تحافظ عليه الإشارات (signals.py)، ويصلحه الأمر repair_counters.
+    test_case_count = models.PositiveIntegerField("عدد حالات الاختبار", default=0, editable=False)
 
     class Meta:
         verbose_name = "مسألة"
@@ -84,11 +86,21 @@ class Submission(models.Model):
     )
     submitted_at = models.DateTimeField("تاريخ التقديم", auto_now_add=True, db_index=True)
 
+    # --- Judge Worker Lease ---
+    # يحجز عامل التحكيم التقديم لمدة محدودة؛ إذا توقف العامل عن إرسال نبضات
+    # الحياة (heartbeats) تنتهي المهلة ويعود التقديم إلى طابور الانتظار.
+    lease_token = models.CharField("رمز الحجز", max_length=32, blank=True, db_index=True)
+    lease_owner = models.CharField("العامل الحاجز", max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField("انتهاء الحجز", null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField("عدد محاولات التحكيم", default=0)
+    judged_at = models.DateTimeField("تاريخ التحكيم", null=True, blank=True)
+
     class Meta:
         verbose_name = "تقديم"
         verbose_name_plural = "التقديمات"
         indexes = [
             models.Index(fields=['student', 'problem', 'status']), # فهرس مركب للاستعلامات الشائعة
+            models.Index(fields=['status', 'lease_expires_at']), # فهرس لعمال التحكيم عند حجز المهام
         ]
         ordering = ['-submitted_at']
 
@@ -0,0 +1,312 @@
+# problems/queues.py
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Submission
+
+
+class BaseJudgeQueue:
+    """
+    واجهة مشتركة لطوابير التحكيم.
+    - طبقة الويب تستدعي enqueue فقط، وعمال التحكيم (run_judge_worker) يحجزون المهام
+      بحجوزات محدودة المدة (leases) ويجددونها بنبضات الحياة (heartbeats).
+    - قاعدة البيانات تبقى دائمًا مصدر الحقيقة لحالة التقديم، لذلك يتم إنهاء المهمة
+      بنفس الطريقة مهما كان مصدر الطابور.
+    """
+
+    def __init__(self, lease_seconds=None, max_attempts=None):
+        self.lease_seconds = lease_seconds or getattr(settings, 'JUDGE_LEASE_SECONDS', 30)
+        self.max_attempts = max_attempts or getattr(settings, 'JUDGE_MAX_ATTEMPTS', 3)
+
+    def _lease_deadline(self):
+        return timezone.now() + timedelta(seconds=self.lease_seconds)
+
+    def enqueue(self, submission):
+        raise NotImplementedError
+
+    def claim(self, worker_id, batch_size=1):
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, submission_ids):
+        raise NotImplementedError
+
+    def requeue_expired(self):
+        raise NotImplementedError
+
+    def complete(self, worker_id, submission, status):
+        """
+        يسجل نتيجة التحكيم فقط إذا كان العامل ما يزال يملك الحجز.
+        يرجع False إذا انتهى الحجز وانتقلت المهمة إلى عامل آخر.
+        الحفظ يتم عبر save(update_fields) حتى تعمل إشارات منح النقاط.
+        """
+        with transaction.atomic():
+            job = Submission.objects.select_for_update().filter(
+                pk=submission.pk,
+                status=Submission.Status.PENDING,
+                lease_owner=worker_id,
+            ).first()
+            if job is None:
+                return False
+
+            job.status = status
+            job.judged_at = timezone.now()
+            job.lease_token = ''
+            job.lease_owner = ''
+            job.lease_expires_at = None
+            job.save(update_fields=['status', 'judged_at', 'lease_token', 'lease_owner', 'lease_expires_at'])
+
+        submission.status = job.status
+        submission.judged_at = job.judged_at
+        return True
+
+    def _fail_exhausted(self, submission_ids=None):
+        """يعلّم المهام التي تجاوزت عدد المحاولات كخطأ تشغيلي (مثل الحلقات اللانهائية)."""
+        queryset = Submission.objects.filter(
+            status=Submission.Status.PENDING,
+            attempts__gte=self.max_attempts,
+            lease_expires_at__lt=timezone.now(),
+        )
+        if submission_ids is not None:
+            queryset = queryset.filter(pk__in=submission_ids)
+        exhausted = list(queryset.only('pk', 'status', 'student', 'problem'))
+        for submission in exhausted:
+            with transaction.atomic():
+                submission.status = Submission.Status.ERROR
+                submission.judged_at = timezone.now()
+                submission.lease_token = ''
+                submission.lease_owner = ''
+                submission.lease_expires_at = None
+                submission.save(update_fields=['status', 'judged_at', 'lease_token', 'lease_owner', 'lease_expires_at'])
+        return len(exhausted)
+
+
+class DatabaseJudgeQueue(BaseJudgeQueue):
+    """
+    طابور يعتمد على جدول Submission نفسه.
+    - الحجز عبارة عن UPDATE مشروط واحد على دفعة من التقديمات المعلقة، لذلك
+      لا يمكن لعاملين حجز نفس التقديم حتى عند التشغيل على عدة أجهزة.
+    """
+
+    def enqueue(self, submission):
+        # التقديم المعلق في قاعدة البيانات هو المهمة نفسها.
+        return submission
+
+    def _claimable(self, now):
+        return Submission.objects.filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+            status=Submission.Status.PENDING,
+            attempts__lt=self.max_attempts,
+        )
+
+    def claim(self, worker_id, batch_size=1):
+        now = timezone.now()
+        candidate_ids = list(
+            self._claimable(now).order_by('submitted_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+
+        token = uuid.uuid4().hex
+        self._claimable(now).filter(pk__in=candidate_ids).update(
+            lease_token=token,
+            lease_owner=worker_id,
+            lease_expires_at=self._lease_deadline(),
+            attempts=F('attempts') + 1,
+        )
+        return list(
+            Submission.objects.filter(lease_token=token)
+            .select_related('problem', 'student')
+            .prefetch_related('problem__test_cases')
+            .order_by('submitted_at')
+        )
+
+    def heartbeat(self, worker_id, submission_ids):
+        if not submission_ids:
+            return 0
+        return Submission.objects.filter(
+            pk__in=submission_ids,
+            status=Submission.Status.PENDING,
+            lease_owner=worker_id,
+        ).update(lease_expires_at=self._lease_deadline())
+
+    def requeue_expired(self):
+        """يحرر الحجوزات المنتهية لتصبح قابلة للحجز من جديد."""
+        failed = self._fail_exhausted()
+        released = Submission.objects.filter(
+            status=Submission.Status.PENDING,
+            lease_expires_at__lt=timezone.now(),
+        ).update(lease_token='', lease_owner='', lease_expires_at=None)
+        return released + failed
+
+
+class RedisJudgeQueue(BaseJudgeQueue):
+    """
+    طابور يعتمد على Redis لتخفيف الضغط على قاعدة البيانات أثناء الاختبارات.
+    - قائمة (list) للمهام المعلقة، ومجموعة مرتبة (sorted set) للحجوزات حيث
+      الدرجة هي وقت انتهاء الحجز، و hash لمعرفة العامل المالك لكل حجز.
+    """
+    PENDING_KEY = 'judge:pending'
+    LEASES_KEY = 'judge:leases'
+    OWNERS_KEY = 'judge:owners'
+    RECONCILE_BATCH = 500
+
+    # السحب من القائمة وتسجيل الحجز في خطوة ذرية واحدة داخل Redis، فتعطل العامل
+    # بينهما لا يضيع المهمة: إما بقيت في القائمة أو صار لها حجز ينتهي ويُعاد.
+    CLAIM_SCRIPT = """
+    local claimed = {}
+    for i = 1, tonumber(ARGV[1]) do
+        local job_id = redis.call('RPOP', KEYS[1])
+        if not job_id then break end
+        redis.call('ZADD', KEYS[2], ARGV[2], job_id)
+        redis.call('HSET', KEYS[3], job_id, ARGV[3])
+        claimed[#claimed + 1] = job_id
+    end
+    return claimed
+    """
+
+    # إعادة المفقود: الفحص (لا حجز ولا انتظار) والإضافة في خطوة ذرية واحدة، فلا يسحب
+    # عامل المهمة أو يعيدها آخر بين الفحص والإضافة فتدخل الطابور مرتين.
+    REQUEUE_LOST_SCRIPT = """
+    local pushed = {}
+    for i = 1, #ARGV do
+        local job_id = ARGV[i]
+        if not redis.call('ZSCORE', KEYS[2], job_id) and not redis.call('LPOS', KEYS[1], job_id) then
+            redis.call('RPUSH', KEYS[1], job_id)
+            pushed[#pushed + 1] = job_id
+        end
+    end
+    return pushed
+    """
+
+    def __init__(self, lease_seconds=None, max_attempts=None, redis_url=None):
+        super().__init__(lease_seconds=lease_seconds, max_attempts=max_attempts)
+        import redis  # اعتماد اختياري: مثبت مع channels_redis
+        self.redis = redis.Redis.from_url(redis_url or settings.REDIS_URL)
+        self._claim_script = self.redis.register_script(self.CLAIM_SCRIPT)
+        self._requeue_lost_script = self.redis.register_script(self.REQUEUE_LOST_SCRIPT)
+
+    def enqueue(self, submission):
+        self.redis.lpush(self.PENDING_KEY, submission.pk)
+        return submission
+
+    def claim(self, worker_id, batch_size=1):
+        deadline = self._lease_deadline()
+        claimed_ids = [
+            int(raw_id) for raw_id in self._claim_script(
+                keys=[self.PENDING_KEY, self.LEASES_KEY, self.OWNERS_KEY],
+                args=[batch_size, deadline.timestamp(), worker_id],
+            )
+        ]
+
+        if not claimed_ids:
+            return []
+
+        # نعكس الحجز في قاعدة البيانات حتى تعمل complete بنفس الضمانات.
+        Submission.objects.filter(pk__in=claimed_ids, status=Submission.Status.PENDING).update(
+            lease_owner=worker_id,
+            lease_expires_at=deadline,
+            attempts=F('attempts') + 1,
+        )
+        jobs = list(
+            Submission.objects.filter(pk__in=claimed_ids, status=Submission.Status.PENDING)
+            .select_related('problem', 'student')
+            .prefetch_related('problem__test_cases')
+            .order_by('submitted_at')
+        )
+        self._release({job_id for job_id in claimed_ids} - {job.pk for job in jobs})
+        return jobs
+
+    def heartbeat(self, worker_id, submission_ids):
+        deadline = self._lease_deadline()
+        owned = [
+            submission_id for submission_id, owner in zip(
+                submission_ids, self.redis.hmget(self.OWNERS_KEY, submission_ids) if submission_ids else []
+            )
+            if owner is not None and owner.decode() == worker_id
+        ]
+        if not owned:
+            return 0
+        self.redis.zadd(self.LEASES_KEY, {submission_id: deadline.timestamp() for submission_id in owned}, xx=True)
+        return Submission.objects.filter(pk__in=owned, lease_owner=worker_id).update(lease_expires_at=deadline)
+
+    def complete(self, worker_id, submission, status):
+        completed = super().complete(worker_id, submission, status)
+        self._release([submission.pk])
+        return completed
+
+    def requeue_expired(self):
+        now = timezone.now()
+        expired_ids = [int(raw_id) for raw_id in self.redis.zrangebyscore(self.LEASES_KEY, '-inf', now.timestamp())]
+        if not expired_ids:
+            return self._reconcile(now)
+
+        self._release(expired_ids)
+        failed = self._fail_exhausted(expired_ids)
+        retry_ids = list(
+            Submission.objects.filter(pk__in=expired_ids, status=Submission.Status.PENDING)
+            .values_list('pk', flat=True)
+        )
+        Submission.objects.filter(pk__in=retry_ids).update(lease_token='', lease_owner='', lease_expires_at=None)
+        if retry_ids:
+            self.redis.rpush(self.PENDING_KEY, *retry_ids)
+        return len(retry_ids) + failed + self._reconcile(now)
+
+    def _reconcile(self, now):
+        """
+        قاعدة البيانات مصدر الحقيقة: أي تقديم معلق أقدم من مدة الحجز وليس في قائمة
+        الانتظار ولا في الحجوزات (فُقد من Redis، أو لم يصل enqueue) يُعاد إلى الطابور.
+        """
+        failed = self._fail_exhausted()
+        stale_ids = list(
+            Submission.objects.filter(
+                Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now),
+                status=Submission.Status.PENDING,
+                attempts__lt=self.max_attempts,
+                submitted_at__lt=now - timedelta(seconds=self.lease_seconds),
+            ).order_by('submitted_at').values_list('pk', flat=True)[:self.RECONCILE_BATCH]
+        )
+        if not stale_ids:
+            return failed
+
+        lost_ids = [
+            int(raw_id) for raw_id in self._requeue_lost_script(
+                keys=[self.PENDING_KEY, self.LEASES_KEY], args=stale_ids,
+            )
+        ]
+        if lost_ids:
+            # الشرط على انتهاء الحجز يحمي حجزًا جديدًا سجله عامل بعد الإضافة مباشرة.
+            Submission.objects.filter(
+                Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now), pk__in=lost_ids,
+            ).update(lease_token='', lease_owner='', lease_expires_at=None)
+        return len(lost_ids) + failed
+
+    def _release(self, submission_ids):
+        submission_ids = list(submission_ids)
+        if not submission_ids:
+            return
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.LEASES_KEY, *submission_ids)
+        pipe.hdel(self.OWNERS_KEY, *submission_ids)
+        pipe.execute()
+
+
+JUDGE_QUEUE_BACKENDS = {
+    'database': DatabaseJudgeQueue,
+    'redis': RedisJudgeQueue,
+}
+
+
+def get_judge_queue(backend=None, **kwargs):
+    """يرجع طابور التحكيم المحدد في الإعدادات (JUDGE_QUEUE_BACKEND)."""
+    backend = backend or getattr(settings, 'JUDGE_QUEUE_BACKEND', 'database')
+    try:
+        queue_class = JUDGE_QUEUE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown judge queue backend: {backend!r}")
+    return queue_class(**kwargs)
@@ -5,6 +5,7 @@ from RestrictedPython.Guards import safe_builtins, full_write_guard, guarded_ite
 import io
 import sys
 from .models import Submission
+from .queues import get_judge_queue
 
 class JudgingService:
     """
@@ -40,23 +41,35 @@ class JudgingService:
 
         return output, status, error_message
 
+    @classmethod
+    def evaluate(cls, problem, code, heartbeat=None):
+        """
+        Runs the code against every test case and returns the final status.
+
+        `heartbeat` is an optional callable invoked after each test case, so that
+        judge workers can extend their lease while a long submission is running.
+        Expects `problem.test_cases` to be pre-fetched by the caller.
+        """
+        for test_case in problem.test_cases.all():
+            actual_output, exec_status, _ = cls._safe_execute(code, test_case.input_data)
+
+            if exec_status != "Success" or actual_output != test_case.expected_output.strip():
+                return Submission.Status.ERROR if exec_status != 'Success' else Submission.Status.WRONG
+
+            if heartbeat:
+                heartbeat()
+
+        return Submission.Status.CORRECT
+
     @classmethod
     def judge_submission(cls, problem, student, code):
         """
-        Judges a user's code against all test cases for a problem.
+        Judges a user's code against all test cases for a problem, synchronously.
         
         1. FIX (Efficiency): This method now expects `problem.test_cases` to be pre-fetched
            by the caller (the view), avoiding an extra database query here.
         """
-        final_status = Submission.Status.CORRECT
-
-        # This will use the pre-fetched test cases, not hit the DB again.
-        for test_case in problem.test_cases.all():
-            actual_output, exec_status, _ = cls._safe_execute(code, test_case.input_data)
-            
-            if exec_status != "Success" or actual_output != test_case.expected_output.strip():
-                final_status = Submission.Status.ERROR if exec_status != 'Success' else Submission.Status.WRONG
-                break
+        final_status = cls.evaluate(problem, code)
 
         submission = Submission.objects.create(
             problem=problem,
@@ -64,4 +77,19 @@ class JudgingService:
             submitted_code=code,
             status=final_status
         )
-        return submission
\ No newline at end of file
+        return submission
+
+    @staticmethod
+    def enqueue_submission(problem, student, code):
+        """
+        Stores the submission as PENDING and hands it to the judge queue.
+        The web tier never executes user code; `run_judge_worker` does.
+        """
+        submission = Submission.objects.create(
+            problem=problem,
+            student=student,
+            submitted_code=code,
+            status=Submission.Status.PENDING
+        )
+        get_judge_queue().enqueue(submission)
+        return submission
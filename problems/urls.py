@@ -6,6 +6,7 @@ from .views import (
     ProblemListView,
     ProblemDetailView,
     SubmissionCreateView,
+    SubmissionHistoryView,
 )
 
 app_name = 'problems' # BEST PRACTICE: Add an app namespace
@@ -21,4 +22,7 @@ urlpatterns = [
     # 3. CRITICAL FIX: Add a dedicated path for handling the code submission (handles POST requests)
     # This URL will be the target for the form in `problem_detail.html`.
     path('problem/<int:pk>/submit/', SubmissionCreateView.as_view(), name='problem_submit'),
+
+    # Polled by HTMX while a submission is waiting for a judge worker
+    path('problem/<int:pk>/submissions/', SubmissionHistoryView.as_view(), name='submission_history'),
 ]
\ No newline at end of file
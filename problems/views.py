@@ -49,15 +49,18 @@ class ProblemDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # 3. FIX (DRY): This logic is now encapsulated here.
-        context['submissions'] = self.get_user_submissions()
+        submissions = self.get_user_submissions()
+        context['submissions'] = submissions
+        # The history partial keeps polling while a judge worker is still on it.
+        context['has_pending'] = any(sub.status == Submission.Status.PENDING for sub in submissions)
         return context
     
     def get_user_submissions(self):
         """Helper method to fetch user submissions for this problem."""
-        return Submission.objects.filter(
+        return list(Submission.objects.filter(
             problem=self.object,
             student=self.request.user
-        ).order_by('-submitted_at')
+        ).order_by('-submitted_at'))
 
 
 class SubmissionCreateView(LoginRequiredMixin, View):
@@ -70,15 +73,29 @@ class SubmissionCreateView(LoginRequiredMixin, View):
         problem = get_object_or_404(Problem.objects.prefetch_related('test_cases'), pk=kwargs['pk'])
         code = request.POST.get('code', '')
 
-        # Delegate all judging logic to the service layer
-        JudgingService.judge_submission(problem=problem, student=request.user, code=code)
-        
-        # 4. FIX (DRY): Instead of re-querying, we create an instance of the
-        # DetailView to reuse its submission-fetching logic.
-        detail_view = ProblemDetailView()
-        detail_view.request = request
-        detail_view.object = problem
-        
-        context = detail_view.get_context_data()
-        
-        return render(request, 'problems/partials/submission_history.html', context)
\ No newline at end of file
+        # The web tier only enqueues; judge workers pick the submission up.
+        JudgingService.enqueue_submission(problem=problem, student=request.user, code=code)
+
+        return render_submission_history(request, problem)
+
+
+class SubmissionHistoryView(LoginRequiredMixin, View):
+    """
+    Returns the submission history partial.
+    Polled by HTMX while a submission is still waiting for a judge worker.
+    """
+    def get(self, request, *args, **kwargs):
+        problem = get_object_or_404(Problem, pk=kwargs['pk'])
+        return render_submission_history(request, problem)
+
+
+def render_submission_history(request, problem):
+    # 4. FIX (DRY): Instead of re-querying, we create an instance of the
+    # DetailView to reuse its submission-fetching logic.
+    detail_view = ProblemDetailView()
+    detail_view.request = request
+    detail_view.object = problem
+
+    context = detail_view.get_context_data()
+
+    return render(request, 'problems/partials/submission_history.html', context)
\ No newline at end of file
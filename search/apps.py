@@ -0,0 +1,13 @@
+# search/apps.py
+
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = "البحث"
+
+    def ready(self):
+        # تسجيل إشارات مزامنة فهرس البحث مع الدروس والمسائل والمذكرات.
+        import search.signals
@@ -0,0 +1,217 @@
+# search/index.py
+
+import html
+import re
+
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .normalization import normalize_arabic, normalize_arabic_with_offsets
+
+# علامات مؤقتة يضعها highlight() حول الكلمات المطابقة في النص المطبَّع.
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+_HIGHLIGHTS = re.compile(f'{_HIGHLIGHT_START}(.*?){_HIGHLIGHT_END}', re.S)
+_WORD = re.compile(r'\w+')
+# طول المقتطف بالحروف، وكم حرفًا يسبق أول تطابق.
+SNIPPET_LENGTH = 160
+SNIPPET_LEAD = 50
+
+
+def _plain_text(rendered_html):
+    """نص خام من HTML المولَّد (بدون وسوم Markdown أو HTML)."""
+    return html.unescape(strip_tags(rendered_html or ''))
+
+
+def _match_spans(highlighted):
+    """مواضع [(بداية، نهاية)] للكلمات المظللة داخل النص المطبَّع بدون العلامات."""
+    spans, removed = [], 0
+    for match in _HIGHLIGHTS.finditer(highlighted):
+        start = match.start() - removed
+        spans.append((start, start + len(match.group(1))))
+        removed += 2
+    return spans
+
+
+def _snippet(original, highlighted):
+    """
+    مقتطف من النص الأصلي (بتشكيله وإملائه كما كتبه صاحبه)، مع تظليل مواضع التطابق
+    التي وجدها FTS5 في النص المطبَّع بعد إعادتها إلى النص الأصلي.
+    """
+    _, offsets = normalize_arabic_with_offsets(original)
+    spans = []
+    for start, end in _match_spans(highlighted):
+        if start < len(offsets):
+            # النهاية تشمل التشكيل الملحق بآخر حرف مطابق
+            spans.append((offsets[start], offsets[end] if end < len(offsets) else len(original)))
+
+    window_start = max(0, spans[0][0] - SNIPPET_LEAD) if spans else 0
+    if window_start:
+        boundary = original.rfind(' ', 0, window_start)
+        window_start = boundary + 1 if boundary != -1 else window_start
+    window_end = min(len(original), window_start + SNIPPET_LENGTH)
+    if window_end < len(original):
+        boundary = original.rfind(' ', window_start, window_end)
+        window_end = boundary if boundary > (spans[0][1] if spans else window_start) else window_end
+
+    parts, position = ['…' if window_start else ''], window_start
+    for start, end in spans:
+        if start < position or end > window_end:
+            continue
+        parts += [escape(original[position:start]), '<mark>', escape(original[start:end]), '</mark>']
+        position = end
+    parts += [escape(original[position:window_end]), '…' if window_end < len(original) else '']
+    return mark_safe(''.join(parts))
+
+
+class SearchIndex:
+    """
+    فهرس بحث نصي كامل على جدول FTS5 واحد (search_document).
+    - كل نوع محتوى له رمز ثابت، ومعرّف الصف (rowid) مشتق من (النوع، المعرّف)،
+      لذلك التحديث والحذف يتمان بالمفتاح مباشرة بدون مسح الجدول.
+    - النصوص تُطبَّع (normalize_arabic) قبل الإدراج وقبل البحث، ويتكفل
+      unicode61 بالباقي (الأحرف اللاتينية المشكّلة وحالة الأحرف).
+    - النص الأصلي يُخزَّن في display_body (غير مفهرس) ومنه يُبنى المقتطف.
+    - المذكرات خاصة: تُخزَّن مع owner_id ولا تظهر إلا لصاحبها.
+    """
+    TABLE = 'search_document'
+
+    LESSON = 'lesson'
+    PROBLEM = 'problem'
+    NOTE = 'note'
+    KIND_CODES = {LESSON: 1, PROBLEM: 2, NOTE: 3}
+    KIND_LABELS = {LESSON: 'درس', PROBLEM: 'مسألة', NOTE: 'مذكرة'}
+
+    # ---------------------------------------------------------------
+    # بناء المستندات (تعمل على values() حتى تصلح للنماذج التاريخية في الترحيلات)
+    # ---------------------------------------------------------------
+    @staticmethod
+    def lesson_documents(queryset):
+        for pk, title, content_html, course_id in queryset.values_list('pk', 'title', 'content_html', 'course_id'):
+            url = reverse('courses:course_detail', args=[course_id]) + f'#lesson-{pk}'
+            yield SearchIndex.LESSON, pk, None, title, url, _plain_text(content_html)
+
+    @staticmethod
+    def problem_documents(queryset):
+        # وصف المسألة نص عادي (يُعرض بـ linebreaksbr) وليس Markdown.
+        for pk, title, description in queryset.values_list('pk', 'title', 'description'):
+            url = reverse('problems:problem_detail', args=[pk])
+            yield SearchIndex.PROBLEM, pk, None, title, url, description
+
+    @staticmethod
+    def note_documents(queryset):
+        for pk, title, content_html, student_id in queryset.values_list('pk', 'title', 'content_html', 'student_id'):
+            url = reverse('dashboard:note_update', args=[pk])
+            yield SearchIndex.NOTE, pk, student_id, title, url, _plain_text(content_html)
+
+    # ---------------------------------------------------------------
+    # الكتابة
+    # ---------------------------------------------------------------
+    @classmethod
+    def rowid(cls, kind, object_id):
+        return object_id * 4 + cls.KIND_CODES[kind]
+
+    @classmethod
+    def upsert(cls, documents, using=DEFAULT_DB_ALIAS):
+        rows = [
+            (
+                cls.rowid(kind, object_id), kind, object_id, owner_id, title, url, body or '',
+                normalize_arabic(title), normalize_arabic(body),
+            )
+            for kind, object_id, owner_id, title, url, body in documents
+        ]
+        if not rows:
+            return 0
+        with connections[using].cursor() as cursor:
+            # FTS5 لا يدعم ON CONFLICT، لذا نحذف بالمفتاح ثم ندرج.
+            cursor.executemany(f"DELETE FROM {cls.TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {cls.TABLE} "
+                f"(rowid, kind, object_id, owner_id, display_title, url, display_body, title, body) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+        return len(rows)
+
+    @classmethod
+    def remove(cls, kind, object_id, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls.TABLE} WHERE rowid = %s", [cls.rowid(kind, object_id)])
+
+    @classmethod
+    def rebuild(cls, apps=global_apps, using=DEFAULT_DB_ALIAS, batch_size=500):
+        """يعيد بناء الفهرس بالكامل (يُستخدم في الأمر rebuild_search_index)."""
+        sources = [
+            (cls.lesson_documents, apps.get_model('courses', 'Lesson')),
+            (cls.problem_documents, apps.get_model('problems', 'Problem')),
+            (cls.note_documents, apps.get_model('dashboard', 'Note')),
+        ]
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls.TABLE}")
+
+        indexed = 0
+        for build_documents, model in sources:
+            batch = []
+            for document in build_documents(model._default_manager.using(using).order_by('pk')):
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    indexed += cls.upsert(batch, using=using)
+                    batch = []
+            indexed += cls.upsert(batch, using=using)
+
+        with connections[using].cursor() as cursor:
+            # دمج مقاطع الفهرس بعد الإدراج الكبير لتسريع الاستعلامات.
+            cursor.execute(f"INSERT INTO {cls.TABLE}({cls.TABLE}) VALUES ('optimize')")
+        return indexed
+
+    # ---------------------------------------------------------------
+    # القراءة
+    # ---------------------------------------------------------------
+    @staticmethod
+    def build_match_query(query):
+        """
+        يحوّل نص المستخدم إلى تعبير MATCH آمن: كل كلمة بين علامتي تنصيص
+        (حتى لا تُفسَّر كعوامل FTS5) مع بحث بالبادئة، والكلمات مربوطة بـ AND.
+        """
+        words = _WORD.findall(normalize_arabic(query))
+        return ' '.join(f'"{word}"*' for word in words)
+
+    @classmethod
+    def search(cls, query, user=None, limit=20, using=DEFAULT_DB_ALIAS):
+        """
+        يرجع نتائج مرتبة حسب bm25 (العنوان أثقل وزنًا من المحتوى) مع مقتطف مظلل:
+        [{'kind', 'kind_label', 'object_id', 'title', 'url', 'snippet'}]
+        """
+        match = cls.build_match_query(query)
+        if not match:
+            return []
+        owner_id = user.pk if user is not None and user.is_authenticated else None
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT kind, object_id, display_title, url, display_body,
+                       highlight({cls.TABLE}, 7, %s, %s)
+                FROM {cls.TABLE}
+                WHERE {cls.TABLE} MATCH %s
+                  AND (owner_id IS NULL OR owner_id = %s)
+                ORDER BY bm25({cls.TABLE}, 0, 0, 0, 0, 0, 0, 10.0, 1.0)
+                LIMIT %s
+                """,
+                [_HIGHLIGHT_START, _HIGHLIGHT_END, match, owner_id, limit],
+            )
+            rows = cursor.fetchall()
+
+        return [
+            {
+                'kind': kind,
+                'kind_label': cls.KIND_LABELS.get(kind, kind),
+                'object_id': object_id,
+                'title': title,
+                'url': url,
+                'snippet': _snippet(display_body, highlighted),
+            }
+            for kind, object_id, title, url, display_body, highlighted in rows
+        ]
@@ -0,0 +1,18 @@
+# search/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search.index import SearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the FTS5 search index for lessons, problems and notes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Documents written per batch.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = SearchIndex.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} document(s)."))
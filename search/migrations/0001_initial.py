@@ -0,0 +1,33 @@
+# search/migrations/0001_initial.py
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        # جدول FTS5 افتراضي: العمود title و body مفهرسان (بعد التطبيع العربي)،
+        # وبقية الأعمدة مخزنة فقط للعرض والتصفية؛ display_body النص الأصلي الذي تُبنى منه المقتطفات.
+        # الفهرس بيانات مشتقة بالكامل: يملؤه الأمر rebuild_search_index لقاعدة فيها محتوى سابق،
+        # ثم تبقيه الإشارات محدثًا.
+        migrations.RunSQL(
+            sql="""
+                CREATE VIRTUAL TABLE search_document USING fts5(
+                    kind UNINDEXED,
+                    object_id UNINDEXED,
+                    owner_id UNINDEXED,
+                    display_title UNINDEXED,
+                    url UNINDEXED,
+                    display_body UNINDEXED,
+                    title,
+                    body,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """,
+            reverse_sql="DROP TABLE IF EXISTS search_document",
+        ),
+    ]
@@ -0,0 +1,42 @@
+# search/normalization.py
+
+import re
+
+# التشكيل والحركات القرآنية وعلامة المد (الحروف الصغيرة فوق/تحت الحرف)
+_TASHKEEL = re.compile('[ؐ-ًؚ-ٰٟۖ-ۭ]')
+_TATWEEL = 'ـ'
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+})
+
+
+def normalize_arabic(text):
+    """
+    يوحّد الكتابة العربية قبل الفهرسة والبحث، حتى تتطابق "المُتغيِّرات" مع "المتغيرات"
+    و"إدخال" مع "ادخال" و"دالة" مع "داله":
+    - حذف التشكيل والتطويل.
+    - توحيد أشكال الألف، والألف المقصورة مع الياء، والتاء المربوطة مع الهاء.
+    """
+    if not text:
+        return ''
+    text = _TASHKEEL.sub('', text).replace(_TATWEEL, '')
+    return text.translate(_LETTER_MAP)
+
+
+def normalize_arabic_with_offsets(text):
+    """
+    مثل normalize_arabic، ويرجع أيضًا موضع كل حرف ناتج في النص الأصلي. التطبيع يحذف
+    حروفًا أو يستبدلها بحرف واحد فقط، فالخريطة تكفي لإعادة مواضع التطابق إلى النص الأصلي.
+    """
+    kept, offsets = [], []
+    for position, char in enumerate(text or ''):
+        if char == _TATWEEL or _TASHKEEL.match(char):
+            continue
+        kept.append(char)
+        offsets.append(position)
+    return ''.join(kept).translate(_LETTER_MAP), offsets
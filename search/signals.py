@@ -0,0 +1,68 @@
+# search/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from courses.models import Course, Lesson
+from dashboard.models import Note
+from problems.models import Problem
+
+from .index import SearchIndex
+from .suggest import title_index
+
+# الحقول التي تؤثر على المستند المفهرس؛ الحفظ الجزئي لحقول أخرى لا يعيد الفهرسة.
+INDEXED_FIELDS = {
+    Lesson: ({'title', 'content', 'content_html'}, SearchIndex.LESSON, SearchIndex.lesson_documents),
+    Problem: ({'title', 'description'}, SearchIndex.PROBLEM, SearchIndex.problem_documents),
+    Note: ({'title', 'content', 'content_html'}, SearchIndex.NOTE, SearchIndex.note_documents),
+}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Problem)
+@receiver(post_save, sender=Note)
+def index_document(sender, instance, update_fields=None, **kwargs):
+    fields, _, build_documents = INDEXED_FIELDS[sender]
+    if update_fields is not None and not fields.intersection(update_fields):
+        return
+    SearchIndex.upsert(build_documents(sender.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=Note)
+def unindex_document(sender, instance, **kwargs):
+    _, kind, _ = INDEXED_FIELDS[sender]
+    SearchIndex.remove(kind, instance.pk)
+
+
+# ---------------------------------------------------------------
+# فهرس الاقتراحات (العناوين فقط)
+# ---------------------------------------------------------------
+SUGGEST_KINDS = {
+    Problem: (title_index.PROBLEM, lambda problem: reverse('problems:problem_detail', args=[problem.pk])),
+    Course: (title_index.COURSE, lambda course: reverse('courses:course_detail', args=[course.pk])),
+    Lesson: (
+        title_index.LESSON,
+        lambda lesson: reverse('courses:course_detail', args=[lesson.course_id]) + f'#lesson-{lesson.pk}',
+    ),
+}
+
+
+@receiver(post_save, sender=Problem)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def update_title_suggestions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'title' not in update_fields:
+        return
+    kind, build_url = SUGGEST_KINDS[sender]
+    title_index.update(kind, instance.pk, instance.title, build_url(instance))
+
+
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+def remove_title_suggestions(sender, instance, **kwargs):
+    kind, _ = SUGGEST_KINDS[sender]
+    title_index.remove(kind, instance.pk)
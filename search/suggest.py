@@ -0,0 +1,150 @@
+# search/suggest.py
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+
+from courses.models import Course, Lesson
+from problems.models import Problem
+
+from .normalization import normalize_arabic
+
+
+def normalize_title(title):
+    return normalize_arabic(title).casefold()
+
+
+class TitleIndex:
+    """
+    فهرس بادئات داخل العملية لعناوين المسائل والكورسات والدروس (بدون قاعدة بيانات).
+    - مصفوفة مرتبة من (مفتاح، نوع، معرّف)، ولكل كلمة في العنوان مفتاح يبدأ منها،
+      فتطابق "بايث" عنوان "المتغيرات في بايثون". البحث = bisect ثم مسح متتالٍ.
+    - يُبنى عند أول طلب، وتحدّثه الإشارات تزايديًا في نفس العملية.
+    - لا يعتمد على الكاش لمعرفة تغييرات العمليات الأخرى (LocMem لا يشاركها):
+      كل عملية تعيد البناء من القاعدة بعد TITLE_INDEX_TTL ثانية، فأقصى تأخر هو هذه المدة.
+    """
+
+    PROBLEM = 'problem'
+    COURSE = 'course'
+    LESSON = 'lesson'
+    KIND_LABELS = {PROBLEM: 'مسألة', COURSE: 'كورس', LESSON: 'درس'}
+
+    def __init__(self):
+        self._keys = []       # [(key, kind, pk)] مرتبة
+        self._documents = {}  # (kind, pk) -> (title, url, keys)
+        self._built_at = None  # time.monotonic() لآخر بناء كامل
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # البناء
+    # ---------------------------------------------------------------
+    @staticmethod
+    def _keys_for(kind, pk, title):
+        words = normalize_title(title).split()
+        return [(' '.join(words[position:]), kind, pk) for position in range(len(words))]
+
+    @classmethod
+    def _load_documents(cls):
+        for pk, title in Problem.objects.values_list('pk', 'title').iterator():
+            yield cls.PROBLEM, pk, title, reverse('problems:problem_detail', args=[pk])
+        for pk, title in Course.objects.values_list('pk', 'title').iterator():
+            yield cls.COURSE, pk, title, reverse('courses:course_detail', args=[pk])
+        for pk, title, course_id in Lesson.objects.values_list('pk', 'title', 'course_id').iterator():
+            yield cls.LESSON, pk, title, reverse('courses:course_detail', args=[course_id]) + f'#lesson-{pk}'
+
+    def build(self):
+        built_at = time.monotonic()
+        keys, documents = [], {}
+        for kind, pk, title, url in self._load_documents():
+            document_keys = self._keys_for(kind, pk, title)
+            documents[(kind, pk)] = (title, url, document_keys)
+            keys.extend(document_keys)
+        keys.sort()
+        with self._lock:
+            self._keys, self._documents, self._built_at = keys, documents, built_at
+
+    def _is_stale(self):
+        ttl = getattr(settings, 'TITLE_INDEX_TTL', 300)
+        return self._built_at is None or time.monotonic() - self._built_at >= ttl
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        if self._built_at is None:
+            # لا يوجد فهرس بعد: ننتظر البناء (خيط واحد يبني والبقية تنتظره).
+            with self._build_lock:
+                if self._is_stale():
+                    self.build()
+        elif self._build_lock.acquire(blocking=False):
+            # فهرس قديم: خيط واحد يعيد البناء والبقية تقرأ النسخة الحالية.
+            try:
+                self.build()
+            finally:
+                self._build_lock.release()
+
+    # ---------------------------------------------------------------
+    # التحديث التزايدي (من الإشارات)
+    # ---------------------------------------------------------------
+    def _discard(self, kind, pk):
+        document = self._documents.pop((kind, pk), None)
+        if document is None:
+            return
+        for key in document[2]:
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def update(self, kind, pk, title, url):
+        if self._built_at is None:
+            return  # لم يُبنَ بعد؛ سيُبنى كاملًا عند أول طلب.
+        with self._lock:
+            self._discard(kind, pk)
+            document_keys = self._keys_for(kind, pk, title)
+            self._documents[(kind, pk)] = (title, url, document_keys)
+            for key in document_keys:
+                insort(self._keys, key)
+
+    def remove(self, kind, pk):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._discard(kind, pk)
+
+    def invalidate(self):
+        """
+        يعيد البناء عند الطلب التالي في هذه العملية (بعد تعديلات لا تطلق الإشارات)؛
+        العمليات الأخرى تلتقط التغيير عند انتهاء TITLE_INDEX_TTL.
+        """
+        self._built_at = None
+
+    # ---------------------------------------------------------------
+    # القراءة
+    # ---------------------------------------------------------------
+    def suggest(self, query, limit=8):
+        """يرجع حتى limit من [{'kind', 'kind_label', 'title', 'url'}] تبدأ إحدى كلماتها بالنص."""
+        prefix = ' '.join(normalize_title(query).split())
+        if not prefix:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            keys, documents = self._keys, self._documents
+            position = bisect_left(keys, (prefix,))
+            seen, results = set(), []
+            while position < len(keys) and len(results) < limit:
+                key, kind, pk = keys[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                if (kind, pk) in seen:
+                    continue
+                seen.add((kind, pk))
+                title, url, _ = documents[(kind, pk)]
+                results.append({'kind': kind, 'kind_label': self.KIND_LABELS[kind], 'title': title, 'url': url})
+        return results
+
+
+title_index = TitleIndex()
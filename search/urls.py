@@ -0,0 +1,12 @@
+# search/urls.py
+
+from django.urls import path
+from .views import SearchView, SuggestView
+
+app_name = 'search'
+
+urlpatterns = [
+    path('', SearchView.as_view(), name='search'),
+    # يُستدعى من شريط البحث في القائمة العلوية عبر HTMX
+    path('suggest/', SuggestView.as_view(), name='suggest'),
+]
@@ -0,0 +1,39 @@
+# search/views.py
+
+from django.views.generic import TemplateView
+
+from .index import SearchIndex
+from .suggest import title_index
+
+
+class SearchView(TemplateView):
+    """
+    صفحة البحث: نتائج مرتبة من فهرس FTS5 مع مقتطفات مظللة.
+    المذكرات الخاصة تظهر لصاحبها فقط (انظر SearchIndex.search).
+    """
+    template_name = 'search/search.html'
+    results_limit = 30
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['results'] = (
+            SearchIndex.search(query, user=self.request.user, limit=self.results_limit) if query else []
+        )
+        return context
+
+
+class SuggestView(TemplateView):
+    """
+    اقتراحات فورية لشريط البحث (HTMX) من فهرس العناوين في الذاكرة،
+    بدون أي استعلام لقاعدة البيانات لكل ضغطة مفتاح.
+    """
+    template_name = 'search/partials/suggestions.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        context['query'] = query.strip()
+        context['suggestions'] = title_index.suggest(query)
+        return context
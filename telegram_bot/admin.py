@@ -1,3 +1,13 @@
+# telegram_bot/admin.py
+
 from django.contrib import admin
 
-# Register your models here.
+from .models import PendingNotification
+
+
+@admin.register(PendingNotification)
+class PendingNotificationAdmin(admin.ModelAdmin):
+    list_display = ('link', 'text', 'created_at')
+    list_select_related = ('link__user',)
+    search_fields = ('link__user__username',)
+    readonly_fields = ('link', 'text', 'created_at')
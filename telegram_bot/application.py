@@ -0,0 +1,59 @@
+# telegram_bot/application.py
+
+import asyncio
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from telegram.ext import Application, CommandHandler
+
+from telegram_bot import handlers
+
+
+def build_application(webhook=False):
+    """
+    ينشئ تطبيق البوت بنفس معالجات الأوامر لوضعي polling و webhook.
+    في وضع webhook لا يوجد Updater: التحديثات تصل من TelegramWebhookConsumer،
+    وتُعالج بالتوازي حتى TELEGRAM_CONCURRENT_UPDATES تحديثًا.
+    """
+    token = settings.TELEGRAM_BOT_TOKEN
+    if not token:
+        raise ImproperlyConfigured("TELEGRAM_BOT_TOKEN is not configured in settings.")
+
+    builder = (
+        Application.builder()
+        .token(token)
+        .base_url(getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot'))
+        .concurrent_updates(getattr(settings, 'TELEGRAM_CONCURRENT_UPDATES', 16))
+    )
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
+
+    application.add_handler(CommandHandler("start", handlers.start_command))
+    application.add_handler(CommandHandler("connect", handlers.connect_command))
+    application.add_handler(CommandHandler("stats", handlers.stats_command))
+    application.add_handler(CommandHandler("help", handlers.help_command))
+    return application
+
+
+_application = None
+_application_lock = None
+
+
+async def get_webhook_application():
+    """
+    تطبيق واحد لكل عملية ASGI، يُهيأ ويبدأ معالجة طابور التحديثات عند أول طلب
+    داخل حلقة الأحداث الخاصة بالخادم.
+    """
+    global _application, _application_lock
+    if _application is not None:
+        return _application
+    if _application_lock is None:
+        _application_lock = asyncio.Lock()
+    async with _application_lock:
+        if _application is None:
+            application = build_application(webhook=True)
+            await application.initialize()
+            await application.start()
+            _application = application
+    return _application
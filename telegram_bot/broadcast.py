@@ -0,0 +1,162 @@
+# telegram_bot/broadcast.py
+
+import asyncio
+import logging
+from datetime import timedelta
+
+import telegram
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db.models import Q
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+
+def course_audience(course, path_only=None):
+    """
+    روابط Telegram النشطة للمستخدمين الذين يهمهم الكورس: [(link_id, chat_id, delivery)].
+    path_only: من اختار مسار الكورس في ملفه، أو بدأ أي كورس في نفس المسار.
+    """
+    from accounts.models import TelegramLink
+
+    if path_only is None:
+        path_only = getattr(settings, 'TELEGRAM_ANNOUNCE_AUDIENCE', 'path') == 'path'
+    links = TelegramLink.objects.filter(is_active=True).exclude(telegram_chat_id=None)
+    if path_only:
+        learning_path = course.learning_path
+        links = links.filter(
+            Q(user__path=learning_path.title) | Q(user__course_progress__course__learning_path=learning_path)
+        )
+    return list(links.order_by('pk').values_list('pk', 'telegram_chat_id', 'delivery').distinct())
+
+
+class RateLimiter:
+    """يباعد بين الطلبات بفاصل ثابت (rate طلب في الثانية) مهما كان عدد المهام المتزامنة."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TelegramBroadcaster:
+    """
+    يرسل رسالة لعدد كبير من المحادثات بالتوازي ضمن حدود Telegram.
+    - asyncio.Semaphore يحد عدد الطلبات المفتوحة (TELEGRAM_BROADCAST_CONCURRENCY).
+    - RateLimiter عام (~30 رسالة/ثانية لكل بوت) وفاصل أدنى لكل محادثة (رسالة/ثانية).
+    - 429 (RetryAfter) يوقف كل المرسلين المدة التي طلبها Telegram ثم يعيد المحاولة،
+      وأخطاء الشبكة تُعاد بتراجع أُسّي؛ 403 تعني أن المستخدم حظر البوت، وأي خطأ
+      آخر من Telegram يُعد فشلًا لتلك المحادثة وحدها ولا يوقف الباقي.
+    - deadline (ثوانٍ، TELEGRAM_BROADCAST_DEADLINE): لا تبدأ أي محاولة أو انتظار بعده،
+      والمحادثات المتبقية ترجع 'deferred' ليعيد المتصل نشرها؛ فمدة الإرسال لا تتجاوز
+      المهلة + مهلة طلب HTTP واحد، وتبقى داخل حجز صندوق الأحداث (OUTBOX_LEASE_SECONDS).
+    - TELEGRAM_API_BASE_URL يسمح بتوجيه الإرسال إلى خادم Bot API محلي أو وهمي (fake_api.py).
+    """
+
+    def __init__(self, token=None, base_url=None, concurrency=None, rate=None, chat_interval=None, max_attempts=None,
+                 deadline=None):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.base_url = base_url or getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+        self.concurrency = concurrency or getattr(settings, 'TELEGRAM_BROADCAST_CONCURRENCY', 20)
+        self.rate = rate or getattr(settings, 'TELEGRAM_BROADCAST_RATE', 25)
+        self.chat_interval = chat_interval if chat_interval is not None else getattr(settings, 'TELEGRAM_CHAT_INTERVAL', 1.0)
+        self.max_attempts = max_attempts or getattr(settings, 'TELEGRAM_SEND_ATTEMPTS', 5)
+        self.deadline = deadline or getattr(settings, 'TELEGRAM_BROADCAST_DEADLINE', 30)
+
+    def _bot(self):
+        request = HTTPXRequest(connection_pool_size=self.concurrency)
+        return telegram.Bot(token=self.token, base_url=self.base_url, request=request)
+
+    @staticmethod
+    def _retry_seconds(error):
+        value = error.retry_after
+        return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+    async def _wait_for_chat(self, chat_id):
+        loop = asyncio.get_running_loop()
+        next_allowed = self._chat_next.get(chat_id, 0.0)
+        self._chat_next[chat_id] = max(loop.time(), next_allowed) + self.chat_interval
+        if next_allowed > loop.time():
+            await asyncio.sleep(next_allowed - loop.time())
+
+    def _past_deadline(self, wait=0):
+        """هل ينتهي الوقت المسموح قبل أن ننتظر wait ثانية أخرى؟"""
+        return asyncio.get_running_loop().time() + wait >= self._deadline_at
+
+    async def _send(self, bot, chat_id, text):
+        """يرجع 'sent' أو 'blocked' أو 'failed' أو 'deferred'."""
+        for attempt in range(1, self.max_attempts + 1):
+            await self._resume.wait()
+            await self._wait_for_chat(chat_id)
+            await self._limiter.wait()
+            if self._past_deadline():
+                return 'deferred'
+            try:
+                async with self._semaphore:
+                    await bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+                return 'sent'
+            except RetryAfter as error:
+                # حد عام للبوت: نوقف كل المهام وليس هذه المحادثة فقط.
+                delay = self._retry_seconds(error)
+                if self._past_deadline(delay):
+                    return 'deferred'
+                if self._resume.is_set():
+                    self._resume.clear()
+                    await asyncio.sleep(delay)
+                    self._resume.set()
+            except Forbidden:
+                return 'blocked'
+            except BadRequest as error:
+                logger.warning("Telegram rejected message to chat %s: %s", chat_id, error)
+                return 'failed'
+            except NetworkError as error:
+                logger.warning("Telegram send to chat %s failed (attempt %s): %s", chat_id, attempt, error)
+                delay = min(2 ** attempt, 30)
+                if self._past_deadline(delay):
+                    return 'deferred'
+                await asyncio.sleep(delay)
+            except TelegramError as error:
+                logger.warning("Telegram send to chat %s failed: %s", chat_id, error)
+                return 'failed'
+        return 'failed'
+
+    async def abroadcast(self, chat_ids, text):
+        """يرجع {'sent': [...], 'blocked': [...], 'failed': [...], 'deferred': [...]} حسب chat_id."""
+        return await self.asend_messages([(chat_id, text) for chat_id in chat_ids])
+
+    async def asend_messages(self, messages):
+        """messages: [(chat_id, text)] بنص مختلف لكل محادثة (مثل الملخصات)."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._limiter = RateLimiter(self.rate)
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._chat_next = {}
+        self._deadline_at = asyncio.get_running_loop().time() + self.deadline
+        results = {'sent': [], 'blocked': [], 'failed': [], 'deferred': []}
+        async with self._bot() as bot:
+            outcomes = await asyncio.gather(
+                *(self._send(bot, chat_id, text) for chat_id, text in messages), return_exceptions=True,
+            )
+        for (chat_id, _), outcome in zip(messages, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error("Telegram send to chat %s crashed: %r", chat_id, outcome)
+                outcome = 'failed'
+            results[outcome].append(chat_id)
+        return results
+
+    def broadcast(self, chat_ids, text):
+        return async_to_sync(self.abroadcast)(list(chat_ids), text)
+
+    def send_messages(self, messages):
+        return async_to_sync(self.asend_messages)(list(messages))
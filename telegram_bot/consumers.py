@@ -0,0 +1,52 @@
+# telegram_bot/consumers.py
+
+import hmac
+import json
+import logging
+
+from channels.generic.http import AsyncHttpConsumer
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from telegram import Update
+
+from .application import get_webhook_application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+
+
+class TelegramWebhookConsumer(AsyncHttpConsumer):
+    """
+    يستقبل تحديثات Telegram (setWebhook) داخل تطبيق ASGI نفسه.
+    - يتحقق من الترويسة X-Telegram-Bot-Api-Secret-Token مقابل TELEGRAM_WEBHOOK_SECRET.
+    - يضع التحديث في طابور Application ويرد فورًا بـ 200، فلا ينتظر Telegram
+      انتهاء المعالجة ولا يعيد إرسال التحديث.
+    """
+
+    async def handle(self, body):
+        if self.scope['method'] != 'POST':
+            await self.send_response(405, b'', headers=[(b'Allow', b'POST')])
+            return
+
+        secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+        received = dict(self.scope['headers']).get(SECRET_HEADER, b'')
+        if not secret or not hmac.compare_digest(received, secret.encode()):
+            await self.send_response(403, b'')
+            return
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            await self.send_response(400, b'')
+            return
+
+        try:
+            application = await get_webhook_application()
+        except ImproperlyConfigured:
+            logger.error("Telegram webhook called but TELEGRAM_BOT_TOKEN is not configured.")
+            await self.send_response(503, b'')
+            return
+
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        await self.send_response(200, b'', headers=[(b'Content-Type', b'text/plain')])
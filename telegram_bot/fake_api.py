@@ -0,0 +1,106 @@
+# telegram_bot/fake_api.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeBotAPI:
+    """
+    خادم Bot API وهمي محلي لتجربة الإرسال الجماعي دون Telegram الحقيقي.
+    - يكفي توجيه TELEGRAM_API_BASE_URL (أو base_url في TelegramBroadcaster) إلى self.base_url.
+    - blocked: محادثات ترد بـ 403 (حظرت البوت)، و invalid بـ 400، و conflict بـ 409
+      (خطأ Telegram غير متوقع لا يخص الشبكة ولا المحادثة).
+    - flood_every: كل طلب sendMessage رقم N يرد بـ 429 مع retry_after ثانية.
+    - sent يسجل [(chat_id, text)] لما وصل فعلًا، و requests عدد كل طلبات sendMessage.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, blocked=(), invalid=(), conflict=(), flood_every=0, retry_after=1):
+        self.blocked = {str(chat_id) for chat_id in blocked}
+        self.invalid = {str(chat_id) for chat_id in invalid}
+        self.conflict = {str(chat_id) for chat_id in conflict}
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.sent = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/bot'
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                try:
+                    data = json.loads(body) if body else {}
+                except ValueError:
+                    data = {key: values[0] for key, values in parse_qs(body).items()}
+                status, payload = api.respond(self.path.rsplit('/', 1)[-1], data)
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST
+
+        return Handler
+
+    def respond(self, method, data):
+        """يرجع (HTTP status, JSON) لطلب Bot API."""
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'PlatformCode', 'username': 'fake_bot'}}
+        if method != 'sendMessage':
+            return 200, {'ok': True, 'result': True}
+
+        chat_id = str(data.get('chat_id'))
+        with self._lock:
+            self.requests += 1
+            flooded = self.flood_every and self.requests % self.flood_every == 0
+            if chat_id in self.blocked:
+                return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+            if chat_id in self.invalid:
+                return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'}
+            if chat_id in self.conflict:
+                return 409, {'ok': False, 'error_code': 409, 'description': 'Conflict: terminated by other request'}
+            if flooded:
+                return 429, {
+                    'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                    'parameters': {'retry_after': self.retry_after},
+                }
+            self.sent.append((chat_id, data.get('text', '')))
+            message_id = len(self.sent)
+        return 200, {'ok': True, 'result': {
+            'message_id': message_id, 'date': 0, 'text': data.get('text', ''),
+            'chat': {'id': int(chat_id) if chat_id.lstrip('-').isdigit() else 0, 'type': 'private'},
+        }}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,50 +1,67 @@
 # telegram_bot/handlers.py
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from telegram import Update
 from telegram.ext import ContextTypes
-from asgiref.sync import sync_to_async
-from accounts.models import TelegramLink, CustomUser
+from accounts.models import TelegramLink
+
+# نستخدم ORM غير المتزامن في Django (aget, asave...) مباشرة داخل المعالجات.
+# كل الاستعلامات تمر بخيط قاعدة البيانات المشترك (thread_sensitive)، فدفعة كبيرة من
+# الأوامر المتزامنة لا تستهلك مجمع الخيوط، و /stats يُقرأ غالبًا من الكاش بلا استعلام.
 
-# نستخدم sync_to_async لأن مكتبة python-telegram-bot غير متزامنة (async)
-# بينما Django ORM متزامن (sync). هذا يسمح لنا باستدعاء كود Django بأمان.
+STATS_CACHE_KEY = 'telegram:stats:{chat_id}'
 
-@sync_to_async
-def _get_or_create_telegram_link(user):
+
+async def _get_or_create_telegram_link(user):
     # نستخدم get_or_create لضمان وجود سجل ربط لكل مستخدم يحاول الحصول على رمز
-    link, _ = TelegramLink.objects.get_or_create(user=user)
+    link, _ = await TelegramLink.objects.aget_or_create(user=user)
     return link
 
-@sync_to_async
-def _connect_user_by_token(token, chat_id):
+
+async def _connect_user_by_token(token, chat_id):
     try:
         # نبحث عن سجل ربط يحتوي على الرمز الصحيح ولم يتم تفعيله بعد
-        link = TelegramLink.objects.get(connection_token=token, is_active=False)
+        link = await TelegramLink.objects.select_related('user').aget(connection_token=token, is_active=False)
         link.telegram_chat_id = chat_id
         link.is_active = True
-        link.save(update_fields=['telegram_chat_id', 'is_active'])
+        await link.asave(update_fields=['telegram_chat_id', 'is_active'])
+        await cache.adelete(STATS_CACHE_KEY.format(chat_id=chat_id))
         return f"تم ربط حسابك بنجاح! مرحبًا يا {link.user.username}."
-    except TelegramLink.DoesNotExist:
+    except (TelegramLink.DoesNotExist, ValidationError):
         return "الرمز غير صالح أو تم استخدامه من قبل. يرجى طلب رمز جديد من لوحة التحكم."
     except Exception:
         return "حدث خطأ غير متوقع أثناء محاولة ربط الحساب."
 
-@sync_to_async
-def _get_user_stats(chat_id):
+
+async def _get_user_stats(chat_id):
+    """
+    الإحصائيات تُخزن لكل محادثة TELEGRAM_STATS_TTL ثانية، فالعدّ من التقديمات
+    والدروس يحدث مرة واحدة في كل مدة مهما تكرر الأمر.
+    """
+    key = STATS_CACHE_KEY.format(chat_id=chat_id)
+    message = await cache.aget(key)
+    if message is not None:
+        return message
     try:
-        link = TelegramLink.objects.select_related('user').get(telegram_chat_id=chat_id, is_active=True)
-        user = link.user
-        solved_problems = user.get_solved_problems_count()
-        completed_lessons = user.progress_records.count()
-        
-        return (
-            f"📊 إحصائياتك يا {user.username}:\n"
-            f"🏆 النقاط: {user.score}\n"
-            f"💻 المسائل المحلولة: {solved_problems}\n"
-            f"📚 الدروس المكتملة: {completed_lessons}"
-        )
+        link = await TelegramLink.objects.select_related('user').aget(telegram_chat_id=chat_id, is_active=True)
     except TelegramLink.DoesNotExist:
         return "حسابك غير مرتبط. يرجى استخدام أمر /connect لربط حسابك أولاً."
 
+    user = link.user
+    solved_problems = await sync_to_async(user.get_solved_problems_count)()
+    completed_lessons = await user.progress_records.acount()
+    message = (
+        f"📊 إحصائياتك يا {user.username}:\n"
+        f"🏆 النقاط: {user.score}\n"
+        f"💻 المسائل المحلولة: {solved_problems}\n"
+        f"📚 الدروس المكتملة: {completed_lessons}"
+    )
+    await cache.aset(key, message, getattr(settings, 'TELEGRAM_STATS_TTL', 60))
+    return message
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles the /start command."""
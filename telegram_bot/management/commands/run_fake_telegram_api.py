@@ -0,0 +1,36 @@
+# telegram_bot/management/commands/run_fake_telegram_api.py
+
+from django.core.management.base import BaseCommand
+
+from telegram_bot.fake_api import FakeBotAPI
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a local fake Telegram Bot API server for trying broadcasts without Telegram. '
+        'Point TELEGRAM_API_BASE_URL at the printed URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--blocked', nargs='*', default=[], help='Chat ids that answer 403 (bot blocked).')
+        parser.add_argument('--invalid', nargs='*', default=[], help='Chat ids that answer 400 (chat not found).')
+        parser.add_argument('--flood-every', type=int, default=0, help='Answer every Nth sendMessage with 429.')
+        parser.add_argument('--retry-after', type=int, default=1)
+
+    def handle(self, *args, **options):
+        api = FakeBotAPI(
+            port=options['port'],
+            blocked=options['blocked'],
+            invalid=options['invalid'],
+            flood_every=options['flood_every'],
+            retry_after=options['retry_after'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake Bot API listening on {api.base_url}"))
+        try:
+            api.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            api.stop()
+            self.stdout.write(f"Delivered {len(api.sent)} message(s) out of {api.requests} request(s).")
@@ -2,11 +2,13 @@
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from telegram.ext import Application, CommandHandler
-from telegram_bot import handlers # استيراد معالجات الأوامر من ملف handlers.py
+from telegram_bot.application import build_application
 
 class Command(BaseCommand):
-    help = 'Runs the Telegram bot in polling mode.'
+    help = (
+        'Runs the Telegram bot in polling mode (local development). '
+        'In production the bot is served by the ASGI webhook; see set_telegram_webhook.'
+    )
 
     def handle(self, *args, **options):
         
@@ -17,17 +19,12 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("Starting Telegram bot..."))
         
-        # إنشاء التطبيق
-        application = Application.builder().token(token).build()
-
-        # تسجيل معالجات الأوامر
-        application.add_handler(CommandHandler("start", handlers.start_command))
-        application.add_handler(CommandHandler("connect", handlers.connect_command))
-        application.add_handler(CommandHandler("stats", handlers.stats_command))
-        application.add_handler(CommandHandler("help", handlers.help_command))
+        # إنشاء التطبيق بنفس المعالجات المستخدمة في وضع webhook
+        application = build_application()
 
         # بدء تشغيل البوت
         # run_polling يبقي البوت يعمل ويستمع للرسائل الجديدة
+        # (ويحذف أي webhook مسجل، فأعد set_telegram_webhook بعد الانتهاء)
         application.run_polling()
         
         self.stdout.write(self.style.WARNING("Bot has been stopped."))
\ No newline at end of file
@@ -0,0 +1,55 @@
+# telegram_bot/management/commands/set_telegram_webhook.py
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import telegram
+
+
+class Command(BaseCommand):
+    help = 'Registers (or deletes) the Telegram webhook that points to the ASGI endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Public webhook URL (default: SITE_URL + /telegram/webhook/).")
+        parser.add_argument('--max-connections', type=int, default=40)
+        parser.add_argument('--drop-pending', action='store_true', help="Discard updates queued while the bot was offline.")
+        parser.add_argument('--delete', action='store_true', help="Remove the webhook (e.g. before run_telegram_bot).")
+
+    def handle(self, *args, **options):
+        token = settings.TELEGRAM_BOT_TOKEN
+        if not token:
+            raise CommandError("TELEGRAM_BOT_TOKEN is not configured in settings.")
+        bot = telegram.Bot(token=token, base_url=settings.TELEGRAM_API_BASE_URL)
+
+        if options['delete']:
+            async_to_sync(self._delete)(bot, options['drop_pending'])
+            self.stdout.write(self.style.SUCCESS("Webhook deleted."))
+            return
+
+        secret = settings.TELEGRAM_WEBHOOK_SECRET
+        if not secret:
+            raise CommandError("TELEGRAM_WEBHOOK_SECRET is not configured in settings.")
+        url = options['url'] or settings.SITE_URL.rstrip('/') + '/telegram/webhook/'
+        if not url.startswith('https://'):
+            self.stdout.write(self.style.WARNING(f"Telegram only delivers webhooks over HTTPS: {url}"))
+
+        info = async_to_sync(self._set)(bot, url, secret, options['max_connections'], options['drop_pending'])
+        self.stdout.write(self.style.SUCCESS(f"Webhook set to {info.url} ({info.pending_update_count} pending updates)."))
+
+    @staticmethod
+    async def _set(bot, url, secret, max_connections, drop_pending):
+        async with bot:
+            await bot.set_webhook(
+                url=url,
+                secret_token=secret,
+                max_connections=max_connections,
+                drop_pending_updates=drop_pending,
+                allowed_updates=['message'],
+            )
+            return await bot.get_webhook_info()
+
+    @staticmethod
+    async def _delete(bot, drop_pending):
+        async with bot:
+            await bot.delete_webhook(drop_pending_updates=drop_pending)
@@ -1,3 +1,27 @@
+# telegram_bot/models.py
+
 from django.db import models
+from django.utils import timezone
+
+from accounts.models import TelegramLink
+
+
+class PendingNotification(models.Model):
+    """
+    سطر إشعار ينتظر ملخص المستخدم التالي (TelegramLink.delivery = DIGEST).
+    NotificationService.flush_due() يجمع أسطر كل مستخدم في رسالة واحدة ثم يحذفها.
+    - claim_token / claimed_until: حجز الأسطر أثناء الإرسال (خارج أي معاملة)، فلا يرسلها
+      مُفرِّغ آخر مرتين، وإذا توقفت العملية قبل الحذف تعود بعد انتهاء الحجز.
+    """
+    link = models.ForeignKey(TelegramLink, on_delete=models.CASCADE, related_name='pending_notifications')
+    text = models.TextField("نص السطر (HTML)")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "إشعار معلق"
+        verbose_name_plural = "إشعارات معلقة"
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.link.user_id}: {self.text[:40]}"
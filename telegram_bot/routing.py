@@ -0,0 +1,8 @@
+# telegram_bot/routing.py
+
+from django.urls import path
+from . import consumers
+
+http_urlpatterns = [
+    path('telegram/webhook/', consumers.TelegramWebhookConsumer.as_asgi()),
+]
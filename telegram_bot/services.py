@@ -0,0 +1,125 @@
+# telegram_bot/services.py
+
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from accounts.models import TelegramLink
+from outbox.services import publish_many, schedule
+
+from .broadcast import TelegramBroadcaster
+from .models import PendingNotification
+
+
+class NotificationService:
+    """
+    توزيع إشعارات Telegram حسب تفضيل كل مستخدم (TelegramLink.delivery).
+    - IMMEDIATE: تُرسل فورًا عبر telegram.broadcast على دفعات.
+    - DIGEST: تُحفظ أسطرًا في PendingNotification، وتُرسل رسالة واحدة لكل مستخدم
+      بعد TELEGRAM_DIGEST_MINUTES من أقدم سطر. استيراد 50 كورسًا يصبح رسالة واحدة.
+    - التفريغ رسالة telegram.digest مؤجلة في صندوق الأحداث، تعيد جدولة نفسها
+      لموعد الملخص التالي ما دامت هناك أسطر معلقة.
+    """
+    DIGEST_TOPIC = 'telegram.digest'
+    RETRY_SECONDS = 60
+
+    @staticmethod
+    def window():
+        return getattr(settings, 'TELEGRAM_DIGEST_MINUTES', 60) * 60
+
+    @classmethod
+    def notify(cls, audience, message, digest_line):
+        """
+        audience: [(link_id, chat_id, delivery)] كما يرجعها course_audience().
+        message: نص الإشعار الكامل للإرسال الفوري، و digest_line سطره في الملخص.
+        """
+        chat_ids = [chat_id for _, chat_id, delivery in audience if delivery == TelegramLink.Delivery.IMMEDIATE]
+        link_ids = [link_id for link_id, _, delivery in audience if delivery != TelegramLink.Delivery.IMMEDIATE]
+
+        chunk_size = getattr(settings, 'TELEGRAM_BROADCAST_CHUNK', 500)
+        publish_many([
+            ('telegram.broadcast', {'chat_ids': chat_ids[start:start + chunk_size], 'text': message})
+            for start in range(0, len(chat_ids), chunk_size)
+        ])
+        if link_ids:
+            PendingNotification.objects.bulk_create(
+                [PendingNotification(link_id=link_id, text=digest_line) for link_id in link_ids], batch_size=1000,
+            )
+            schedule(cls.DIGEST_TOPIC, delay=cls.window())
+
+    @staticmethod
+    def render_digest(lines):
+        limit = getattr(settings, 'TELEGRAM_DIGEST_MAX_ITEMS', 15)
+        body = "\n".join(f"• {line}" for line in lines[:limit])
+        if len(lines) > limit:
+            body += f"\n… و {len(lines) - limit} إشعارات أخرى على المنصة."
+        return f"🗞️ <b>ملخص إشعاراتك</b> ({len(lines)})\n\n{body}"
+
+    @classmethod
+    def flush_due(cls, now=None):
+        """
+        يرسل ملخصات المستخدمين الذين حان موعدهم (دفعة واحدة بحجم TELEGRAM_BROADCAST_CHUNK)،
+        ويجدول التفريغ التالي. يرجع عدد الرسائل المرسلة.
+        الإرسال يتم خارج أي معاملة: معاملة قصيرة تحجز الأسطر، ثم الإرسال، ثم معاملة
+        قصيرة تحذف ما أُرسل وتحرر ما فشل ليدخل الملخص التالي.
+        """
+        now = now or timezone.now()
+        batch_size = getattr(settings, 'TELEGRAM_BROADCAST_CHUNK', 500)
+        claimed_at = timezone.now()
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            unclaimed = PendingNotification.objects.filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=claimed_at))
+            due = list(
+                unclaimed.values('link_id')
+                .annotate(oldest=Min('created_at'))
+                .filter(oldest__lte=now - timedelta(seconds=cls.window()))
+                .order_by('oldest')
+                .values_list('link_id', flat=True)[:batch_size]
+            )
+            unclaimed.filter(link_id__in=due).update(
+                claim_token=token,
+                claimed_until=claimed_at + timedelta(seconds=getattr(settings, 'OUTBOX_LEASE_SECONDS', 60)),
+            )
+            claimed = list(
+                PendingNotification.objects.filter(claim_token=token).select_related('link').order_by('created_at', 'pk')
+            )
+
+        lines, notification_ids, chats = defaultdict(list), defaultdict(list), {}
+        stale_ids = []
+        for notification in claimed:
+            link = notification.link
+            if not link.is_active or not link.telegram_chat_id:
+                stale_ids.append(notification.pk)
+                continue
+            chats[link.pk] = link.telegram_chat_id
+            lines[link.pk].append(notification.text)
+            notification_ids[link.pk].append(notification.pk)
+
+        results = {'sent': [], 'blocked': [], 'failed': [], 'deferred': []}
+        if chats:
+            results = TelegramBroadcaster().send_messages(
+                (chat_id, cls.render_digest(lines[link_id])) for link_id, chat_id in chats.items()
+            )
+
+        with transaction.atomic():
+            if results['blocked']:
+                TelegramLink.objects.filter(telegram_chat_id__in=results['blocked']).update(is_active=False)
+            # ما فشل أو تأجل يُحرَّر ويدخل الملخص التالي.
+            done = set(results['sent']) | set(results['blocked'])
+            stale_ids += [pk for link_id, chat_id in chats.items() if chat_id in done for pk in notification_ids[link_id]]
+            PendingNotification.objects.filter(pk__in=stale_ids).delete()
+            PendingNotification.objects.filter(claim_token=token).update(claim_token='', claimed_until=None)
+
+            oldest = PendingNotification.objects.aggregate(oldest=Min('created_at'))['oldest']
+            if oldest is not None:
+                if len(due) >= batch_size or results['deferred']:
+                    delay = 0
+                else:
+                    delay = max((oldest - now).total_seconds() + cls.window(), cls.RETRY_SECONDS)
+                schedule(cls.DIGEST_TOPIC, delay=delay)
+        return len(results['sent'])
@@ -0,0 +1,61 @@
+# telegram_bot/subscribers.py
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from courses.models import Course
+from outbox.services import publish_many, subscriber
+
+from .broadcast import TelegramBroadcaster, course_audience
+from .services import NotificationService
+from .utils import send_telegram_message
+
+
+@subscriber('course.created')
+def announce_new_course(payload):
+    """
+    من اختار الإشعار الفوري يصله عبر دفعات telegram.broadcast (كل دفعة ينتهي إرسالها
+    ضمن حجز صندوق الأحداث)، والبقية يُضاف الكورس إلى ملخصهم التالي.
+    """
+    course = Course.objects.select_related('learning_path').filter(pk=payload['course_id']).first()
+    if course is None:
+        return
+    course_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000') + reverse('courses:course_detail', kwargs={'pk': course.pk})
+    message = (
+        f"📢 <b>كورس جديد متاح!</b>\n\n"
+        f"تمت إضافة كورس '<b>{course.title}</b>' إلى مسار '<b>{course.learning_path.title}</b>'.\n\n"
+        f"<a href='{course_url}'>ابدأ التعلم الآن!</a>"
+    )
+    digest_line = f"📢 كورس جديد: <a href='{course_url}'>{course.title}</a> ({course.learning_path.title})"
+    NotificationService.notify(course_audience(course), message, digest_line)
+
+
+@subscriber('telegram.broadcast', atomic=False)
+def deliver_broadcast(payload):
+    """
+    من حظر البوت يُلغى ربطه، وما فشل بعد إعادة المحاولات يُعاد نشره رسالةً مستقلة
+    (telegram.message)، وما لم يُرسل قبل TELEGRAM_BROADCAST_DEADLINE يُعاد نشره دفعةً
+    جديدة؛ فلا يُعاد الإرسال لمن وصلته الرسالة.
+    """
+    from accounts.models import TelegramLink
+
+    # الإرسال خارج أي معاملة (atomic=False)، ثم معاملة قصيرة لنتائجه.
+    results = TelegramBroadcaster().broadcast(payload['chat_ids'], payload['text'])
+    events = [('telegram.message', {'chat_id': chat_id, 'text': payload['text']}) for chat_id in results['failed']]
+    if results['deferred']:
+        events.append(('telegram.broadcast', {'chat_ids': results['deferred'], 'text': payload['text']}))
+    with transaction.atomic():
+        if results['blocked']:
+            TelegramLink.objects.filter(telegram_chat_id__in=results['blocked']).update(is_active=False)
+        publish_many(events)
+
+
+@subscriber('telegram.message', atomic=False)
+def deliver_message(payload):
+    send_telegram_message(payload['chat_id'], payload['text'], fail_silently=False)
+
+
+@subscriber(NotificationService.DIGEST_TOPIC, atomic=False)
+def flush_digests(payload):
+    NotificationService.flush_due()
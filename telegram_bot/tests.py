@@ -1,3 +1,52 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .broadcast import TelegramBroadcaster
+from .fake_api import FakeBotAPI
+
+
+class TelegramBroadcasterTests(SimpleTestCase):
+    """الإرسال الجماعي مقابل خادم Bot API وهمي محلي (fake_api.FakeBotAPI)."""
+
+    def setUp(self):
+        self.api = None
+
+    def tearDown(self):
+        if self.api is not None:
+            self.api.stop()
+
+    def start_api(self, **options):
+        self.api = FakeBotAPI(**options).start()
+        return self.api
+
+    def broadcaster(self, **options):
+        options = {'token': '123:TEST', 'base_url': self.api.base_url, 'rate': 200, 'chat_interval': 0, **options}
+        return TelegramBroadcaster(**options)
+
+    def test_classifies_every_chat(self):
+        self.start_api(blocked=['2'], invalid=['3'], conflict=['4'])
+        results = self.broadcaster().broadcast(['1', '2', '3', '4', '5'], 'مرحبا')
+        self.assertEqual(sorted(results['sent']), ['1', '5'])
+        self.assertEqual(results['blocked'], ['2'])
+        self.assertEqual(sorted(results['failed']), ['3', '4'])
+        self.assertEqual(results['deferred'], [])
+        self.assertEqual(sorted(chat_id for chat_id, _ in self.api.sent), ['1', '5'])
+
+    def test_retries_after_flood_limit(self):
+        self.start_api(flood_every=4, retry_after=1)
+        chat_ids = [str(chat_id) for chat_id in range(1, 11)]
+        results = self.broadcaster().broadcast(chat_ids, 'إعلان')
+        self.assertEqual(sorted(results['sent'], key=int), chat_ids)
+        self.assertGreater(self.api.requests, len(chat_ids))
+
+    def test_defers_chats_past_the_deadline(self):
+        self.start_api()
+        chat_ids = [str(chat_id) for chat_id in range(1, 31)]
+        results = self.broadcaster(rate=20, deadline=0.5).broadcast(chat_ids, 'إعلان')
+        self.assertTrue(results['deferred'])
+        self.assertEqual(sorted(results['sent'] + results['deferred'], key=int), chat_ids)
+        self.assertEqual(len(self.api.sent), len(results['sent']))
+
+    def test_flood_wait_beyond_deadline_defers_instead_of_sleeping(self):
+        self.start_api(flood_every=1, retry_after=60)
+        results = self.broadcaster(deadline=2).broadcast(['1', '2'], 'إعلان')
+        self.assertEqual(sorted(results['deferred']), ['1', '2'])
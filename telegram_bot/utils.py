@@ -7,12 +7,13 @@ from asgiref.sync import async_to_sync
 
 # ننشئ نسخة واحدة من البوت لاستخدامها في كل مكان
 # هذا أفضل للأداء من إنشاء كائن بوت جديد مع كل رسالة
-bot = telegram.Bot(token=settings.TELEGRAM_BOT_TOKEN)
+bot = telegram.Bot(token=settings.TELEGRAM_BOT_TOKEN, base_url=settings.TELEGRAM_API_BASE_URL)
 
-def send_telegram_message(chat_id: str, message: str):
+def send_telegram_message(chat_id: str, message: str, fail_silently: bool = True):
     """
     دالة مساعدة متزامنة (sync) لإرسال رسائل Telegram.
     تقوم بتغليف الاستدعاء غير المتزامن (async) بأمان.
+    fail_silently=False يرفع الخطأ ليعيد صندوق الأحداث المحاولة لاحقًا.
     """
     if not chat_id:
         return
@@ -21,4 +22,6 @@ def send_telegram_message(chat_id: str, message: str):
         # async_to_sync هو الجسر الذي يسمح لنا باستدعاء دالة async من كود sync (مثل الإشارات)
         async_to_sync(bot.send_message)(chat_id=chat_id, text=message, parse_mode='HTML')
     except Exception as e:
+        if not fail_silently:
+            raise
         print(f"Failed to send Telegram message to chat_id {chat_id}. Error: {e}")
\ No newline at end of file